@@ -4,134 +4,344 @@
 # V7 — Élimination automatique du BOM UTF-8 avant traitement.
 # ---------------------------------------------------------------------------
 
+import argparse
+import contextlib
 import csv
 import os
 import sys
+import time
+
+from ero_converter.cache import CACHE_DIR, MAX_CACHE_BYTES, BuildCache
+from ero_converter.datfile import BUFFER_BYTES, HEADER_BYTES
+from ero_converter.batch import plan_batch, report_batch
+from ero_converter.compress import is_archive, is_compressed_name
+from ero_converter.encoder import CSV_DELIMITER, encode_records, open_csv, write_dat
+from ero_converter.index import build_index, index_path
+from ero_converter.layout import DEFAULT_LAYOUT, LAYOUTS_ENV, get_layout, load_layouts
+from ero_converter.mapped import count_lines, is_mapped, open_dat_output
+from ero_converter.patch import patch_dat
+from ero_converter.pipeline import QUEUE_DEPTH, write_dat_pipelined
+from ero_converter.stats import RunStats, load_hook
+from ero_converter.stdio import is_stdio
+from ero_converter.transcode import LATIN1_TABLE, Transcoder
+from ero_converter.watch import DEBOUNCE, POLL_INTERVAL, Watcher
 
 
 # ===========================================================================
 # CONFIGURATION
 # ===========================================================================
 
-# Résolution de l'entrée : argument CLI > fichier par défaut > fallback.
-if len(sys.argv) > 1:
-    INPUT_FILE = sys.argv[1]
-elif os.path.exists("for_gemini.csv"):
-    INPUT_FILE = "for_gemini.csv"
-else:
-    INPUT_FILE = "categories_hd.csv"
-
 OUTPUT_FILE = "categori_corrected.dat"
-BLOCK_SIZE  = 31                # Taille fixe d'un enregistrement en octets.
 
-# Encodages
-CSV_ENCODING = "utf-8-sig"      # Consomme silencieusement le BOM (EF BB BF) s'il est présent.
-DAT_ENCODING = "latin-1"        # Format cible du fichier binaire (legacy ERO).
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Génération du fichier binaire ERO à partir d'un CSV.")
+    parser.add_argument("input", nargs="?",
+                        help="CSV source (gzip, xz ou archive zip acceptés), « - » pour stdin "
+                             "(défaut : for_gemini.csv, puis categories_hd.csv)")
+    parser.add_argument("output", nargs="?",
+                        help=f".dat produit, « - » pour stdout (défaut : {OUTPUT_FILE}) ; "
+                             "répertoire cible pour une archive zip (défaut : .)")
+    parser.add_argument("--patch", metavar="EXISTANT.dat",
+                        help="met à jour ce .dat en place : seuls les blocs modifiés sont réécrits")
+    parser.add_argument("--index", action="store_true",
+                        help="écrit aussi l'index des codes à côté du .dat (.dat.idx)")
+    parser.add_argument("--no-translit", action="store_true",
+                        help="n'applique pas la table de translittération (’ → ', œ → oe, € → EUR…)")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT.name, metavar="NOM",
+                        help="disposition du .dat produit (défaut : %(default)s)")
+    parser.add_argument("--layouts", default=os.environ.get(LAYOUTS_ENV), metavar="FICHIER.json",
+                        help=f"dispositions supplémentaires (défaut : variable {LAYOUTS_ENV})")
+    parser.add_argument("--report", metavar="FICHIER.csv",
+                        help="écrit le détail des lignes translittérées, remplacées ou tronquées")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="lecture, encodage et écriture dans des threads qui se recouvrent")
+    parser.add_argument("--queue-depth", type=int, default=QUEUE_DEPTH, metavar="N",
+                        help="morceaux en attente entre deux étages du pipeline (défaut : %(default)s)")
+    parser.add_argument("--cache", action="store_true",
+                        help="réutilise le .dat déjà généré si le CSV n'a pas changé")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help=f"répertoire du cache (implique --cache ; défaut : {CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, metavar="Mo", default=MAX_CACHE_BYTES >> 20,
+                        help="taille maximale du cache en Mo (défaut : %(default)s)")
+    parser.add_argument("--watch", action="store_true",
+                        help="surveille le CSV et régénère le .dat à chaque enregistrement "
+                             "(seuls les blocs modifiés sont réécrits ; Ctrl+C pour arrêter)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, metavar="S",
+                        help="--watch : secondes entre deux relevés du CSV (défaut : %(default)s)")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, metavar="S",
+                        help="--watch : secondes sans changement avant régénération, pour "
+                             "ignorer un fichier en cours d'enregistrement (défaut : %(default)s)")
+    parser.add_argument("--stats", nargs="?", const="text", choices=("text", "json"),
+                        help="temps par phase, débits, volumes et compteurs (json : une ligne JSON)")
+    parser.add_argument("--stats-hook", action="append", default=[], metavar="MODULE:FONCTION",
+                        help="crochet appelé autour de chaque phase mesurée (profileur, supervision)")
+    args = parser.parse_args(argv)
 
-# ===========================================================================
-# STRUCTURE TECHNIQUE — ZONE EN-TÊTE (52 octets, validée)
-# ===========================================================================
-#
-#   Offset  Taille  Rôle
-#   ------  ------  ------------------------------------
-#    0      16      Header  — Signature ERO
-#   16      36      Buffer  — Séquence technique <vide>
-#   52       —      Début des enregistrements de données
-#
-# ===========================================================================
+    try:
+        args.hooks = [load_hook(spec) for spec in args.stats_hook]
+    except (ImportError, AttributeError, ValueError) as exc:
+        parser.error(f"--stats-hook : {exc}")
+
+    try:
+        if args.layouts:
+            load_layouts(args.layouts)
+        args.layout = get_layout(args.layout)
+    except (OSError, ValueError) as exc:
+        parser.error(f"--layout : {exc}")
 
-HEADER_BYTES = bytes.fromhex(
-    "45524F00"          # Signature "ERO\0"
-    "FDFDFDFD"          # Padding signature
-    "DDDDDDDD"         # Padding signature
-    "41000000"          # Terminateur header
-)
+    # Cache, patch et index reposent sur la géométrie ERO V7.
+    if args.layout is not DEFAULT_LAYOUT and (args.cache or args.cache_dir or args.patch
+                                              or args.index):
+        parser.error(f"--cache, --patch et --index exigent la disposition {DEFAULT_LAYOUT.name}")
 
-BUFFER_BYTES = bytes.fromhex(
-    "41000000"          # Préfixe buffer
-    "00"                # Séparateur
-    "3C766964653E20"    # Chaîne ASCII "<vide> "
-    "CCCCCCCCCCCCCCCC"  # Padding buffer (24 octets
-    "CCCCCCCCCCCCCCCC"  #  de 0xCC)
-    "CCCCCCCCCCCCCCCC"  #
-)
+    args.cache = args.cache or bool(args.cache_dir)
+    if args.cache and args.patch:
+        parser.error("--cache et --patch sont incompatibles")
+    if args.pipeline and args.patch:
+        parser.error("--pipeline et --patch sont incompatibles")
+    if args.output and args.patch:
+        parser.error("--patch désigne déjà le .dat à écrire")
+    if args.cache and (is_stdio(args.input) or is_stdio(args.output)):
+        parser.error("--cache exige des fichiers, pas stdin/stdout")
+    if args.index and is_stdio(args.output):
+        parser.error("--index exige un .dat sur disque, pas stdout")
+
+    # Résolution de l'entrée : argument CLI > fichier par défaut > fallback.
+    if not args.input:
+        args.input = "for_gemini.csv" if os.path.exists("for_gemini.csv") else "categories_hd.csv"
+
+    # Surveillance : un CSV et un .dat sur disque, substitué atomiquement.
+    if args.watch:
+        if (args.patch or args.cache or args.pipeline or args.report or args.stats or args.hooks
+                or is_archive(args.input)):
+            parser.error("--watch est incompatible avec --patch, --cache, --pipeline, --report, "
+                         "--stats et les archives zip")
+        if is_stdio(args.input) or not is_mapped(args.output or OUTPUT_FILE):
+            parser.error("--watch exige un CSV et un .dat sur disque")
+        if args.interval <= 0 or args.debounce < 0:
+            parser.error("--interval doit être positif et --debounce positif ou nul")
+
+    # Archive zip : chaque membre .csv donne un .dat dans le répertoire cible.
+    args.archive = is_archive(args.input)
+    if args.archive:
+        if (args.patch or args.cache or args.index or args.report or args.no_translit
+                or args.pipeline or args.stats or args.hooks or args.layout is not DEFAULT_LAYOUT):
+            parser.error("une archive zip se convertit sans option de génération")
+        if is_stdio(args.output):
+            parser.error("une archive zip produit un .dat par membre, pas un flux")
+        args.output = args.output or "."
+        return args
+
+    args.output = args.patch or args.output or OUTPUT_FILE
+
+    # Le .dat est lu en place (ERO, cache, index, --verify) : seul le CSV
+    # d'audit se compresse.
+    if is_compressed_name(args.output):
+        parser.error(f"le .dat ne se compresse pas : '{args.output}' (.gz/.xz réservés au CSV d'audit)")
+    return args
 
 
 # ===========================================================================
 # LOGIQUE PRINCIPALE
 # ===========================================================================
 
-def main():
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERREUR : Fichier source '{INPUT_FILE}' introuvable.")
-        return
+def generate(args, transcoder, stats):
+    """Génère (ou patche) le .dat à partir du CSV ; retourne le nombre d'enregistrements."""
+    phase = stats.phase if stats is not None else contextlib.nullcontext
 
-    print("--- GÉNÉRATION DE BINAIRE ERO (V7 - Anti-BOM) ---")
-    print(f"Source : {INPUT_FILE}")
-    print(f"Cible  : {OUTPUT_FILE}")
+    # ------------------------------------------------------------------
+    # Détection de l'encodage avant toute écriture : BOM → utf-8-sig
+    # (les 3 octets EF BB BF sont absorbés), UTF-8 valide → utf-8,
+    # sinon export ANSI → latin-1.  Un CSV gzip/xz est décompressé à la
+    # volée, sans fichier intermédiaire.
+    # ------------------------------------------------------------------
+    with phase("open"):
+        f_in = open_csv(args.input)
+    print(f"Encodage : {f_in.encoding}")
 
     # ------------------------------------------------------------------
-    # Ouverture du CSV avec gestion automatique du BOM.
-    # utf-8-sig est la clé : les 3 octets EF BB BF sont absorbés
-    # silencieusement si présents.  En cas d'échec, fallback latin-1.
+    # Sortie sur disque : fichier temporaire préalloué (majorant tiré du
+    # nombre de lignes du CSV), mappé, puis substitué à la cible d'un seul
+    # os.replace().  Le logiciel ERO ne voit jamais un .dat à moitié
+    # écrit, et un .dat issu du cache (lien dur) n'est pas écrasé.
     # ------------------------------------------------------------------
-    try:
-        f_in = open(INPUT_FILE, "r", newline="", encoding=CSV_ENCODING)
-    except UnicodeDecodeError:
-        print("Avertissement : échec lecture UTF-8, tentative en Latin-1...")
-        f_in = open(INPUT_FILE, "r", newline="", encoding="latin-1")
+    if not args.patch and not is_stdio(args.output):
+        with phase("open"):
+            capacity = count_lines(args.input)
+    else:
+        capacity = 0
+
+    if args.layout is not DEFAULT_LAYOUT:
+        print(f"Disposition : {args.layout.name}")
+
+    with f_in:
+        if args.pipeline:
+            # ----------------------------------------------------------
+            # Pipeline : lecture brute, encodage et écriture se
+            # recouvrent, via des files bornées.  Sortie identique au
+            # mode séquentiel.
+            # ----------------------------------------------------------
+            with open_dat_output(args.output, capacity, args.layout) as f_out:
+                return write_dat_pipelined(f_in.buffer, f_out, args.queue_depth,
+                                           encoding=f_in.encoding, transcoder=transcoder,
+                                           stats=stats, layout=args.layout)
+
+        rows = csv.reader(f_in, delimiter=CSV_DELIMITER)
+
+        if args.patch:
+            # ----------------------------------------------------------
+            # Patch : seuls les blocs qui diffèrent du .dat existant sont
+            # réécrits ; ajouts en fin de fichier, suppressions par
+            # troncature.
+            # ----------------------------------------------------------
+            result = patch_dat(args.output, HEADER_BYTES + BUFFER_BYTES,
+                               encode_records(rows, transcoder=transcoder, stats=stats))
 
-    with f_in, open(OUTPUT_FILE, "wb") as f_out:
-        reader = csv.reader(f_in, delimiter=";")
+            print(f"Patch  : {result.touched} blocs touchés ({result.modified} modifiés, "
+                  f"{result.appended} ajoutés, {result.removed} supprimés)"
+                  f"{', en-tête réécrit' if result.header else ''}")
+            return result.records
 
         # --------------------------------------------------------------
-        # Injection de la structure en-tête (offsets 0–52).
+        # En-tête (offsets 0–52) puis blocs de 31 octets
+        # [payload … \x00 … padding 0xCD], par lots.
         # --------------------------------------------------------------
-        f_out.write(HEADER_BYTES)
-        f_out.write(BUFFER_BYTES)
+        with open_dat_output(args.output, capacity, args.layout) as f_out:
+            return write_dat(rows, f_out, transcoder, stats, args.layout)
 
-        count = 0
 
-        for row in reader:
-            if not row or len(row) < 2:
-                continue
+def convert_archive(args):
+    """Convertit chaque membre .csv d'une archive zip, sans extraction sur disque."""
+    jobs = plan_batch("csv2dat", args.input, args.output)
 
-            # ----------------------------------------------------------
-            # Nettoyage des champs bruts (espaces parasites).
-            # ----------------------------------------------------------
-            code_brut  = row[0].strip()
-            texte_brut = row[1].strip()
+    if not jobs:
+        print(f"ERREUR : aucun .csv dans l'archive '{args.input}'.")
+        return
 
-            # Concaténation : "code texte"
-            full_string = f"{code_brut} {texte_brut}"
+    os.makedirs(args.output, exist_ok=True)
+    report_batch("csv2dat", jobs)
 
-            # ----------------------------------------------------------
-            # Construction du bloc de 31 octets
-            #   [payload … \x00 … padding 0xCD]
-            #
-            #   payload  : contenu encodé en latin-1, max 30 octets.
-            #   \x00     : terminateur de chaîne (1 octet).
-            #   padding  : remplissage avec 0xCD jusqu'à 31 octets.
-            # ----------------------------------------------------------
-            max_content_len = BLOCK_SIZE - 1  # 30 octets utiles max
 
-            payload = full_string.encode(DAT_ENCODING, errors="replace")[:max_content_len]
+def watch(args):
+    """Surveillance : régénère le .dat à chaque enregistrement du CSV, jusqu'à Ctrl+C."""
+    print("--- SURVEILLANCE DU CSV (V7 - Anti-BOM) ---")
+    print(f"Source : {args.input}")
+    print(f"Cible  : {args.output}")
+    print(f"Relevé : toutes les {args.interval:g} s, régénération après {args.debounce:g} s "
+          f"sans changement (Ctrl+C pour arrêter)")
+
+    watcher = Watcher(args.input, args.output, None if args.no_translit else LATIN1_TABLE,
+                      args.layout, args.debounce)
 
-            padding_len = BLOCK_SIZE - len(payload) - 1
-            padding     = b"\xCD" * padding_len if padding_len > 0 else b""
+    def report(records):
+        changes = ".dat remplacé" if watcher.swapped else "contenu inchangé, rien d'écrit"
+        print(f"[{time.strftime('%H:%M:%S')}] {records} enregistrements : {changes}")
+        print(f"           Latin-1 : {watcher.transcoder.summary()}")
 
-            final_block = payload + b"\x00" + padding
+        if args.index and watcher.swapped:
+            index = build_index(args.output)
+            print(f"           Index  : {index_path(args.output)} ({len(index)} codes)")
 
-            # Sécurité : garantie de la taille exacte.
-            if len(final_block) != BLOCK_SIZE:
-                final_block = final_block[:BLOCK_SIZE]
+    def error(exc):
+        print(f"[{time.strftime('%H:%M:%S')}] ERREUR : {exc} (nouvel essai au prochain enregistrement)")
 
-            f_out.write(final_block)
-            count += 1
+    try:
+        watcher.run(args.interval, report, error)
+    except KeyboardInterrupt:
+        print("--- ARRÊT ---")
+        print(f"{watcher.builds} régénérations ; {args.output} est à jour.")
+
+
+def convert(args):
+    """Conversion complète : cache, génération ou patch, index."""
+    if args.archive:
+        return convert_archive(args)
+
+    if not is_stdio(args.input) and not os.path.exists(args.input):
+        print(f"ERREUR : Fichier source '{args.input}' introuvable.")
+        return
+
+    if args.watch:
+        return watch(args)
+
+    if args.patch and not os.path.exists(args.output):
+        print(f"ERREUR : Fichier à patcher '{args.output}' introuvable.")
+        return
+
+    print("--- GÉNÉRATION DE BINAIRE ERO (V7 - Anti-BOM) ---")
+    print(f"Source : {args.input}")
+    print(f"Cible  : {args.output}{' (patch en place)' if args.patch else ''}")
+
+    # ------------------------------------------------------------------
+    # Cache : un CSV déjà converti (même contenu, même format) est
+    # matérialisé directement depuis le cache, sans ré-encodage.
+    # ------------------------------------------------------------------
+    cache = key = count = None
+    transcoder = Transcoder(None if args.no_translit else LATIN1_TABLE, keep_details=bool(args.report))
+    stats = RunStats(args.hooks) if args.stats or args.hooks else None
+    phase = stats.phase if stats is not None else contextlib.nullcontext
+
+    # Le rapport de transcodage exige un vrai passage dans l'encodeur.
+    if args.cache:
+        cache = BuildCache(args.cache_dir, args.cache_size << 20)
+        key = cache.key_for(args.input, "raw" if args.no_translit else "")
+
+        if not args.report:
+            with phase("cache"):
+                count = cache.materialize(key, args.output)
+
+        print(f"Cache  : {'réutilisé' if count is not None else 'absent'} ({key[:12]})")
+
+    if count is None:
+        count = generate(args, transcoder, stats)
+
+        if cache is not None:
+            cache.put(key, args.output)
+
+        # --------------------------------------------------------------
+        # Bilan du transcodage latin-1 : plus aucune perte silencieuse.
+        # --------------------------------------------------------------
+        print(f"Latin-1 : {transcoder.summary()}")
+
+        if args.report:
+            transcoder.write_report(args.report)
+            print(f"Rapport : {args.report} ({len(transcoder.details)} lignes)")
+
+    # ------------------------------------------------------------------
+    # Index annexe code → enregistrement, bâti sur le .dat final.
+    # ------------------------------------------------------------------
+    if args.index:
+        index = build_index(args.output)
+        print(f"Index  : {index_path(args.output)} ({len(index)} codes)")
 
     print("--- SUCCÈS ---")
     print(f"{count} enregistrements écrits sans BOM parasite.")
+    layout = args.layout
+    print(f"Taille : {layout.dat_size(count)} octets "
+          f"({layout.start_offset} + {layout.record_size} × {count})")
+
+    # ------------------------------------------------------------------
+    # Mesures : volumes, compteurs de l'encodeur, bilan par phase.
+    # ------------------------------------------------------------------
+    if stats is not None:
+        stats.records   = count
+        stats.bytes_in  = None if is_stdio(args.input) else os.path.getsize(args.input)
+        stats.bytes_out = layout.dat_size(count)
+        for kind, n in transcoder.counts.items():
+            stats.count(kind, n)
+        stats.finish()
+
+        if args.stats:
+            print(stats.to_json() if args.stats == "json" else stats.summary())
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Avec un .dat sur stdout, les messages passent sur stderr.
+    with contextlib.redirect_stdout(sys.stderr if is_stdio(args.output) else sys.stdout):
+        convert(args)
 
 
 # ===========================================================================
@@ -4,98 +4,240 @@
 # V7 — Détection de BOM résiduel dans l'en-tête.
 # ---------------------------------------------------------------------------
 
-import csv
+import argparse
+import contextlib
+import io
+import json
 import os
 import sys
 
+from ero_converter.batch import plan_batch, report_batch
+from ero_converter.columnar import CODE_KINDS, export_columns
+from ero_converter.compress import compression_of, is_archive, open_input, open_output
+from ero_converter.decoder import has_bom, read_header, sniff_layout, write_csv, write_csv_parallel
+from ero_converter.layout import DEFAULT_LAYOUT, LAYOUTS_ENV, get_layout, load_layouts
+from ero_converter.stats import RunStats, load_hook
+from ero_converter.stdio import is_seekable, is_stdio, prepend
+from ero_converter.verify import verify_dat
+
 
 # ===========================================================================
 # CONFIGURATION
 # ===========================================================================
 
-# Résolution de l'entrée : argument CLI > fichier par défaut.
-if len(sys.argv) > 1:
-    INPUT_FILE = sys.argv[1]
-else:
-    INPUT_FILE = "categori_corrected.dat"
-
-OUTPUT_FILE   = "export_audit_v7.csv"
-BLOCK_SIZE    = 31              # Taille fixe d'un enregistrement en octets.
-START_OFFSET  = 52              # Fin de l'en-tête (Header 16 + Buffer 36).
-ENCODING      = "latin-1"       # Encodage du fichier binaire source.
-
-# Signature du BOM UTF-8 — utilisée pour la vérification d'intégrité.
-BOM_UTF8 = b"\xef\xbb\xbf"
+OUTPUT_FILE = "export_audit_v7.csv"
+COLUMNS_DIR = "export_audit_v7.cols"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction et audit du fichier binaire ERO vers CSV.")
+    parser.add_argument("input", nargs="?", default="categori_corrected.dat",
+                        help=".dat à auditer (gzip, xz ou archive zip acceptés), « - » pour stdin "
+                             "(défaut : categori_corrected.dat)")
+    parser.add_argument("output", nargs="?",
+                        help=f"CSV produit, « - » pour stdout (défaut : {OUTPUT_FILE}) ; "
+                             "répertoire cible pour une archive zip (défaut : .)")
+    parser.add_argument("--compress", choices=("gz", "xz"),
+                        help="compresse le CSV produit (implicite si son nom finit par .gz ou .xz)")
+    parser.add_argument("--mode", choices=("numpy", "mmap", "stream"),
+                        help="mode de lecture (défaut : numpy si disponible, sinon mmap)")
+    parser.add_argument("--layout", default="auto", metavar="NOM",
+                        help="disposition du .dat, ou auto pour la détecter (défaut : %(default)s)")
+    parser.add_argument("--layouts", default=os.environ.get(LAYOUTS_ENV), metavar="FICHIER.json",
+                        help=f"dispositions supplémentaires (défaut : variable {LAYOUTS_ENV})")
+    parser.add_argument("--verify", action="store_true",
+                        help="vérifie la structure de chaque bloc sans produire de CSV (rapport JSON)")
+    parser.add_argument("--columns", action="store_true",
+                        help=f"exporte des colonnes .npy mappables dans un répertoire, au lieu "
+                             f"d'un CSV (défaut : {COLUMNS_DIR})")
+    parser.add_argument("--codes", choices=CODE_KINDS, default="auto",
+                        help="--columns : colonne des codes entière, en octets, ou selon les "
+                             "codes (défaut : %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="décode le fichier par plages sur N processus (0 : nombre de cœurs)")
+    parser.add_argument("--stats", nargs="?", const="text", choices=("text", "json"),
+                        help="temps par phase, débits, volumes et compteurs (json : une ligne JSON)")
+    parser.add_argument("--stats-hook", action="append", default=[], metavar="MODULE:FONCTION",
+                        help="crochet appelé autour de chaque phase mesurée (profileur, supervision)")
+    args = parser.parse_args(argv)
+
+    try:
+        args.hooks = [load_hook(spec) for spec in args.stats_hook]
+    except (ImportError, AttributeError, ValueError) as exc:
+        parser.error(f"--stats-hook : {exc}")
+
+    try:
+        if args.layouts:
+            load_layouts(args.layouts)
+        args.layout = None if args.layout == "auto" else get_layout(args.layout)
+    except (OSError, ValueError) as exc:
+        parser.error(f"--layout : {exc}")
+
+    # Le contrôle structurel ne connaît que la géométrie ERO V7.
+    if args.verify and args.layout not in (None, DEFAULT_LAYOUT):
+        parser.error(f"--verify exige la disposition {DEFAULT_LAYOUT.name}")
+
+    if args.columns and (args.verify or args.jobs != 1 or args.compress or is_stdio(args.output)):
+        parser.error("--columns écrit un répertoire : ni --verify, ni --jobs, ni --compress, ni stdout")
+
+    # Le contrôle et le décodage parallèle mappent le fichier : pas de tube.
+    if is_stdio(args.input) and (args.verify or args.jobs != 1):
+        parser.error("--verify et --jobs exigent un .dat sur disque, pas stdin")
+
+    # Archive zip : chaque membre .dat donne un CSV dans le répertoire
+    # cible, -j fixant le nombre de processus.
+    args.archive = is_archive(args.input)
+    args.suffix = f".{args.compress}" if args.compress else ""
+
+    if args.archive:
+        if (args.verify or args.stats or args.hooks or args.layout or args.columns
+                or is_stdio(args.output)):
+            parser.error("une archive zip produit un CSV par membre "
+                         "(ni --verify, ni --stats, ni --layout, ni --columns, ni flux)")
+        args.output = args.output or "."
+        return args
+
+    args.output = args.output or (COLUMNS_DIR if args.columns else OUTPUT_FILE + args.suffix)
+
+    if (args.verify or args.jobs != 1) and not is_stdio(args.input) and os.path.isfile(args.input) \
+            and compression_of(args.input):
+        parser.error("--verify et --jobs exigent un .dat non compressé")
+
+    return args
 
 
 # ===========================================================================
 # LOGIQUE PRINCIPALE
 # ===========================================================================
 
-def main():
-    if not os.path.exists(INPUT_FILE):
-        print(f"Erreur : Fichier '{INPUT_FILE}' introuvable.")
+def audit_archive(args):
+    """Extrait chaque membre .dat d'une archive zip, sans extraction sur disque."""
+    jobs = plan_batch("dat2csv", args.input, args.output, args.suffix)
+
+    if not jobs:
+        print(f"Erreur : aucun .dat dans l'archive '{args.input}'.")
         return
 
+    os.makedirs(args.output, exist_ok=True)
+    return 1 if report_batch("dat2csv", jobs, args.jobs or None) else 0
+
+
+def audit(args):
+    """Vérification ou extraction complète ; retourne le code de sortie éventuel."""
+    if not is_stdio(args.input) and not os.path.exists(args.input):
+        print(f"Erreur : Fichier '{args.input}' introuvable.")
+        return
+
+    if args.archive:
+        return audit_archive(args)
+
+    if args.verify:
+        # --------------------------------------------------------------
+        # Vérification structurelle : rapport JSON, code de sortie non
+        # nul si le fichier n'est pas conforme.
+        # --------------------------------------------------------------
+        report = verify_dat(args.input)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0 if report["ok"] else 1
+
     print("--- AUDIT BINAIRE ERO ---")
-    print(f"Lecture de : {INPUT_FILE}")
+    print(f"Lecture de : {args.input}")
+
+    stats = RunStats(args.hooks) if args.stats or args.hooks else None
+    phase = stats.phase if stats is not None else contextlib.nullcontext
 
-    with open(INPUT_FILE, "rb") as f_in, \
-         open(OUTPUT_FILE, "w", newline="", encoding=ENCODING) as f_out:
+    # Un .dat gzip/xz est décompressé à la volée et lu comme un tube.
+    with phase("open"):
+        f_in, compression = open_input(args.input)
+    if compression:
+        print(f"Compression : {compression}")
 
-        writer = csv.writer(f_out, delimiter=";")
+    with f_in:
 
         # --------------------------------------------------------------
-        # Lecture et validation de l'en-tête (52 premiers octets).
+        # Disposition : imposée, ou détectée d'après la signature et la
+        # taille du fichier (ERO V7 si rien ne correspond).
         # --------------------------------------------------------------
-        header = f_in.read(START_OFFSET)
+        layout = args.layout
+        if layout is None:
+            with phase("open"):
+                layout, f_in = sniff_layout(f_in)
+        if layout is not DEFAULT_LAYOUT:
+            print(f"Disposition : {layout.name}")
 
-        if len(header) < START_OFFSET:
+        # --------------------------------------------------------------
+        # Lecture et validation de l'en-tête (52 premiers octets).
+        # --------------------------------------------------------------
+        try:
+            with phase("open"):
+                header = read_header(f_in, layout)
+        except ValueError:
             print("Erreur : fichier trop court ou sans en-tête valide.")
             return
 
         # Détection de BOM UTF-8 résiduel dans la zone en-tête.
         # Si présent, le fichier a été corrompu avant la V7.
-        if BOM_UTF8 in header:
+        if has_bom(header):
             print("ALERTE CRITIQUE : des octets BOM (EF BB BF) ont été détectés dans l'en-tête !")
 
+        # Retour au début : rembobinage, ou en-tête rejoué sur un tube.
+        if is_seekable(f_in):
+            f_in.seek(0)
+        else:
+            f_in = prepend(header, f_in)
+
         # --------------------------------------------------------------
-        # Lecture séquentielle des blocs de données.
+        # Lecture des blocs de données, par lots.
         # --------------------------------------------------------------
-        count = 0
-
-        while True:
-            block = f_in.read(BLOCK_SIZE)
-
-            # Fin du fichier ou bloc incomplet → on arrête.
-            if not block or len(block) < BLOCK_SIZE:
-                break
+        if args.columns:
+            # Colonnes codes / textes / index de bloc, en .npy mappables.
+            try:
+                count = export_columns(f_in, args.output, args.mode, layout, args.codes, stats)
+            except ValueError as exc:
+                print(f"Erreur : {exc}")
+                return 1
+        elif args.jobs != 1:
+            # Plages décodées en parallèle, recollées dans l'ordre.
+            with open_output(args.output, args.suffix) as f_out:
+                count = write_csv_parallel(args.input, f_out, args.jobs or None, args.mode,
+                                           stats=stats, layout=layout)
+        else:
+            with open_output(args.output, args.suffix) as f_raw, \
+                    io.TextIOWrapper(f_raw, encoding=layout.encoding, newline="") as f_out:
+                count = write_csv(f_in, f_out, args.mode, stats, layout)
 
-            # Extraction du contenu : tout ce qui précède le premier \x00.
-            null_idx = block.find(b"\x00")
-            content_bytes = block[:null_idx] if null_idx != -1 else block
+    print("--- TERMINÉ ---")
+    print(f"{count} lignes extraites vers {args.output}")
 
-            full_text = content_bytes.decode(ENCODING).strip()
+    # ------------------------------------------------------------------
+    # Mesures : volumes et bilan par phase.  Sur stdin, la taille lue se
+    # déduit des blocs décodés (52 + 31 × n).
+    # ------------------------------------------------------------------
+    if stats is not None:
+        stats.records   = count
+        stats.bytes_in  = (layout.dat_size(count + stats.counters.get("empty_blocks", 0))
+                           if is_stdio(args.input) else os.path.getsize(args.input))
+        if is_stdio(args.output):
+            stats.bytes_out = None
+        elif args.columns:
+            stats.bytes_out = sum(os.path.getsize(os.path.join(args.output, name))
+                                  for name in os.listdir(args.output))
+        else:
+            stats.bytes_out = os.path.getsize(args.output)
+        stats.finish()
 
-            # Bloc vide après décodage → on passe au suivant.
-            if not full_text:
-                continue
+        if args.stats:
+            print(stats.to_json() if args.stats == "json" else stats.summary())
 
-            # ----------------------------------------------------------
-            # Séparation code / texte sur le premier espace.
-            #   "0042 Catégorie X"  →  ["0042", "Catégorie X"]
-            # ----------------------------------------------------------
-            parts = full_text.split(" ", 1)
 
-            if len(parts) == 2:
-                writer.writerow([parts[0], parts[1]])
-            else:
-                writer.writerow([parts[0], ""])
+def main(argv=None):
+    args = parse_args(argv)
 
-            count += 1
+    # Avec un CSV sur stdout, les messages passent sur stderr.
+    to_stderr = is_stdio(args.output) and not args.verify
 
-    print("--- TERMINÉ ---")
-    print(f"{count} lignes extraites vers {OUTPUT_FILE}")
+    with contextlib.redirect_stdout(sys.stderr if to_stderr else sys.stdout):
+        return audit(args)
 
 
 # ===========================================================================
@@ -103,4 +245,4 @@ def main():
 # ===========================================================================
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# ero_client.py
+# Client léger du démon de conversion (python -m ero_converter.daemon).
+# N'importe pas le paquet : seul le repli, démon absent, le charge.
+# ---------------------------------------------------------------------------
+
+import argparse
+import gzip
+import json
+import lzma
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+
+# ===========================================================================
+# CONFIGURATION (identique à ero_converter/daemon.py)
+# ===========================================================================
+
+SOCKET_PATH = os.environ.get("ERO_DAEMON_SOCKET") or os.path.join(
+    tempfile.gettempdir(), f"ero_converter-{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+HOST        = "127.0.0.1"
+FRAME       = struct.Struct(">IQ")  # Longueur de l'en-tête JSON, de la charge utile.
+
+
+# ===========================================================================
+# PROTOCOLE
+# ===========================================================================
+
+def _recv_exact(sock, size):
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise EOFError("le démon a fermé la connexion")
+        received += n
+
+    return bytes(data)
+
+
+def connect(socket_path=None, port=None, timeout=None):
+    """Connexion au démon ; OSError s'il n'écoute pas."""
+    if port is not None:
+        sock = socket.create_connection((HOST, port), timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path or SOCKET_PATH)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(sock, header, payload=b""):
+    """Envoie une requête sur une connexion ouverte ; retourne (réponse, charge utile).
+
+    Une même connexion sert autant de requêtes que voulu : un appelant
+    persistant ne paie ni démarrage d'interpréteur ni connexion.
+    """
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(FRAME.pack(len(encoded), len(payload)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+    header_len, payload_len = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    response = json.loads(_recv_exact(sock, header_len).decode("utf-8"))
+    return response, _recv_exact(sock, payload_len)
+
+
+def convert(op, source=None, target=None, payload=b"", options=None,
+            socket_path=None, port=None, fallback=True):
+    """Une conversion par le démon ; retourne (réponse, charge utile, 'démon'|'local').
+
+    Sans `source`, `payload` est l'entrée ; sans `target`, la sortie est
+    rendue en charge utile.  Si le démon ne répond pas et que `fallback`
+    est vrai, la conversion est faite dans ce processus.
+    """
+    header = {
+        "op": op,
+        "source": os.path.abspath(source) if source else None,
+        "target": os.path.abspath(target) if target else None,
+        "options": options or {},
+    }
+
+    try:
+        sock = connect(socket_path, port)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not fallback:
+            raise
+        from ero_converter.daemon import run_request
+        return run_request(header, payload) + ("local",)
+
+    # En TCP, le démon n'accède à aucun fichier : le client lit la source
+    # et écrit la sortie lui-même.
+    if port is not None:
+        if source:
+            with open(source, "rb") as f_in:
+                payload = f_in.read()
+        with sock:
+            response, data = request(sock, dict(header, source=None, target=None), payload)
+        if target and response.get("ok"):
+            write_local(target, data, compress=op == "dat2csv")
+            data = b""
+        return response, data, "démon"
+
+    with sock:
+        return request(sock, header, payload) + ("démon",)
+
+
+def write_local(path, data, compress=True):
+    """Écrit la sortie reçue du démon, compressée selon l'extension, puis substituée.
+
+    Seul le CSV d'audit se compresse (`compress`) : un .dat reste en clair.
+    """
+    suffix = os.path.splitext(path)[1].lower() if compress else ""
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, "wb") as f_out:
+        f_out.write(gzip.compress(data) if suffix == ".gz"
+                    else lzma.compress(data) if suffix == ".xz" else data)
+    os.replace(tmp, path)
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Conversion CSV ⟷ .dat par le démon ERO (repli local s'il est absent).")
+    parser.add_argument("op", choices=("csv2dat", "dat2csv"))
+    parser.add_argument("input", help="fichier source, ou « - » pour stdin")
+    parser.add_argument("output", help="fichier produit, ou « - » pour stdout")
+    parser.add_argument("--no-translit", action="store_true",
+                        help="csv2dat : pas de translittération Latin-1")
+    parser.add_argument("--mode", choices=("mmap", "numpy", "stream"),
+                        help="dat2csv : moteur de lecture")
+    parser.add_argument("--stats", nargs="?", const="text", choices=("text", "json"),
+                        help="mesures de la conversion sur stderr")
+    parser.add_argument("--socket", metavar="CHEMIN",
+                        help=f"socket Unix du démon (défaut : {SOCKET_PATH})")
+    parser.add_argument("--port", type=int, help=f"démon en TCP sur {HOST}:PORT")
+    parser.add_argument("--no-fallback", action="store_true",
+                        help="échoue si le démon ne répond pas, au lieu de convertir ici")
+    args = parser.parse_args(argv)
+
+    if args.op == "csv2dat" and os.path.splitext(args.output)[1].lower() in (".gz", ".xz"):
+        parser.error(f"le .dat ne se compresse pas : '{args.output}'")
+
+    options = {"no_translit": args.no_translit, "mode": args.mode}
+    source  = None if args.input == "-" else args.input
+    target  = None if args.output == "-" else args.output
+    payload = sys.stdin.buffer.read() if source is None else b""
+
+    start = time.perf_counter()
+    try:
+        response, data, via = convert(args.op, source, target, payload, options,
+                                      args.socket, args.port, not args.no_fallback)
+    except OSError as exc:
+        print(f"ERREUR : démon injoignable ({exc})", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+
+    if not response.get("ok"):
+        print(f"ERREUR : {response.get('error')}", file=sys.stderr)
+        return 1
+
+    if target is None:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    print(f"{args.op} : {response['records']:,} enregistrements ({via}, {elapsed * 1000:.1f} ms)",
+          file=sys.stderr)
+    if args.stats == "json":
+        print(json.dumps(response["stats"], ensure_ascii=False, sort_keys=True), file=sys.stderr)
+    elif args.stats:
+        stats = response["stats"]
+        print(f"Durée de conversion : {stats['wall_s']:.3f} s, "
+              f"{stats['records_per_s'] or 0:,.0f} enr./s", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
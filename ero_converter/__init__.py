@@ -0,0 +1,22 @@
+# ---------------------------------------------------------------------------
+# ero_converter
+# Bibliothèque de conversion entre CSV et fichiers binaires ERO (.dat).
+# ---------------------------------------------------------------------------
+
+from .datfile import EroDatFile, decode_record
+from .decoder import dat_to_csv, iter_dat_records, write_csv
+from .encoder import csv_to_dat, encode_records, iter_csv_rows, write_dat
+from .patch import patch_dat
+
+__all__ = [
+    "EroDatFile",
+    "csv_to_dat",
+    "dat_to_csv",
+    "decode_record",
+    "encode_records",
+    "iter_csv_rows",
+    "iter_dat_records",
+    "patch_dat",
+    "write_csv",
+    "write_dat",
+]
@@ -0,0 +1,235 @@
+# ---------------------------------------------------------------------------
+# ero_converter/batch.py
+# Conversion par lots de répertoires entiers, répartie sur plusieurs processus.
+# ---------------------------------------------------------------------------
+
+import argparse
+import csv
+import glob
+import io
+import lzma
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .compress import (archive_members, input_size, is_archive, open_input, open_output,
+                       strip_suffix)
+from .decoder import sniff_layout, write_csv
+from .encoder import iter_csv_rows, open_csv, write_dat
+from .layout import LAYOUTS_ENV, load_layouts
+from .mapped import count_lines, is_mapped, open_dat_output
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+# Sens de conversion : (extension source, extension cible).
+DIRECTIONS = {
+    "csv2dat": (".csv", ".dat"),
+    "dat2csv": (".dat", ".csv"),
+}
+
+# Erreurs d'une conversion : rapportées dans le résultat, jamais propagées.
+CONVERSION_ERRORS = (OSError, EOFError, ValueError, csv.Error, lzma.LZMAError, zipfile.BadZipFile)
+
+
+# ===========================================================================
+# CONVERSION D'UN FICHIER (exécutée dans un processus de travail)
+# ===========================================================================
+
+class FileResult:
+    """Bilan de la conversion d'un fichier."""
+
+    def __init__(self, source, target):
+        self.source    = source_name(source)
+        self.target    = target
+        self.records   = 0
+        self.bytes_in  = 0
+        self.bytes_out = 0
+        self.seconds   = 0.0
+        self.error     = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def convert_file(direction, source, target):
+    """Convertit un fichier dans le sens donné ; retourne un FileResult."""
+    result = FileResult(source, target)
+    start = time.perf_counter()
+
+    # Sources gzip/xz et membres d'archive zip décompressés à la volée ;
+    # CSV d'audit compressé si son extension est .gz ou .xz, .dat
+    # toujours en clair, préalloué et substitué atomiquement.
+    try:
+        if direction == "csv2dat":
+            with open_csv(source) as f_in, open_dat_output(target, count_lines(source)) as f_out:
+                result.records = write_dat(iter_csv_rows(f_in), f_out)
+        else:
+            # Disposition détectée fichier par fichier : un lot peut mêler
+            # plusieurs variantes de .dat.
+            f_in, _ = open_input(source)
+            layout, f_in = sniff_layout(f_in)
+            with f_in, open_output(target) as f_raw, \
+                    io.TextIOWrapper(f_raw, encoding=layout.encoding, newline="") as f_out:
+                result.records = write_csv(f_in, f_out, layout=layout)
+
+        result.bytes_in  = input_size(source)
+        result.bytes_out = os.path.getsize(target)
+    except CONVERSION_ERRORS as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
+
+        # Pas de fichier partiel laissé derrière un échec ; un .dat mappé
+        # n'a pas remplacé la cible.
+        if not (direction == "csv2dat" and is_mapped(target)) and os.path.exists(target):
+            os.remove(target)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+# ===========================================================================
+# PLANIFICATION DU LOT
+# ===========================================================================
+
+def source_name(source):
+    """Nom affichable d'une source : chemin, ou 'archive.zip:membre'."""
+    return ":".join(source) if isinstance(source, tuple) else source
+
+
+def plan_batch(direction, source, output_dir, suffix=""):
+    """Liste des couples (source, cible) pour un répertoire, un motif glob ou une archive zip.
+
+    Chaque fichier source `nom.ext` (éventuellement `nom.ext.gz` ou
+    `nom.ext.xz`) donne `output_dir/nom.ext_cible` + `suffix` ; une
+    archive zip donne un couple ((archive, membre), cible) par membre.
+    """
+    src_ext, dst_ext = DIRECTIONS[direction]
+
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if strip_suffix(name).lower().endswith(src_ext) or name.lower().endswith(".zip")
+        )
+    else:
+        paths = sorted(glob.glob(source))
+
+    sources = []
+
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        if is_archive(path):
+            sources.extend((path, member) for member in archive_members(path, src_ext))
+        else:
+            sources.append(path)
+
+    jobs = []
+    targets = {}
+
+    for src in sources:
+        name = src[1] if isinstance(src, tuple) else src
+        stem = os.path.splitext(strip_suffix(os.path.basename(name)))[0]
+        target = os.path.join(output_dir, stem + dst_ext + suffix)
+
+        if target in targets:
+            raise ValueError(f"'{source_name(src)}' et '{source_name(targets[target])}' "
+                             f"produiraient le même fichier '{target}'.")
+
+        targets[target] = src
+        jobs.append((src, target))
+
+    return jobs
+
+
+def run_batch(direction, jobs, workers=None):
+    """Convertit tous les fichiers ; produit les FileResult dans l'ordre des jobs.
+
+    Avec un seul processus de travail, la conversion reste dans le
+    processus courant.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(jobs) <= 1:
+        for source, target in jobs:
+            yield convert_file(direction, source, target)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(convert_file, direction, source, target) for source, target in jobs]
+        for future in futures:
+            yield future.result()
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def report_batch(direction, jobs, workers=None):
+    """Convertit les jobs en affichant un bilan par fichier puis le débit ; retourne le nombre d'échecs."""
+    print(f"--- CONVERSION PAR LOTS ({direction}) ---")
+    print(f"{len(jobs)} fichiers, {workers or os.cpu_count()} processus")
+
+    start = time.perf_counter()
+    records = bytes_in = failed = 0
+
+    for result in run_batch(direction, jobs, workers):
+        if result.ok:
+            records  += result.records
+            bytes_in += result.bytes_in
+            print(f"OK    {result.source} → {result.target} "
+                  f"({result.records} enregistrements, {result.seconds:.3f} s)")
+        else:
+            failed += 1
+            print(f"ÉCHEC {result.source} : {result.error}")
+
+    elapsed = time.perf_counter() - start
+
+    print("--- TERMINÉ ---")
+    print(f"{len(jobs) - failed}/{len(jobs)} fichiers convertis, {records} enregistrements "
+          f"en {elapsed:.2f} s ({records / elapsed:,.0f} enr./s, "
+          f"{bytes_in / elapsed / 1e6:.1f} Mo/s en entrée)")
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ero_converter.batch",
+        description="Conversion par lots CSV ⟷ .dat sur plusieurs processus.")
+    parser.add_argument("direction", choices=sorted(DIRECTIONS), help="sens de conversion")
+    parser.add_argument("source", help="répertoire d'entrée, motif glob (ex. 'sites/*.csv') ou archive zip")
+    parser.add_argument("output_dir", help="répertoire de sortie (créé si besoin)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--compress", choices=("gz", "xz"),
+                        help="compresse les fichiers produits")
+    parser.add_argument("--layouts", default=os.environ.get(LAYOUTS_ENV), metavar="FICHIER.json",
+                        help=f"dat2csv : dispositions supplémentaires à reconnaître "
+                             f"(défaut : variable {LAYOUTS_ENV})")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.layouts:
+            load_layouts(args.layouts)
+        jobs = plan_batch(args.direction, args.source, args.output_dir,
+                          f".{args.compress}" if args.compress else "")
+    except (OSError, ValueError, zipfile.BadZipFile) as exc:
+        print(f"ERREUR : {exc}")
+        return 2
+
+    if not jobs:
+        print(f"ERREUR : aucun fichier à convertir dans '{args.source}'.")
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    return 1 if report_batch(args.direction, jobs, args.workers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
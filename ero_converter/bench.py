@@ -0,0 +1,271 @@
+# ---------------------------------------------------------------------------
+# ero_converter/bench.py
+# Banc de mesure : jeux de données synthétiques, débits et seuils de régression.
+# ---------------------------------------------------------------------------
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .compress import open_output
+from .datfile import ENCODING
+from .decoder import np, write_csv
+from .encoder import iter_csv_rows, write_dat
+from .mapped import count_lines, open_dat_output
+from .stats import peak_rss_mb
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+PHASES       = ("csv2dat", "dat2csv", "roundtrip")
+RESULTS_FMT  = 1                # Version du format JSON des résultats.
+DEFAULT_SIZES = "10k,100k,1M"
+
+# Vocabulaire des textes synthétiques : français courant (accents latin-1),
+# typographie d'Excel et quelques caractères hors latin-1.
+WORDS = (
+    "Catégorie", "Matériel", "Électricité", "Sécurité", "Hôtel", "Prêt", "Façade",
+    "Entretien", "Réseau", "Câblage", "Dépôt", "Œuvre", "Cœur", "Août", "Noël",
+    "général", "spécifique", "à", "de", "et", "pour", "les", "du", "intérieur",
+    "extérieur", "zone", "bâtiment", "étage", "réf.", "n°", "HT", "TTC",
+)
+TYPOGRAPHIC = ("’", "“", "”", "–", "—", "€", "…", " ", " ", "œ")
+NON_LATIN   = ("日本", "Ж", "Ω", "✓", "😀")
+
+
+# ===========================================================================
+# JEUX DE DONNÉES SYNTHÉTIQUES
+# ===========================================================================
+
+def parse_size(text):
+    """'10k' → 10000, '2M' → 2000000."""
+    text = text.strip().lower()
+    factor = {"k": 10 ** 3, "m": 10 ** 6}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def synthetic_lines(count, seed=0):
+    """Produit `count` lignes CSV (sans fin de ligne) au mélange réaliste.
+
+    Environ 1 ligne sur 8 dépasse 30 octets (troncature), 1 sur 20
+    contient de la typographie, 1 sur 100 un caractère hors latin-1,
+    1 sur 50 est quotée avec un ';' et 1 sur 200 est vide ou incomplète.
+    """
+    rng = random.Random(seed)
+    choice, randrange, rand = rng.choice, rng.randrange, rng.random
+
+    for _ in range(count):
+        draw = rand()
+
+        if draw < 0.005:
+            yield "" if draw < 0.0025 else f"{randrange(10000):04d}"
+            continue
+
+        words = [choice(WORDS) for _ in range(7 if draw < 0.13 else randrange(1, 4))]
+        if 0.13 <= draw < 0.18:
+            words.insert(randrange(len(words) + 1), choice(TYPOGRAPHIC))
+        elif 0.18 <= draw < 0.19:
+            words.append(choice(NON_LATIN))
+
+        text = " ".join(words)
+        if 0.19 <= draw < 0.21:
+            text = f'"{text}; {choice(WORDS)}"'
+
+        yield f"{randrange(10000):04d};{text}"
+
+
+def generate_csv(path, count, seed=0, bom=True):
+    """Écrit un CSV synthétique (UTF-8, CRLF comme les exports Excel)."""
+    with open(path, "w", newline="", encoding="utf-8-sig" if bom else "utf-8") as f_out:
+        batch = []
+
+        for line in synthetic_lines(count, seed):
+            batch.append(line)
+            if len(batch) == 65536:
+                f_out.write("\r\n".join(batch) + "\r\n")
+                batch = []
+
+        if batch:
+            f_out.write("\r\n".join(batch) + "\r\n")
+
+
+def dataset(workdir, count, seed=0, bom=True):
+    """Chemins (csv, dat) du jeu de données, générés une seule fois puis réutilisés."""
+    stem = os.path.join(workdir, f"bench_{count}_{seed}_{'bom' if bom else 'nobom'}")
+    csv_path, dat_path = stem + ".csv", stem + ".dat"
+
+    if not os.path.exists(csv_path):
+        generate_csv(csv_path + ".tmp", count, seed, bom)
+        os.replace(csv_path + ".tmp", csv_path)
+
+    if not os.path.exists(dat_path):
+        with open_dat_output(dat_path, count_lines(csv_path)) as f_out:
+            write_dat(iter_csv_rows(csv_path), f_out)
+
+    return csv_path, dat_path
+
+
+# ===========================================================================
+# MESURE D'UNE PHASE (dans un processus neuf, pour isoler le pic mémoire)
+# ===========================================================================
+
+def run_phase(phase, csv_path, dat_path, workdir):
+    """Exécute une phase et retourne ses mesures brutes.
+
+    Les sorties passent par les mêmes écrivains que les scripts : .dat
+    préalloué, mappé et substitué (comptage des lignes compris), CSV par
+    open_output().
+    """
+    dat_out = os.path.join(workdir, f"out_{os.getpid()}.dat")
+    csv_out = os.path.join(workdir, f"out_{os.getpid()}.csv")
+    source  = dat_path if phase == "dat2csv" else csv_path
+
+    wall, cpu = time.perf_counter(), time.process_time()
+
+    try:
+        if phase in ("csv2dat", "roundtrip"):
+            with open_dat_output(dat_out, count_lines(csv_path)) as f_out:
+                records = write_dat(iter_csv_rows(csv_path), f_out)
+
+        if phase in ("dat2csv", "roundtrip"):
+            with open_output(csv_out) as f_raw, \
+                    io.TextIOWrapper(f_raw, encoding=ENCODING, newline="") as f_out:
+                records = write_csv(dat_out if phase == "roundtrip" else dat_path, f_out)
+
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    finally:
+        for path in (dat_out, csv_out):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return {
+        "records": records,
+        "bytes_in": os.path.getsize(source),
+        "seconds": wall,
+        "cpu_seconds": cpu,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure(phase, csv_path, dat_path, workdir, repeat=1):
+    """Meilleur des `repeat` essais d'une phase, chacun dans un processus neuf."""
+    best = None
+
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            run = pool.submit(run_phase, phase, csv_path, dat_path, workdir).result()
+
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+
+    best["records_per_s"] = best["records"] / best["seconds"] if best["seconds"] else 0.0
+    best["mb_per_s"] = best["bytes_in"] / best["seconds"] / 1e6 if best["seconds"] else 0.0
+    return best
+
+
+# ===========================================================================
+# COMPARAISON AVEC UNE RÉFÉRENCE
+# ===========================================================================
+
+def regressions(results, baseline, max_drop):
+    """Liste des mesures dont le débit a baissé de plus de `max_drop` %."""
+    reference = {(r["size"], r["phase"]): r for r in baseline.get("results", [])}
+    found = []
+
+    for result in results["results"]:
+        ref = reference.get((result["size"], result["phase"]))
+        if not ref or not ref["records_per_s"]:
+            continue
+
+        drop = 100.0 * (1 - result["records_per_s"] / ref["records_per_s"])
+        if drop > max_drop:
+            found.append((result, ref, drop))
+
+    return found
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ero_converter.bench",
+        description="Banc de mesure des convertisseurs ERO sur données synthétiques.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"tailles en enregistrements, séparées par des virgules (défaut : {DEFAULT_SIZES})")
+    parser.add_argument("--phases", default=",".join(PHASES),
+                        help="phases mesurées (csv2dat, dat2csv, roundtrip)")
+    parser.add_argument("--repeat", type=int, default=1, help="essais par mesure, le meilleur est retenu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-bom", action="store_true", help="CSV synthétiques sans BOM")
+    parser.add_argument("--workdir", help="répertoire des jeux de données (réutilisés entre deux runs)")
+    parser.add_argument("-o", "--output", help="écrit les résultats dans ce fichier JSON")
+    parser.add_argument("--baseline", help="résultats JSON d'un run précédent à comparer")
+    parser.add_argument("--max-drop", type=float, default=10.0,
+                        help="baisse de débit tolérée par rapport à la référence, en %% (défaut : 10)")
+    args = parser.parse_args(argv)
+
+    phases = [phase.strip() for phase in args.phases.split(",")]
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        parser.error(f"phase inconnue : {', '.join(sorted(unknown))}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ero_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {
+        "format": RESULTS_FMT,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np is not None,
+        "results": [],
+    }
+
+    print("--- BANC DE MESURE ERO ---")
+    print(f"{'taille':>10}  {'phase':<10} {'durée':>9} {'enr./s':>12} {'Mo/s':>8} {'pic RSS':>9}")
+
+    for size in map(parse_size, args.sizes.split(",")):
+        csv_path, dat_path = dataset(workdir, size, args.seed, not args.no_bom)
+
+        for phase in phases:
+            run = measure(phase, csv_path, dat_path, workdir, args.repeat)
+            run.update(size=size, phase=phase)
+            results["results"].append(run)
+
+            rss = f"{run['peak_rss_mb']:.0f} Mo" if run["peak_rss_mb"] is not None else "n/d"
+            print(f"{size:>10}  {phase:<10} {run['seconds']:>8.3f}s {run['records_per_s']:>12,.0f} "
+                  f"{run['mb_per_s']:>8.1f} {rss:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f_out:
+            json.dump(results, f_out, indent=2)
+        print(f"Résultats : {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f_ref:
+            found = regressions(results, json.load(f_ref), args.max_drop)
+
+        for result, ref, drop in found:
+            print(f"RÉGRESSION {result['size']} {result['phase']} : "
+                  f"{result['records_per_s']:,.0f} enr./s contre {ref['records_per_s']:,.0f} (-{drop:.1f} %)")
+
+        if found:
+            return 1
+        print(f"Aucune régression au-delà de {args.max_drop:g} %.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
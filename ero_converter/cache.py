@@ -0,0 +1,229 @@
+# ---------------------------------------------------------------------------
+# ero_converter/cache.py
+# Cache de génération : un CSV inchangé ne repasse pas par l'encodeur.
+# ---------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import shutil
+
+from .datfile import BLOCK_SIZE, BUFFER_BYTES, HEADER_BYTES, START_OFFSET
+from .encoder import CSV_ENCODING, DAT_ENCODING
+from .transcode import LATIN1_TABLE
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+CACHE_VERSION   = 3             # À incrémenter si la logique d'encodage change.
+CACHE_DIR       = os.environ.get("ERO_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "ero_converter")
+MAX_CACHE_BYTES = 1 << 30       # 1 Gio, évincé du moins récemment utilisé.
+HASH_CHUNK      = 1 << 20
+MAX_STAMPS      = 10000         # Empreintes (taille, mtime) mémorisées.
+
+
+def format_fingerprint():
+    """Paramètres du format qui, s'ils changent, invalident tout le cache."""
+    return b"|".join([
+        str(CACHE_VERSION).encode(),
+        str(BLOCK_SIZE).encode(),
+        HEADER_BYTES,
+        BUFFER_BYTES,
+        CSV_ENCODING.encode(),
+        DAT_ENCODING.encode(),
+        repr(sorted(LATIN1_TABLE.items())).encode(),
+    ])
+
+
+def detach_hardlink(path, keep_content=True):
+    """Rend `path` propre à son répertoire s'il partage son inode (lien dur).
+
+    Un .dat matérialisé depuis le cache est un lien dur vers l'entrée du
+    cache : il doit être détaché avant toute écriture en place.
+    """
+    if not os.path.exists(path) or os.stat(path).st_nlink <= 1:
+        return
+
+    if keep_content:
+        tmp = path + ".tmp"
+        shutil.copy2(path, tmp)
+        os.replace(tmp, path)
+    else:
+        os.remove(path)
+
+
+# ===========================================================================
+# CACHE
+# ===========================================================================
+#
+#   entries/<clé>.dat   .dat déjà générés, livrés par lien dur
+#   entries/<clé>.used  fichier vide dont le mtime sert d'horodatage LRU
+#   stamps.json         chemin source → (taille, mtime_ns, clé), pour éviter
+#                       de hacher un CSV dont le stat n'a pas bougé
+#
+#   La clé est un hachage du contenu du CSV et de format_fingerprint().
+#   Une entrée partage son inode avec les .dat qui en ont été
+#   matérialisés : le cache n'y touche jamais (ni contenu ni mtime, que
+#   l'index annexe compare) et date ses accès sur le fichier .used.
+#
+# ===========================================================================
+
+def is_plain_dat(path):
+    """Vrai si `path` est un .dat ERO V7 en clair : en-tête exact, taille 52 + 31 × n."""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f_dat:
+            header = f_dat.read(START_OFFSET)
+    except OSError:
+        return False
+
+    return (header == HEADER_BYTES + BUFFER_BYTES
+            and (size - START_OFFSET) % BLOCK_SIZE == 0)
+
+
+class BuildCache:
+    """Cache des .dat générés, indexé par le contenu du CSV source."""
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory or CACHE_DIR
+        self.max_bytes = max_bytes
+        self.entries   = os.path.join(self.directory, "entries")
+        self._stamps_path = os.path.join(self.directory, "stamps.json")
+
+        os.makedirs(self.entries, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Clé d'un CSV source.
+    # ------------------------------------------------------------------
+    def _load_stamps(self):
+        try:
+            with open(self._stamps_path, encoding="utf-8") as f_stamps:
+                return json.load(f_stamps)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_stamps(self, stamps):
+        if len(stamps) > MAX_STAMPS:
+            stamps = dict(list(stamps.items())[-MAX_STAMPS:])
+
+        tmp = self._stamps_path + f".{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f_stamps:
+            json.dump(stamps, f_stamps)
+        os.replace(tmp, self._stamps_path)
+
+    def key_for(self, csv_path, variant=""):
+        """Clé de cache d'un CSV ; le hachage est évité si taille et mtime n'ont pas bougé.
+
+        `variant` distingue les options de génération qui changent la
+        sortie pour un même CSV (ex. translittération désactivée).
+        """
+        path = os.path.abspath(csv_path)
+        stat = os.stat(path)
+        stamps = self._load_stamps()
+        stamp_key = f"{path}|{variant}"
+
+        stamp = stamps.get(stamp_key)
+        if stamp and stamp[0] == stat.st_size and stamp[1] == stat.st_mtime_ns:
+            return stamp[2]
+
+        digest = hashlib.blake2b(format_fingerprint() + variant.encode(), digest_size=20)
+        with open(path, "rb") as f_in:
+            for chunk in iter(lambda: f_in.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+
+        key = digest.hexdigest()
+        stamps.pop(stamp_key, None)
+        stamps[stamp_key] = [stat.st_size, stat.st_mtime_ns, key]
+        self._save_stamps(stamps)
+        return key
+
+    # ------------------------------------------------------------------
+    # Entrées.
+    # ------------------------------------------------------------------
+    def entry_path(self, key):
+        return os.path.join(self.entries, key + ".dat")
+
+    def _touch(self, key):
+        """Horodatage LRU de l'entrée `key`, hors de son inode."""
+        path = os.path.join(self.entries, key + ".used")
+        with open(path, "a"):
+            pass
+        os.utime(path)
+
+    def _remove(self, key):
+        for suffix in (".dat", ".used"):
+            path = os.path.join(self.entries, key + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def materialize(self, key, target):
+        """Place l'entrée `key` en `target` (lien dur, sinon copie).
+
+        Retourne le nombre d'enregistrements, ou None si la clé est absente.
+        """
+        entry = self.entry_path(key)
+        if not os.path.exists(entry):
+            return None
+
+        # Entrée qui n'est pas un .dat V7 en clair : jamais livrée.
+        if not is_plain_dat(entry):
+            self._remove(key)
+            return None
+
+        self._touch(key)
+
+        if not (os.path.exists(target) and os.path.samefile(entry, target)):
+            tmp = target + ".tmp"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+            try:
+                os.link(entry, tmp)
+            except OSError:
+                shutil.copyfile(entry, tmp)
+            os.replace(tmp, target)
+
+        return (os.path.getsize(entry) - START_OFFSET) // BLOCK_SIZE
+
+    def put(self, key, dat_path):
+        """Enregistre une copie de `dat_path` sous la clé `key`, puis évince.
+
+        La clé ne décrit que le CSV et le format : seul un .dat V7 en clair
+        (en-tête et taille vérifiés) est mis en cache, sur la copie même
+        qui sera livrée.  Retourne False si `dat_path` a été refusé.
+        """
+        tmp = self.entry_path(key) + f".{os.getpid()}.tmp"
+        shutil.copyfile(dat_path, tmp)
+
+        if not is_plain_dat(tmp):
+            os.remove(tmp)
+            return False
+
+        os.replace(tmp, self.entry_path(key))
+        self._touch(key)
+        self.evict()
+        return True
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes."""
+        entries = []
+        for name in os.listdir(self.entries):
+            if name.endswith(".dat"):
+                key = name[:-len(".dat")]
+                stat = os.stat(os.path.join(self.entries, name))
+                try:
+                    used = os.stat(os.path.join(self.entries, key + ".used")).st_mtime
+                except FileNotFoundError:
+                    used = stat.st_mtime
+                entries.append((used, stat.st_size, key))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
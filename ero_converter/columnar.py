@@ -0,0 +1,263 @@
+# ---------------------------------------------------------------------------
+# ero_converter/columnar.py
+# Export colonnaire d'un .dat (fichiers .npy mappables) et chargement
+# paresseux, pour l'analyse sans repasser par un CSV.
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import struct
+from contextlib import nullcontext
+
+from .decoder import iter_text_chunks, resolve_layout, sniff_layout
+from .mapped import replacing
+
+try:
+    import numpy as np          # Requis : colonnes .npy, chargement mappé.
+except ImportError:
+    np = None
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+COLUMNS_FORMAT  = "ero-columns"
+COLUMNS_VERSION = 1
+META_FILE       = "meta.json"
+CODE_KINDS      = ("auto", "int", "bytes")
+INT_DIGITS      = 18            # Au-delà, un code numérique reste en octets (int64).
+NPY_HEADER      = 128           # Préambule .npy réservé : forme connue en fin d'export.
+
+
+# ===========================================================================
+# STRUCTURE DU RÉPERTOIRE
+# ===========================================================================
+#
+#   Fichier       Type             Contenu
+#   ------------  ---------------  ------------------------------------------
+#   codes.npy     int64 ou S<w>    code de chaque enregistrement non vide :
+#                                  entier si tous les codes sont des nombres
+#                                  sans zéro de tête, octets sinon (« 0042 »)
+#   texts.npy     S30              texte, dans l'encodage du .dat, complété
+#                                  par des \x00 (S<largeur - 1> hors ERO V7)
+#   records.npy   uint32           index (base 0) du bloc dans le .dat
+#   meta.json                      format, disposition, encodage, effectif
+#
+#   Les .npy sont au format NumPy 1.0 standard : np.load(mmap_mode="r")
+#   les mappe sans rien lire.  Les blocs vides ne sont pas exportés, comme
+#   dans le CSV ; records.npy permet de retrouver chaque bloc d'origine.
+#
+# ===========================================================================
+
+def _npy_header(dtype, count):
+    """Préambule .npy (version 1.0) de NPY_HEADER octets pour `count` éléments."""
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                   "shape": (count,)})
+    body = header.ljust(NPY_HEADER - 10 - 1).encode("latin-1") + b"\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(body)) + body
+
+
+class _NpyWriter:
+    """Colonne .npy écrite par lots ; la forme est fixée à la fermeture."""
+
+    def __init__(self, path, dtype):
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._file = open(path, "wb")
+        self._file.write(b"\x00" * NPY_HEADER)
+
+    def write(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self._file.write(values.data)
+        self.count += len(values)
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self.count))
+        self._file.close()
+
+
+def _numeric(codes):
+    """Vrai si un lot de codes S<w> tient en int64 sans rien perdre (« 0042 » non)."""
+    lengths = np.char.str_len(codes)
+    return bool(np.char.isdigit(codes).all() and lengths.max() <= INT_DIGITS
+                and not ((lengths > 1) & np.char.startswith(codes, b"0")).any())
+
+
+# ===========================================================================
+# EXPORT
+# ===========================================================================
+
+def export_columns(source, target, mode=None, layout=None, codes="auto", stats=None):
+    """Exporte un .dat en colonnes .npy dans le répertoire `target` ; retourne l'effectif.
+
+    `source` est un chemin, un fichier binaire (stdin, flux décompressé)
+    ou un tampon d'octets.  Les textes sont écrits en flux ; seuls les
+    codes, plus courts, sont gardés en mémoire jusqu'au choix de leur
+    type (`codes` : 'auto', 'int' ou 'bytes').  Chaque fichier est
+    substitué atomiquement, meta.json en dernier.
+    """
+    if np is None:
+        raise RuntimeError("l'export colonnaire exige NumPy")
+    if codes not in CODE_KINDS:
+        raise ValueError(f"type de codes inconnu : {codes!r}")
+
+    if not isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)) \
+            and layout in (None, "auto"):
+        layout, source = sniff_layout(source)
+    layout = resolve_layout(source, layout)
+
+    encoding = layout.encoding
+    phase    = stats.phase if stats is not None else nullcontext
+    numeric  = codes != "bytes"
+    code_chunks = []
+    sep, sep_byte = layout.null_char, layout.terminator
+
+    os.makedirs(target, exist_ok=True)
+
+    with replacing(os.path.join(target, "texts.npy")) as texts_tmp, \
+            replacing(os.path.join(target, "records.npy")) as records_tmp:
+        texts   = _NpyWriter(texts_tmp, f"S{layout.max_payload}")
+        records = _NpyWriter(records_tmp, "<u4")
+
+        try:
+            chunks = iter_text_chunks(source, mode, layout)
+            first  = 0
+
+            for chunk in (stats.timed("decode", chunks) if stats is not None else chunks):
+                with phase("parse"):
+                    # decode_text() sans garder un tuple par ligne : le
+                    # ramasse-miettes ne parcourt pas des millions d'objets.
+                    chunk = [text.strip() for text in chunk]
+                    chunk_codes = [text.partition(" ")[0] for text in chunk]
+                    chunk_texts = [text.partition(" ")[2] for text in chunk]
+
+                    if all(chunk_codes):
+                        numbers = np.arange(first, first + len(chunk))
+                    else:
+                        numbers = [first + i for i, code in enumerate(chunk_codes) if code]
+                        chunk_texts = [text for code, text in zip(chunk_codes, chunk_texts) if code]
+                        chunk_codes = [code for code in chunk_codes if code]
+                    first += len(chunk)
+
+                if stats is not None:
+                    stats.count("empty_blocks", len(chunk) - len(numbers))
+                if not len(numbers):
+                    continue
+
+                with phase("write"):
+                    # Un lot, un seul encodage : le terminateur ne peut pas
+                    # figurer dans un texte décodé, il sert de séparateur.
+                    chunk_codes = np.array(sep.join(chunk_codes).encode(encoding).split(sep_byte))
+                    numeric = numeric and _numeric(chunk_codes)
+
+                    if codes == "int" and not numeric:
+                        raise ValueError("codes non numériques ou à zéro de tête : "
+                                         "pas de colonne entière possible")
+
+                    code_chunks.append(chunk_codes)
+                    texts.write(sep.join(chunk_texts).encode(encoding).split(sep_byte))
+                    records.write(numbers)
+        finally:
+            texts.close()
+            records.close()
+
+        # Le type des codes n'est connu qu'une fois tous les lots vus.
+        count = texts.count
+        if numeric:
+            dtype = np.dtype("<i8")
+        else:
+            dtype = np.dtype(f"S{max((chunk.itemsize for chunk in code_chunks), default=1)}")
+
+        with replacing(os.path.join(target, "codes.npy")) as codes_tmp:
+            writer = _NpyWriter(codes_tmp, dtype)
+            try:
+                for chunk in code_chunks:
+                    writer.write(chunk.astype(dtype))
+            finally:
+                writer.close()
+
+    meta = {
+        "format": COLUMNS_FORMAT,
+        "version": COLUMNS_VERSION,
+        "layout": layout.name,
+        "encoding": encoding,
+        "records": count,
+        "codes": "int" if numeric else "bytes",
+    }
+    with replacing(os.path.join(target, META_FILE)) as meta_tmp:
+        with open(meta_tmp, "w", encoding="utf-8") as f_meta:
+            json.dump(meta, f_meta, indent=2)
+            f_meta.write("\n")
+
+    return count
+
+
+# ===========================================================================
+# CHARGEMENT
+# ===========================================================================
+
+class ColumnTable:
+    """Table exportée par export_columns(), chargée à la demande.
+
+        table = open_columns("export_audit_v7.cols")
+        len(table)          # enregistrements non vides
+        table.codes         # np.ndarray mappé (int64 ou S<w>)
+        table.texts[:10]    # S30, rien n'est lu avant l'accès
+        table[0]            # ("0000", "Catégorie X")
+
+    Chaque colonne est mappée en lecture au premier accès, puis gardée.
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise RuntimeError("le chargement colonnaire exige NumPy")
+
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f_meta:
+            self.meta = json.load(f_meta)
+
+        if self.meta.get("format") != COLUMNS_FORMAT or self.meta.get("version") != COLUMNS_VERSION:
+            raise ValueError(f"'{path}' n'est pas un export colonnaire ERO (version {COLUMNS_VERSION})")
+
+        self.path     = path
+        self.encoding = self.meta["encoding"]
+        self._columns = {}
+
+    def __repr__(self):
+        return f"ColumnTable({self.path!r}, records={len(self)}, codes={self.meta['codes']!r})"
+
+    def column(self, name):
+        """Colonne `name` ('codes', 'texts', 'records'), mappée en lecture."""
+        if name not in self._columns:
+            array = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+            if len(array) != self.meta["records"]:
+                raise ValueError(f"{name}.npy : {len(array)} lignes, {self.meta['records']} attendues")
+            self._columns[name] = array
+        return self._columns[name]
+
+    @property
+    def codes(self):
+        return self.column("codes")
+
+    @property
+    def texts(self):
+        return self.column("texts")
+
+    @property
+    def records(self):
+        return self.column("records")
+
+    def __len__(self):
+        return self.meta["records"]
+
+    def __getitem__(self, index):
+        """Ligne (code, texte) décodée, comme dans le CSV."""
+        code = self.codes[index]
+        code = str(code) if self.meta["codes"] == "int" else code.decode(self.encoding)
+        return code, self.texts[index].decode(self.encoding)
+
+
+def open_columns(path):
+    """Ouvre un export colonnaire ; les colonnes ne sont lues qu'à l'accès."""
+    return ColumnTable(path)
@@ -0,0 +1,179 @@
+# ---------------------------------------------------------------------------
+# ero_converter/compress.py
+# Entrées compressées (gzip, xz, zip) décompressées à la volée, sorties
+# compressées selon l'extension.
+# ---------------------------------------------------------------------------
+
+import gzip
+import lzma
+import os
+import zipfile
+
+from .stdio import is_seekable, is_stdio, open_binary, prepend
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+# Signatures reconnues en tête de fichier, indépendamment de l'extension.
+MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "xz":   b"\xfd7zXZ\x00",
+    "zip":  b"PK\x03\x04",
+}
+MAGIC_BYTES = max(len(magic) for magic in MAGIC.values())
+
+# Compression des sorties, choisie par l'extension du fichier produit.
+OUTPUT_SUFFIXES = {".gz": "gzip", ".xz": "xz"}
+GZIP_LEVEL = 6                  # Niveau gzip (1 : rapide … 9 : compact).
+XZ_PRESET  = 3                  # Préréglage xz : au-delà, le coût CPU domine.
+
+
+# ===========================================================================
+# DÉTECTION
+# ===========================================================================
+
+def detect_compression(head):
+    """Type de compression d'après les premiers octets : 'gzip', 'xz', 'zip' ou None."""
+    for kind, magic in MAGIC.items():
+        if head[:len(magic)] == magic:
+            return kind
+    return None
+
+
+def compression_of(path):
+    """Type de compression d'un fichier sur disque (None si non compressé)."""
+    with open(path, "rb") as f_in:
+        return detect_compression(f_in.read(MAGIC_BYTES))
+
+
+def is_archive(path):
+    """Vrai si `path` est une archive zip (jamais pour stdin)."""
+    return not is_stdio(path) and os.path.isfile(path) and compression_of(path) == "zip"
+
+
+def is_compressed_name(path):
+    """Vrai si l'extension de `path` (.gz, .xz) demande une sortie compressée."""
+    return not is_stdio(path) and os.path.splitext(path)[1].lower() in OUTPUT_SUFFIXES
+
+
+def strip_suffix(name):
+    """Nom sans extension de compression : 'x.csv.gz' → 'x.csv'."""
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in OUTPUT_SUFFIXES else name
+
+
+# ===========================================================================
+# LECTURE
+# ===========================================================================
+#
+#   Les flux décompressés sont exposés comme des tubes : ni seek() ni
+#   fileno().  Un GzipFile renvoie le descripteur du fichier compressé ;
+#   le mapper donnerait les octets compressés au lieu du .dat.
+#
+# ===========================================================================
+
+def open_input(source):
+    """Ouvre une source binaire, décompressée à la volée ; retourne (fichier, type).
+
+    `source` est un chemin, « - » (stdin) ou un couple (archive zip, membre).
+    Le type vaut 'gzip', 'xz', 'zip' (membre d'archive) ou None.
+    """
+    if isinstance(source, tuple):
+        return open_member(*source), "zip"
+
+    f_raw = open_binary(source)
+    head = f_raw.read(MAGIC_BYTES)
+
+    if is_seekable(f_raw):
+        f_raw.seek(0)
+    else:
+        f_raw = prepend(head, f_raw)
+
+    kind = detect_compression(head)
+
+    if kind is None:
+        return f_raw, None
+
+    if kind == "zip":
+        f_raw.close()
+        raise ValueError(f"'{source}' est une archive zip : ses membres se convertissent par lot.")
+
+    # Sur disque, le fichier est rouvert par le décompresseur, qui le ferme.
+    if not is_stdio(source):
+        f_raw.close()
+        f_raw = source
+
+    if kind == "gzip":
+        return prepend(b"", gzip.open(f_raw, "rb")), kind
+    return prepend(b"", lzma.open(f_raw, "rb")), kind
+
+
+def archive_members(path, suffix):
+    """Membres d'une archive zip dont le nom finit par `suffix`, dans l'ordre de l'archive."""
+    with zipfile.ZipFile(path) as archive:
+        return [info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(suffix)]
+
+
+def open_member(path, name):
+    """Flux binaire d'un membre d'archive zip, décompressé à la volée."""
+    # Le membre garde l'archive ouverte jusqu'à sa propre fermeture.
+    with zipfile.ZipFile(path) as archive:
+        return prepend(b"", archive.open(name))
+
+
+def input_size(source):
+    """Octets lus sur le stockage : taille du fichier, ou taille compressée du membre."""
+    if isinstance(source, tuple):
+        with zipfile.ZipFile(source[0]) as archive:
+            return archive.getinfo(source[1]).compress_size
+    return os.path.getsize(source)
+
+
+# ===========================================================================
+# ÉCRITURE
+# ===========================================================================
+
+def open_output(path, suffix=None):
+    """Ouvre `path` (ou « - ») en écriture binaire, compressée si demandé.
+
+    `suffix` ('.gz' ou '.xz') force la compression ; à défaut,
+    l'extension de `path` la détermine.
+    """
+    if not suffix and not is_stdio(path):
+        suffix = os.path.splitext(path)[1]
+
+    compression = OUTPUT_SUFFIXES.get((suffix or "").lower())
+
+    f_out = open_binary(path, "wb")
+
+    if compression == "gzip":
+        return _Owning(gzip.GzipFile(fileobj=f_out, mode="wb", compresslevel=GZIP_LEVEL), f_out)
+    if compression == "xz":
+        return _Owning(lzma.LZMAFile(f_out, "wb", preset=XZ_PRESET), f_out)
+    return f_out
+
+
+class _Owning:
+    """Compresseur qui ferme aussi le fichier sous-jacent (le trailer est écrit avant)."""
+
+    def __init__(self, compressor, f_out):
+        self._compressor = compressor
+        self._f_out      = f_out
+
+    def __getattr__(self, name):
+        return getattr(self._compressor, name)
+
+    def close(self):
+        try:
+            self._compressor.close()
+        finally:
+            self._f_out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
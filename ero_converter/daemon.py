@@ -0,0 +1,323 @@
+# ---------------------------------------------------------------------------
+# ero_converter/daemon.py
+# Démon de conversion : interpréteur et modules déjà chargés, requêtes
+# servies sur un socket Unix local ou un port TCP de 127.0.0.1.
+# ---------------------------------------------------------------------------
+
+import argparse
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import CONVERSION_ERRORS
+from .compress import open_input, open_output
+from .datfile import ENCODING
+from .decoder import write_csv
+from .encoder import iter_csv_rows, open_csv, write_dat
+from .mapped import count_lines, is_mapped, open_dat_output
+from .stats import RunStats
+from .transcode import LATIN1_TABLE, Transcoder
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+SOCKET_PATH = os.environ.get("ERO_DAEMON_SOCKET") or os.path.join(
+    tempfile.gettempdir(), f"ero_converter-{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+HOST        = "127.0.0.1"       # Le port TCP n'est jamais exposé hors de la machine.
+OPERATIONS  = ("csv2dat", "dat2csv", "ping")
+
+
+# ===========================================================================
+# PROTOCOLE
+# ===========================================================================
+#
+#   Chaque message, dans les deux sens, est une trame :
+#
+#       >IQ      longueur de l'en-tête JSON, longueur de la charge utile
+#       en-tête  JSON UTF-8
+#       charge   octets bruts (CSV ou .dat), éventuellement vide
+#
+#   Requête  : {"op": "csv2dat"|"dat2csv"|"ping", "source": chemin|null,
+#               "target": chemin|null, "options": {"no_translit", "mode"}}
+#              Sans "source", la charge utile est l'entrée ; sans "target",
+#              la sortie revient dans la charge utile de la réponse.
+#              En TCP, "source" et "target" sont refusés : tout utilisateur
+#              local peut joindre le port, il ne doit pas pouvoir lire ou
+#              écrire des fichiers au nom du démon.
+#   Réponse  : {"ok": true, "records": n, "stats": {...}}
+#              ou {"ok": false, "error": "..."}
+#
+#   Une connexion peut enchaîner plusieurs requêtes.  ero_client.py (à la
+#   racine du dépôt) reprend ce format sans importer le paquet.
+#
+# ===========================================================================
+
+FRAME = struct.Struct(">IQ")
+
+
+def _read_exact(f_in, size):
+    data = f_in.read(size)
+    if len(data) < size:
+        raise EOFError("connexion fermée au milieu d'une trame")
+    return data
+
+
+def read_frame(f_in):
+    """Lit une trame ; retourne (en-tête, charge utile) ou lève EOFError."""
+    prefix = f_in.read(FRAME.size)
+    if not prefix:
+        raise EOFError("connexion fermée")
+    if len(prefix) < FRAME.size:
+        raise EOFError("connexion fermée au milieu d'une trame")
+
+    header_len, payload_len = FRAME.unpack(prefix)
+    header = json.loads(_read_exact(f_in, header_len).decode("utf-8"))
+    return header, _read_exact(f_in, payload_len)
+
+
+def write_frame(f_out, header, payload=b""):
+    """Écrit une trame et la pousse sur la connexion."""
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    # Préfixe et en-tête partent ensemble : un seul segment pour une petite réponse.
+    f_out.write(FRAME.pack(len(encoded), len(payload)) + encoded)
+    if payload:
+        f_out.write(payload)
+    f_out.flush()
+
+
+# ===========================================================================
+# EXÉCUTION D'UNE REQUÊTE (processus de travail, ou repli dans le client)
+# ===========================================================================
+
+def run_request(header, payload=b""):
+    """Exécute une requête ; retourne (en-tête de réponse, charge utile)."""
+    op = header.get("op")
+    if op not in OPERATIONS:
+        return {"ok": False, "error": f"opération inconnue : {op!r}"}, b""
+    if op == "ping":
+        return {"ok": True, "pid": os.getpid()}, b""
+
+    source = header.get("source")
+    target = header.get("target")
+    stats  = RunStats()
+
+    try:
+        if not target:
+            output = io.BytesIO()
+        elif op == "csv2dat":
+            output = open_dat_output(target, count_lines(source) if source else 0)
+        else:
+            output = open_output(target)
+
+        with output as f_out:
+            count = _convert(op, source, payload, f_out, header.get("options") or {}, stats)
+            data  = b"" if target else f_out.getvalue()
+    except CONVERSION_ERRORS as exc:
+        # Pas de fichier partiel laissé derrière un échec ; un .dat mappé
+        # n'a pas remplacé la cible.
+        partial = target and not (op == "csv2dat" and is_mapped(target))
+        if partial and os.path.exists(target):
+            os.remove(target)
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}, b""
+
+    stats.records   = count
+    stats.bytes_in  = os.path.getsize(source) if source else len(payload)
+    stats.bytes_out = os.path.getsize(target) if target else len(data)
+    stats.finish()
+
+    return {"ok": True, "records": count, "stats": stats.as_dict()}, data
+
+
+def _convert(op, source, payload, f_out, options, stats):
+    if op == "csv2dat":
+        transcoder = Transcoder(None if options.get("no_translit") else LATIN1_TABLE,
+                                keep_details=False)
+        with stats.phase("open"):
+            f_in = open_csv(source) if source else io.BytesIO(payload)
+
+        with f_in:
+            count = write_dat(iter_csv_rows(f_in), f_out, transcoder, stats)
+
+        for kind, n in transcoder.counts.items():
+            stats.count(kind, n)
+        return count
+
+    # Le wrapper texte est détaché en sortie : f_out reste lisible.
+    f_text = io.TextIOWrapper(f_out, encoding=ENCODING, newline="")
+    try:
+        if not source:
+            return write_csv(payload, f_text, options.get("mode"), stats)
+
+        with stats.phase("open"):
+            f_in, _ = open_input(source)
+        with f_in:
+            return write_csv(f_in, f_text, options.get("mode"), stats)
+    finally:
+        f_text.detach()
+
+
+# ===========================================================================
+# SERVEUR
+# ===========================================================================
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Une connexion : requêtes lues et servies tant que le client écrit."""
+
+    def handle(self):
+        while True:
+            try:
+                header, payload = read_frame(self.rfile)
+            except EOFError:
+                return
+            except ValueError as exc:
+                write_frame(self.wfile, {"ok": False, "error": f"trame invalide : {exc}"})
+                return
+
+            try:
+                if self.server.inline_only and (header.get("source") or header.get("target")):
+                    response = {"ok": False, "error": "en TCP, les fichiers transitent dans la "
+                                                      "requête : ni source ni target"}, b""
+                else:
+                    response = self.server.execute(header, payload)
+            except Exception as exc:        # Un processus de travail mort ne tue pas le démon.
+                response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}, b""
+
+            try:
+                write_frame(self.wfile, *response)
+            except OSError:                 # Client parti sans attendre sa réponse.
+                return
+
+
+class _TCPHandler(_Handler):
+    disable_nagle_algorithm = True      # Pas d'attente de 40 ms entre deux segments.
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _claim_socket(path):
+    """Supprime un socket Unix orphelin ; erreur si un démon y répond déjà."""
+    if not os.path.exists(path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+    else:
+        raise OSError(f"un démon écoute déjà sur {path}")
+    finally:
+        probe.close()
+
+
+def make_server(socket_path=None, port=None, workers=None):
+    """Crée le serveur (socket Unix, ou TCP local si `port`) et son pool de travail.
+
+    Avec `workers` = 0, les conversions tournent dans le thread de la
+    connexion ; sinon dans un pool de processus déjà démarrés.
+    """
+    if port is not None:
+        server = _TCPServer((HOST, port), _TCPHandler)
+        server.inline_only = True
+    else:
+        socket_path = socket_path or SOCKET_PATH
+        _claim_socket(socket_path)
+
+        # Socket accessible au seul propriétaire : il lit et écrit ses fichiers.
+        umask = os.umask(0o177)
+        try:
+            server = _UnixServer(socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        server.inline_only = False
+
+    if workers == 0:
+        server.workers, server.pool = 0, None
+        server.execute = run_request
+        return server
+
+    workers = server.workers = workers or os.cpu_count() or 1
+    server.pool = ProcessPoolExecutor(max_workers=workers)
+    server.execute = lambda header, payload: server.pool.submit(run_request, header, payload).result()
+
+    # Démarrage des processus tout de suite : la première requête ne paie rien.
+    for future in [server.pool.submit(run_request, {"op": "ping"}) for _ in range(workers)]:
+        future.result()
+
+    return server
+
+
+def close_server(server):
+    """Ferme le serveur, son pool de travail et son socket Unix."""
+    server.server_close()
+    if server.pool is not None:
+        server.pool.shutdown()
+    if isinstance(server, _UnixServer) and os.path.exists(server.server_address):
+        os.remove(server.server_address)
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ero_converter.daemon",
+        description="Démon de conversion CSV ⟷ .dat (client : ero_client.py).")
+    parser.add_argument("--socket", metavar="CHEMIN",
+                        help=f"socket Unix d'écoute (défaut : $ERO_DAEMON_SOCKET ou {SOCKET_PATH})")
+    parser.add_argument("--port", type=int,
+                        help=f"écoute en TCP sur {HOST}:PORT au lieu du socket Unix ; sans "
+                             f"authentification, tout utilisateur local peut s'y connecter : "
+                             f"seules les conversions en mémoire sont acceptées (ni source ni "
+                             f"target, le fichier transite dans la requête)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="processus de conversion (défaut : nombre de cœurs ; 0 : dans le démon)")
+    args = parser.parse_args(argv)
+
+    try:
+        server = make_server(args.socket, args.port, args.workers)
+    except OSError as exc:
+        print(f"ERREUR : {exc}")
+        return 2
+
+    address = f"{HOST}:{args.port}" if args.port is not None else server.server_address
+    workers = f"{server.workers} processus" if server.workers else "conversion dans le démon"
+    print(f"--- DÉMON ERO : écoute sur {address} ({workers}) ---", flush=True)
+
+    # SIGTERM arrête proprement, comme Ctrl-C.
+    signal.signal(signal.SIGTERM, _terminate)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_server(server)
+
+    print("--- DÉMON ARRÊTÉ ---")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
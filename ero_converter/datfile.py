@@ -0,0 +1,199 @@
+# ---------------------------------------------------------------------------
+# ero_converter/datfile.py
+# Format du fichier .dat ERO et accès direct (O(1)) aux enregistrements.
+# ---------------------------------------------------------------------------
+
+import mmap
+import os
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+BLOCK_SIZE    = 31              # Taille fixe d'un enregistrement en octets.
+START_OFFSET  = 52              # Fin de l'en-tête (Header 16 + Buffer 36).
+ENCODING      = "latin-1"       # Encodage du fichier binaire.
+CHUNK_ROWS    = 65536           # Enregistrements décodés par lot en itération.
+PAD_BYTE      = 0xCD            # Padding des enregistrements après le \x00.
+
+# Signature du BOM UTF-8 — utilisée pour la vérification d'intégrité.
+BOM_UTF8 = b"\xef\xbb\xbf"
+
+
+# ===========================================================================
+# STRUCTURE TECHNIQUE — ZONE EN-TÊTE (52 octets, validée)
+# ===========================================================================
+#
+#   Offset  Taille  Rôle
+#   ------  ------  ------------------------------------
+#    0      16      Header  — Signature ERO
+#   16      36      Buffer  — Séquence technique <vide>
+#   52       —      Début des enregistrements de données
+#
+# ===========================================================================
+
+HEADER_BYTES = bytes.fromhex(
+    "45524F00"          # Signature "ERO\0"
+    "FDFDFDFD"          # Padding signature
+    "DDDDDDDD"         # Padding signature
+    "41000000"          # Terminateur header
+)
+
+BUFFER_BYTES = bytes.fromhex(
+    "41000000"          # Préfixe buffer
+    "00"                # Séparateur
+    "3C766964653E20"    # Chaîne ASCII "<vide> "
+    "CCCCCCCCCCCCCCCC"  # Padding buffer (24 octets
+    "CCCCCCCCCCCCCCCC"  #  de 0xCC)
+    "CCCCCCCCCCCCCCCC"  #
+)
+
+
+# ===========================================================================
+# DÉCODAGE D'UN ENREGISTREMENT
+# ===========================================================================
+
+def dat_size(count):
+    """Taille exacte d'un .dat de `count` enregistrements : 52 + 31 × n octets."""
+    return START_OFFSET + BLOCK_SIZE * count
+
+
+def decode_text(text):
+    """Sépare un contenu décodé en (code, texte) sur le premier espace."""
+    code, _, texte = text.strip().partition(" ")
+    return code, texte
+
+
+def decode_record(block):
+    """Décode un bloc de 31 octets en (code, texte).
+
+    Le contenu est tout ce qui précède le premier \\x00 ; un bloc vide
+    donne ("", "").
+    """
+    null_idx = block.find(b"\x00")
+    content_bytes = block[:null_idx] if null_idx != -1 else block
+
+    return decode_text(content_bytes.decode(ENCODING))
+
+
+# ===========================================================================
+# FICHIER .DAT EN ACCÈS DIRECT
+# ===========================================================================
+#
+#   L'enregistrement d'index i (base 0) se trouve à l'offset 52 + 31 × i :
+#   c'est le « Record i+1 » de la table du README.  Aucun parcours n'est
+#   nécessaire pour y accéder.  Un bloc incomplet en fin de fichier est
+#   ignoré, comme dans le script d'audit.
+#
+# ===========================================================================
+
+class EroDatFile:
+    """Fichier .dat ERO ouvert une fois, indexable comme une séquence.
+
+        with EroDatFile("categori_corrected.dat") as dat:
+            len(dat)        # nombre d'enregistrements
+            dat[0]          # ("0000", "Catégorie X")
+            dat[10:20]      # liste de (code, texte)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+
+            if size < START_OFFSET:
+                raise ValueError(f"Fichier '{path}' trop court ou sans en-tête valide.")
+
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        self._count = (size - START_OFFSET) // BLOCK_SIZE
+
+    # ------------------------------------------------------------------
+    # Cycle de vie.
+    # ------------------------------------------------------------------
+    def close(self):
+        if not self._file.closed:
+            self._mm.close()
+            self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"EroDatFile({self.path!r}, records={self._count})"
+
+    # ------------------------------------------------------------------
+    # Accès brut.
+    # ------------------------------------------------------------------
+    @property
+    def header(self):
+        """Les 52 octets d'en-tête (Header + Buffer)."""
+        return self._mm[:START_OFFSET]
+
+    def offset(self, index):
+        """Offset en octets de l'enregistrement d'index `index`."""
+        return START_OFFSET + self._index(index) * BLOCK_SIZE
+
+    def raw(self, index):
+        """Le bloc brut de 31 octets de l'enregistrement d'index `index`."""
+        start = self.offset(index)
+        return self._mm[start:start + BLOCK_SIZE]
+
+    def _index(self, index):
+        index = index.__index__()
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("index d'enregistrement hors limites")
+
+        return index
+
+    # ------------------------------------------------------------------
+    # Protocole de séquence.
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._count)
+
+            if step == 1:
+                return self._decode_range(start, max(start, stop))
+            return [decode_record(self.raw(i)) for i in range(start, stop, step)]
+
+        return decode_record(self.raw(key))
+
+    def __iter__(self):
+        for first in range(0, self._count, CHUNK_ROWS):
+            yield from self._decode_range(first, min(self._count, first + CHUNK_ROWS))
+
+    def _decode_range(self, start, stop):
+        """Décode les enregistrements [start, stop) en une seule lecture."""
+        base = START_OFFSET + start * BLOCK_SIZE
+
+        # Latin-1 : 1 octet = 1 caractère, les offsets restent valables.
+        zone = self._mm[base:base + (stop - start) * BLOCK_SIZE].decode(ENCODING)
+        find = zone.find
+        records = []
+
+        for offset in range(0, len(zone), BLOCK_SIZE):
+            end = offset + BLOCK_SIZE
+            null_idx = find("\x00", offset, end)
+            records.append(decode_text(zone[offset:null_idx if null_idx != -1 else end]))
+
+        return records
@@ -0,0 +1,431 @@
+# ---------------------------------------------------------------------------
+# ero_converter/decoder.py
+# Extraction : enregistrements binaires ERO → lignes CSV.
+# ---------------------------------------------------------------------------
+
+import csv
+import io
+import mmap
+import os
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .datfile import BOM_UTF8, decode_text
+from .layout import DEFAULT_LAYOUT, detect_layout, get_layout, signature_bytes
+from .stdio import is_seekable, prepend
+
+try:
+    import numpy as np          # Optionnel : décodage vectorisé de la zone.
+except ImportError:
+    np = None
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+CHUNK_ROWS    = 65536           # Enregistrements décodés par lot.
+CSV_DELIMITER = ";"
+
+# Mode de lecture : "numpy" (vue S31 vectorisée), "mmap" (memoryview sans
+# copie) ou "stream" (lecture séquentielle historique, bloc par bloc).
+READ_MODE     = "numpy" if np is not None else "mmap"
+
+
+# ===========================================================================
+# EN-TÊTE
+# ===========================================================================
+
+def read_header(f_in, layout=None):
+    """Lit l'en-tête (52 octets en ERO V7) ; ValueError si le fichier est trop court."""
+    layout = get_layout(layout)
+    header = f_in.read(layout.start_offset)
+
+    if len(header) < layout.start_offset:
+        raise ValueError("fichier trop court ou sans en-tête valide.")
+
+    return header
+
+
+def has_bom(header):
+    """Vrai si des octets BOM UTF-8 résiduels sont présents dans l'en-tête."""
+    return BOM_UTF8 in header
+
+
+def sniff_layout(f_in):
+    """Détecte la disposition d'un .dat ouvert, sans le consommer.
+
+    Retourne (disposition, fichier) : un fichier positionnable est
+    rembobiné ; sur un tube, les octets examinés sont rejoués devant le
+    flux retourné.
+    """
+    head = f_in.read(signature_bytes())
+
+    try:
+        size = os.fstat(f_in.fileno()).st_size if is_seekable(f_in) else None
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        size = None
+
+    if is_seekable(f_in):
+        f_in.seek(-len(head), os.SEEK_CUR)
+    else:
+        f_in = prepend(head, f_in)
+
+    return detect_layout(head, size), f_in
+
+
+def resolve_layout(source, layout=None):
+    """Disposition d'un .dat : `layout` si donnée (nom ou Layout), sinon détectée.
+
+    `source` est un chemin ou un tampon d'octets ; « auto » équivaut à None.
+    """
+    if layout is not None and layout != "auto":
+        return get_layout(layout)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return detect_layout(bytes(source[:signature_bytes()]), len(source))
+
+    with open(source, "rb") as f_in:
+        return detect_layout(f_in.read(signature_bytes()), os.fstat(f_in.fileno()).st_size)
+
+
+# ===========================================================================
+# LECTEURS DE LA ZONE D'ENREGISTREMENTS
+# ===========================================================================
+#
+#   Chaque lecteur produit des lots de textes bruts : pour chaque bloc, le
+#   contenu décodé en latin-1 qui précède le premier \x00.  Un bloc
+#   incomplet en fin de fichier est ignoré, comme en lecture séquentielle.
+#   Largeur, terminateur, offset et encodage viennent de la disposition
+#   (`layout`, ERO V7 par défaut).
+#
+# ===========================================================================
+
+def read_chunks_stream(f_in, layout=DEFAULT_LAYOUT):
+    """Lecture séquentielle historique : un read() par bloc de 31 octets.
+
+    Le fichier doit être positionné au début des enregistrements.
+    """
+    block_size = layout.record_size
+    terminator = layout.terminator
+    encoding   = layout.encoding
+    texts = []
+
+    while True:
+        block = f_in.read(block_size)
+
+        # Fin du fichier ou bloc incomplet → on arrête.
+        if not block or len(block) < block_size:
+            break
+
+        # Extraction du contenu : tout ce qui précède le premier \x00.
+        null_idx = block.find(terminator)
+        content_bytes = block[:null_idx] if null_idx != -1 else block
+
+        texts.append(content_bytes.decode(encoding))
+
+        if len(texts) == CHUNK_ROWS:
+            yield texts
+            texts = []
+
+    if texts:
+        yield texts
+
+
+def read_chunks_mmap(mm, count, first=0, layout=DEFAULT_LAYOUT):
+    """Parcours d'un tampon (fichier mappé, bytes…) via memoryview : un décodage par lot.
+
+    Couvre les `count` enregistrements à partir de l'index `first`.
+    """
+    block_size = layout.record_size
+    null_char  = layout.null_char
+    view = memoryview(mm)
+    last = first + count
+
+    try:
+        for chunk_first in range(first, last, CHUNK_ROWS):
+            start = layout.offset(chunk_first)
+            stop  = layout.offset(min(last, chunk_first + CHUNK_ROWS))
+
+            # Le lot est décodé d'un bloc depuis la vue (encodage mono-octet :
+            # 1 octet = 1 caractère, les offsets restent valables sur le str).
+            zone  = str(view[start:stop], layout.encoding)
+            find  = zone.find
+            texts = []
+
+            for offset in range(0, stop - start, block_size):
+                end = offset + block_size
+                null_idx = find(null_char, offset, end)
+                texts.append(zone[offset:null_idx if null_idx != -1 else end])
+
+            yield texts
+    finally:
+        view.release()
+
+
+def record_view(mm, count, first=0, layout=DEFAULT_LAYOUT):
+    """Vue NumPy S31 (sans copie) sur `count` enregistrements à partir de `first`."""
+    return np.frombuffer(mm, dtype=layout.dtype, count=count, offset=layout.offset(first))
+
+
+def read_chunks_numpy(mm, count, first=0, layout=DEFAULT_LAYOUT):
+    """Recherche vectorisée des terminateurs, décodage latin-1 par lot."""
+    block_size = layout.record_size
+    terminator = layout.terminator[0]
+    last = first + count
+
+    for chunk_first in range(first, last, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, last - chunk_first)
+        matrix = record_view(mm, n, chunk_first, layout).view(np.uint8).reshape(n, block_size)
+
+        # Longueur utile : position du premier \x00, ou 31 s'il est absent.
+        is_null = matrix == terminator
+        lengths = np.where(is_null.any(axis=1), is_null.argmax(axis=1), block_size)
+
+        zone = matrix.tobytes().decode(layout.encoding)
+        yield [zone[offset:offset + length]
+               for offset, length in zip(range(0, n * block_size, block_size), lengths.tolist())]
+
+
+def split_rows(texts):
+    """Convertit des textes bruts en lignes CSV (code, texte).
+
+    Les blocs vides après décodage sont ignorés.
+    """
+    rows = []
+
+    for text in texts:
+        code, texte = decode_text(text)
+
+        if code:
+            rows.append((code, texte))
+
+    return rows
+
+
+# ===========================================================================
+# ITÉRATION SUR UN .DAT
+# ===========================================================================
+
+def iter_text_chunks(source, mode=None, layout=None):
+    """Produit les textes bruts des blocs d'un .dat, par lots (blocs vides compris).
+
+    `source` est un chemin, un objet fichier binaire positionné au début
+    du fichier, ou un tampon d'octets contenant le fichier entier.
+    `layout` (nom ou Layout) impose la disposition ; par défaut, elle est
+    détectée (voir layout.py).
+    """
+    mode = mode or READ_MODE
+    read_chunks = read_chunks_numpy if mode == "numpy" and np is not None else read_chunks_mmap
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f_in:
+            yield from iter_text_chunks(f_in, mode, layout)
+        return
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        layout = resolve_layout(source, layout)
+        if len(source) < layout.start_offset:
+            raise ValueError("fichier trop court ou sans en-tête valide.")
+
+        yield from read_chunks(source, layout.count(len(source)), layout=layout)
+        return
+
+    if layout is None or layout == "auto":
+        layout, source = sniff_layout(source)
+    layout = get_layout(layout)
+
+    read_header(source, layout)
+    yield from (read_chunks_stream(source, layout) if mode == "stream"
+                else _mapped_chunks(source, read_chunks, layout))
+
+
+def iter_record_chunks(source, mode=None, stats=None, layout=None):
+    """Produit les enregistrements non vides d'un .dat, par lots de (code, texte).
+
+    `source` et `layout` : voir iter_text_chunks().  Avec `stats`
+    (RunStats), l'extraction des textes (« decode ») et leur découpage
+    (« parse ») sont chronométrés par lot, et les blocs vides comptés
+    (« empty_blocks »).
+    """
+    chunks = iter_text_chunks(source, mode, layout)
+
+    if stats is None:
+        for texts in chunks:
+            yield split_rows(texts)
+        return
+
+    for texts in stats.timed("decode", chunks):
+        with stats.phase("parse"):
+            rows = split_rows(texts)
+        stats.count("empty_blocks", len(texts) - len(rows))
+        yield rows
+
+
+def _mapped_chunks(f_in, read_chunks, layout):
+    """Lots de textes d'un fichier mappé ; lecture par lots s'il n'est pas mappable."""
+    try:
+        fileno = f_in.fileno()
+        mm = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        yield from _buffered_chunks(f_in, read_chunks, layout)
+        return
+
+    with mm:
+        yield from read_chunks(mm, layout.count(len(mm)), layout=layout)
+
+
+def _buffered_chunks(f_in, read_chunks, layout):
+    """Lots de textes d'un flux non mappable (tube, stdin) : CHUNK_ROWS blocs par lecture.
+
+    Le tampon réserve les 52 octets d'en-tête pour que les lecteurs de
+    zone travaillent avec les mêmes offsets que sur un fichier mappé.
+    """
+    block_size = layout.record_size
+    buffer = bytearray(layout.dat_size(CHUNK_ROWS))
+    zone   = memoryview(buffer)[layout.start_offset:]
+
+    while True:
+        filled = 0
+        while filled < len(zone):
+            n = f_in.readinto(zone[filled:])
+            if not n:
+                break
+            filled += n
+
+        # Un bloc final incomplet est ignoré, comme en lecture séquentielle.
+        if filled >= block_size:
+            yield from read_chunks(buffer, filled // block_size, layout=layout)
+
+        if filled < len(zone):
+            return
+
+
+def iter_dat_records(source, mode=None, layout=None):
+    """Produit chaque enregistrement non vide d'un .dat sous forme (code, texte)."""
+    for rows in iter_record_chunks(source, mode, layout=layout):
+        yield from rows
+
+
+def write_csv(source, f_out, mode=None, stats=None, layout=None):
+    """Écrit les enregistrements d'un .dat en CSV ; retourne le nombre de lignes."""
+    writer = csv.writer(f_out, delimiter=CSV_DELIMITER)
+    phase  = stats.phase if stats is not None else nullcontext
+    count  = 0
+
+    for rows in iter_record_chunks(source, mode, stats, layout):
+        with phase("write"):
+            writer.writerows(rows)
+        count += len(rows)
+
+    return count
+
+
+def dat_to_csv(source, mode=None, layout=None):
+    """Convertit un .dat (chemin, fichier ou octets) en contenu CSV (bytes latin-1).
+
+    Le CSV est encodé comme le .dat : latin-1 en ERO V7, sinon l'encodage
+    de la disposition.
+    """
+    if not isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)) \
+            and layout in (None, "auto"):
+        layout, source = sniff_layout(source)
+    layout = resolve_layout(source, layout)
+
+    f_out = io.StringIO(newline="")
+    write_csv(source, f_out, mode, layout=layout)
+    return f_out.getvalue().encode(layout.encoding)
+
+
+# ===========================================================================
+# DÉCODAGE PARALLÈLE PAR PLAGES D'ENREGISTREMENTS
+# ===========================================================================
+#
+#   Les frontières d'enregistrements sont purement arithmétiques
+#   (52 + 31 × n en ERO V7) : le fichier se découpe en plages contiguës
+#   sans aucun parcours.  Chaque processus mappe le fichier, décode sa plage en un
+#   morceau de CSV, et le parent recolle les morceaux dans l'ordre.  La
+#   sortie est identique à celle du décodage séquentiel.
+#
+# ===========================================================================
+
+RANGE_ROWS = 1 << 20            # Enregistrements par plage confiée à un processus.
+
+
+def decode_range(path, first, count, mode=None, layout=DEFAULT_LAYOUT):
+    """Décode une plage d'enregistrements en CSV ; retourne (octets latin-1, lignes)."""
+    mode = mode or READ_MODE
+    read_chunks = read_chunks_numpy if mode == "numpy" and np is not None else read_chunks_mmap
+
+    f_out = io.StringIO(newline="")
+    writer = csv.writer(f_out, delimiter=CSV_DELIMITER)
+    rows = 0
+
+    with open(path, "rb") as f_in, mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for texts in read_chunks(mm, count, first, layout):
+            chunk = split_rows(texts)
+            writer.writerows(chunk)
+            rows += len(chunk)
+
+    return f_out.getvalue().encode(layout.encoding), rows
+
+
+def write_csv_parallel(path, f_out, workers=None, mode=None, range_rows=RANGE_ROWS, stats=None,
+                       layout=None):
+    """Écrit le CSV d'un .dat dans `f_out` (binaire), plages décodées en parallèle.
+
+    Retourne le nombre de lignes écrites.  Avec `stats`, « decode »
+    mesure l'attente des plages décodées et « write » leur écriture.
+    La disposition est détectée une fois, puis transmise aux processus.
+    """
+    workers = workers or os.cpu_count() or 1
+    phase   = stats.phase if stats is not None else nullcontext
+    layout  = resolve_layout(path, layout)
+
+    with open(path, "rb") as f_in:
+        read_header(f_in, layout)
+        total = layout.count(os.fstat(f_in.fileno()).st_size)
+
+    ranges = [(first, min(range_rows, total - first)) for first in range(0, total, range_rows)]
+    count = 0
+
+    if workers == 1 or len(ranges) <= 1:
+        for first, n in ranges:
+            with phase("decode"):
+                data, rows = decode_range(path, first, n, mode, layout)
+            with phase("write"):
+                f_out.write(data)
+            count += rows
+    else:
+        count = _write_ranges_parallel(path, f_out, workers, mode, ranges, phase, layout)
+
+    if stats is not None:
+        stats.count("empty_blocks", total - count)
+    return count
+
+
+def _write_ranges_parallel(path, f_out, workers, mode, ranges, phase, layout):
+    count = 0
+
+    # Fenêtre glissante : au plus 2 plages en attente par processus, pour
+    # borner la mémoire occupée par les morceaux pas encore écrits.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        ranges = iter(ranges)
+
+        for first, n in islice(ranges, 2 * workers):
+            pending.append(pool.submit(decode_range, path, first, n, mode, layout))
+
+        while pending:
+            with phase("decode"):
+                data, rows = pending.popleft().result()
+            with phase("write"):
+                f_out.write(data)
+            count += rows
+
+            for first, n in islice(ranges, 1):
+                pending.append(pool.submit(decode_range, path, first, n, mode, layout))
+
+    return count
@@ -0,0 +1,491 @@
+# ---------------------------------------------------------------------------
+# ero_converter/diff.py
+# Différence bloc à bloc entre deux .dat : rapport (texte ou JSON) et
+# patch applicable, sans export CSV.
+# ---------------------------------------------------------------------------
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+
+from .cache import HASH_CHUNK, detach_hardlink
+from .datfile import BLOCK_SIZE, HEADER_BYTES, START_OFFSET, decode_record
+from .mapped import replacing
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+# Zones de l'en-tête comparées séparément : (nom, début, fin).
+SECTIONS = (
+    ("header", 0, len(HEADER_BYTES)),
+    ("buffer", len(HEADER_BYTES), START_OFFSET),
+)
+
+WINDOW_ROWS   = 4096            # Blocs comparés d'un seul memcmp avant d'affiner.
+ANCHOR_ROWS   = 4               # Blocs identiques consécutifs qui resynchronisent.
+RESYNC_ROWS   = 256             # Première fenêtre de recherche d'une ancre (× 4 ensuite).
+MAX_RESYNC    = 65536           # Fenêtre maximale (mémoire bornée : ~10 Mo d'ancres).
+MAX_REPORTED  = 1000            # Enregistrements détaillés dans le rapport.
+PATCH_FORMAT  = "ero-dat-patch"
+PATCH_VERSION = 1
+
+
+# ===========================================================================
+# COMPARAISON DES ZONES D'ENREGISTREMENTS
+# ===========================================================================
+#
+#   Les deux zones sont mappées puis comparées par fenêtres de WINDOW_ROWS
+#   blocs (une comparaison d'octets, soit un memcmp) ; seule une fenêtre
+#   différente est affinée, par 64 blocs puis bloc par bloc.  Deux fichiers
+#   de millions d'enregistrements qui ne diffèrent que de quelques blocs
+#   se comparent donc à la vitesse de lecture du disque.
+#
+#   Après un bloc différent, les deux fichiers sont resynchronisés sur la
+#   première suite de ANCHOR_ROWS blocs identiques, trouvée par hachage
+#   des fenêtres de blocs de part et d'autre : une insertion ou une
+#   suppression ne décale pas tout le reste du fichier.  La fenêtre de
+#   recherche est bornée à MAX_RESYNC blocs : au-delà, le reste des deux
+#   zones forme une seule édition (remplacement complet).
+#
+#   Le résultat est une liste d'éditions (i0, i1, j0, j1) : les blocs
+#   [i0, i1) de l'ancien fichier deviennent les blocs [j0, j1) du nouveau.
+#
+# ===========================================================================
+
+def _offset(index):
+    return START_OFFSET + index * BLOCK_SIZE
+
+
+def _equal_prefix(old, new, i, j, count):
+    """Nombre de blocs identiques à partir de old[i] et new[j] (au plus `count`)."""
+    k = 0
+    for step in (WINDOW_ROWS, 64, 1):
+        while k + step <= count and (old[_offset(i + k):_offset(i + k + step)]
+                                     == new[_offset(j + k):_offset(j + k + step)]):
+            k += step
+    return k
+
+
+def _equal_suffix(old, new, i_end, j_end, count):
+    """Nombre de blocs identiques avant old[i_end] et new[j_end] (au plus `count`)."""
+    k = 0
+    for step in (WINDOW_ROWS, 64, 1):
+        while k + step <= count and (old[_offset(i_end - k - step):_offset(i_end - k)]
+                                     == new[_offset(j_end - k - step):_offset(j_end - k)]):
+            k += step
+    return k
+
+
+def _anchors(mm, first, count):
+    """Fenêtres de ANCHOR_ROWS blocs à partir de `first` : {octets: premier décalage}."""
+    zone = mm[_offset(first):_offset(first + count)]
+    width = ANCHOR_ROWS * BLOCK_SIZE
+    anchors = {}
+
+    for a in range(count - ANCHOR_ROWS + 1):
+        anchors.setdefault(zone[a * BLOCK_SIZE:a * BLOCK_SIZE + width], a)
+
+    return anchors
+
+
+def _resync(old, new, i, i_end, j, j_end):
+    """Plus petit (a, b) tel que old[i + a:] et new[j + b:] repartent ensemble, ou None."""
+    window = RESYNC_ROWS
+
+    while True:
+        la, lb = min(window, i_end - i), min(window, j_end - j)
+        anchors = _anchors(old, i, la)
+        zone = new[_offset(j):_offset(j + lb)]
+        width = ANCHOR_ROWS * BLOCK_SIZE
+        best = None
+
+        for b in range(lb - ANCHOR_ROWS + 1):
+            if best is not None and b >= sum(best):
+                break
+            a = anchors.get(zone[b * BLOCK_SIZE:b * BLOCK_SIZE + width])
+            if a is not None and (best is None or a + b < sum(best)):
+                best = (a, b)
+
+        if best is not None:
+            return best
+        if (la == i_end - i and lb == j_end - j) or window >= MAX_RESYNC:
+            return None
+        window = min(window * 4, MAX_RESYNC)
+
+
+def diff_blocks(old, new, n_old, n_new):
+    """Éditions qui transforment les `n_old` blocs de `old` en les `n_new` de `new`.
+
+    `old` et `new` sont des tampons (mmap, bytes) contenant en-tête et blocs.
+    """
+    # Tête et queue communes : le cas courant ne va pas plus loin.
+    head = _equal_prefix(old, new, 0, 0, min(n_old, n_new))
+    tail = _equal_suffix(old, new, n_old, n_new, min(n_old, n_new) - head)
+
+    i, i_end = head, n_old - tail
+    j, j_end = head, n_new - tail
+    edits = []
+
+    while i < i_end and j < j_end:
+        k = _equal_prefix(old, new, i, j, min(i_end - i, j_end - j))
+        i, j = i + k, j + k
+        if i == i_end or j == j_end:
+            break
+
+        found = _resync(old, new, i, i_end, j, j_end)
+        if found is None:
+            break
+
+        a, b = found
+        edits.append((i, i + a, j, j + b))
+        i, j = i + a, j + b
+
+    if i < i_end or j < j_end:
+        edits.append((i, i_end, j, j_end))
+
+    return edits
+
+
+# ===========================================================================
+# RAPPORT
+# ===========================================================================
+
+def _block(mm, index):
+    return mm[_offset(index):_offset(index + 1)]
+
+
+def _byte_runs(old, new, start, stop):
+    """Suites d'octets différents dans [start, stop) : [{offset, old, new}, ...]."""
+    runs = []
+    first = None
+
+    for offset in range(start, stop + 1):
+        differs = offset < stop and old[offset:offset + 1] != new[offset:offset + 1]
+        if differs and first is None:
+            first = offset
+        elif not differs and first is not None:
+            runs.append({"offset": first, "old": old[first:offset].hex(), "new": new[first:offset].hex()})
+            first = None
+
+    return runs
+
+
+def _changes(old, new, edits):
+    """Enregistrements ajoutés, supprimés et modifiés, dans l'ordre du fichier."""
+    for i0, i1, j0, j1 in edits:
+        paired = min(i1 - i0, j1 - j0)
+
+        for t in range(paired):
+            if _block(old, i0 + t) != _block(new, j0 + t):
+                yield "modified", i0 + t, j0 + t
+        for i in range(i0 + paired, i1):
+            yield "removed", i, None
+        for j in range(j0 + paired, j1):
+            yield "added", None, j
+
+
+def _describe(change, i, j, old, new):
+    if change == "added":
+        code, texte = decode_record(_block(new, j))
+        return {"change": change, "new_index": j, "code": code, "text": texte}
+    if change == "removed":
+        code, texte = decode_record(_block(old, i))
+        return {"change": change, "old_index": i, "code": code, "text": texte}
+    return {"change": change, "old_index": i, "new_index": j,
+            "old": list(decode_record(_block(old, i))),
+            "new": list(decode_record(_block(new, j)))}
+
+
+def _file_info(path, size):
+    return {
+        "file": os.fspath(path),
+        "size": size,
+        "records": max(0, size - START_OFFSET) // BLOCK_SIZE,
+        "trailing_bytes": max(0, size - START_OFFSET) % BLOCK_SIZE,
+    }
+
+
+class _Mapped:
+    """Un .dat ouvert et mappé en lecture, le temps d'une comparaison."""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+
+        if self.size < START_OFFSET:
+            raise ValueError(f"Fichier '{path}' trop court ou sans en-tête valide.")
+
+        self._file = open(path, "rb")
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.records = (self.size - START_OFFSET) // BLOCK_SIZE
+
+    def close(self):
+        self.mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def diff_dat(old_path, new_path, max_reported=MAX_REPORTED):
+    """Compare deux .dat ; retourne un rapport (dict, sérialisable en JSON).
+
+    En-tête et buffer sont comparés octet par octet, les enregistrements
+    bloc par bloc.  Seuls les `max_reported` premiers changements sont
+    détaillés ; les totaux portent sur tout le fichier.
+    """
+    with _Mapped(old_path) as old, _Mapped(new_path) as new:
+        report = {
+            "old": _file_info(old_path, old.size),
+            "new": _file_info(new_path, new.size),
+        }
+
+        for name, start, stop in SECTIONS:
+            report[name] = _byte_runs(old.mm, new.mm, start, stop)
+
+        edits = diff_blocks(old.mm, new.mm, old.records, new.records)
+        summary = {"added": 0, "removed": 0, "modified": 0}
+        records = []
+
+        for change, i, j in _changes(old.mm, new.mm, edits):
+            summary[change] += 1
+            if len(records) < max_reported:
+                records.append(_describe(change, i, j, old.mm, new.mm))
+
+        old_tail, new_tail = old.mm[_offset(old.records):], new.mm[_offset(new.records):]
+
+    # Bloc incomplet en fin de fichier (écriture interrompue, concaténation…).
+    report["trailing"] = {"old": old_tail.hex(), "new": new_tail.hex()} if old_tail != new_tail else None
+
+    report["summary"] = summary
+    report["records"] = records
+    report["truncated"] = sum(summary.values()) > len(records)
+    report["identical"] = not (report["header"] or report["buffer"] or report["trailing"]
+                               or any(summary.values()))
+    return report
+
+
+# ===========================================================================
+# PATCH
+# ===========================================================================
+#
+#   Un patch est un document JSON qui reconstruit exactement le nouveau
+#   fichier à partir de l'ancien :
+#
+#       {"format": "ero-dat-patch", "version": 1,
+#        "old": {"size", "sha256"}, "new": {"size", "sha256"},
+#        "header": 52 octets en hexadécimal, ou null s'il est inchangé,
+#        "edits": [[i0, i1, "blocs de remplacement en hexadécimal"], ...],
+#        "trailing": octets du bloc incomplet final (souvent "")}
+#
+#   Les indices des éditions sont ceux de l'ancien fichier.  L'empreinte de
+#   l'ancien fichier est vérifiée avant toute écriture.
+#
+# ===========================================================================
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f_in:
+        for chunk in iter(lambda: f_in.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_patch(old_path, new_path):
+    """Patch (dict, sérialisable en JSON) qui transforme `old_path` en `new_path`."""
+    with _Mapped(old_path) as old, _Mapped(new_path) as new:
+        header = new.mm[:START_OFFSET]
+        edits = [[i0, i1, new.mm[_offset(j0):_offset(j1)].hex()]
+                 for i0, i1, j0, j1 in diff_blocks(old.mm, new.mm, old.records, new.records)]
+
+        return {
+            "format": PATCH_FORMAT,
+            "version": PATCH_VERSION,
+            "old": {"size": old.size, "sha256": _sha256(old_path)},
+            "new": {"size": new.size, "sha256": _sha256(new_path)},
+            "header": header.hex() if header != old.mm[:START_OFFSET] else None,
+            "edits": edits,
+            "trailing": new.mm[_offset(new.records):].hex(),
+        }
+
+
+def apply_patch(path, patch, output=None):
+    """Applique `patch` à `path` ; écrit dans `output`, ou remplace `path`.
+
+    Si aucune édition ne change le nombre de blocs, `path` est modifié en
+    place (écritures positionnées, comme --patch, puis empreinte relue et
+    octets d'origine restaurés si elle diffère) ; sinon le nouveau
+    fichier est écrit à côté puis substitué d'un seul os.replace().
+    Retourne le nombre de blocs réécrits.  ValueError si le patch ne
+    correspond pas au fichier.
+    """
+    if patch.get("format") != PATCH_FORMAT or patch.get("version") != PATCH_VERSION:
+        raise ValueError("format de patch non reconnu.")
+
+    size = os.path.getsize(path)
+    if size != patch["old"]["size"] or _sha256(path) != patch["old"]["sha256"]:
+        raise ValueError(f"'{path}' n'est pas le fichier d'origine de ce patch.")
+
+    records = (size - START_OFFSET) // BLOCK_SIZE
+    edits = [(i0, i1, bytes.fromhex(blocks)) for i0, i1, blocks in patch["edits"]]
+    header = bytes.fromhex(patch["header"]) if patch["header"] else None
+    trailing = bytes.fromhex(patch["trailing"])
+    rewritten = sum(len(blocks) for _, _, blocks in edits) // BLOCK_SIZE
+
+    in_place = (output is None and patch["new"]["size"] == size
+                and all(len(blocks) == (i1 - i0) * BLOCK_SIZE for i0, i1, blocks in edits))
+
+    if in_place:
+        # (offset, octets) à écrire ; les octets d'origine sont gardés pour
+        # restaurer le fichier si le résultat n'a pas l'empreinte attendue.
+        writes = [(_offset(i0), blocks) for i0, _, blocks in edits]
+        writes.append((_offset(records), trailing))
+        if header is not None:
+            writes.insert(0, (0, header))
+
+        detach_hardlink(path)
+        with open(path, "r+b", buffering=0) as f_dat:
+            saved = []
+            for offset, data in writes:
+                f_dat.seek(offset)
+                saved.append((offset, f_dat.read(len(data))))
+
+            for offset, data in writes:
+                f_dat.seek(offset)
+                f_dat.write(data)
+            os.fsync(f_dat.fileno())
+
+            if _sha256(path) != patch["new"]["sha256"]:
+                for offset, data in saved:
+                    f_dat.seek(offset)
+                    f_dat.write(data)
+                f_dat.truncate(size)
+                os.fsync(f_dat.fileno())
+                raise ValueError("le fichier reconstruit ne correspond pas à l'empreinte du patch.")
+        return rewritten
+
+    digest = hashlib.sha256()
+
+    with replacing(output or path) as tmp, open(path, "rb") as f_old, open(tmp, "wb") as f_new:
+        def emit(data):
+            digest.update(data)
+            f_new.write(data)
+
+        def copy(first, last):
+            f_old.seek(_offset(first))
+            remaining = (last - first) * BLOCK_SIZE
+            while remaining:
+                chunk = f_old.read(min(HASH_CHUNK, remaining))
+                emit(chunk)
+                remaining -= len(chunk)
+
+        emit(header if header is not None else f_old.read(START_OFFSET))
+
+        position = 0
+        for i0, i1, blocks in edits:
+            copy(position, i0)
+            emit(blocks)
+            position = i1
+        copy(position, records)
+        emit(trailing)
+
+        if digest.hexdigest() != patch["new"]["sha256"]:
+            raise ValueError("le fichier reconstruit ne correspond pas à l'empreinte du patch.")
+
+    return rewritten
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def format_report(report, limit=20):
+    """Rapport lisible : zones de l'en-tête, totaux, premiers changements."""
+    old, new = report["old"], report["new"]
+    lines = [f"--- DIFF ERO : {old['file']} ({old['records']:,} enr.) → "
+             f"{new['file']} ({new['records']:,} enr.) ---"]
+
+    for name, label in (("header", "En-tête"), ("buffer", "Buffer ")):
+        runs = report[name]
+        if not runs:
+            lines.append(f"{label} : identique")
+        for run in runs:
+            lines.append(f"{label} : offset {run['offset']} : {run['old']} → {run['new']}")
+
+    if report["trailing"]:
+        lines.append(f"Fin     : bloc incomplet {report['trailing']['old'] or '(aucun)'} → "
+                     f"{report['trailing']['new'] or '(aucun)'}")
+
+    summary = report["summary"]
+    lines.append(f"Enregistrements : {summary['modified']:,} modifié(s), "
+                 f"{summary['added']:,} ajouté(s), {summary['removed']:,} supprimé(s)")
+
+    for record in report["records"][:limit]:
+        if record["change"] == "added":
+            lines.append(f"  + #{record['new_index']} {record['code']};{record['text']}")
+        elif record["change"] == "removed":
+            lines.append(f"  - #{record['old_index']} {record['code']};{record['text']}")
+        else:
+            lines.append(f"  ~ #{record['old_index']} → #{record['new_index']} "
+                         f"{';'.join(record['old'])}  →  {';'.join(record['new'])}")
+
+    shown = min(limit, len(report["records"]))
+    if sum(summary.values()) > shown:
+        lines.append(f"  … {sum(summary.values()) - shown:,} autre(s) changement(s)")
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ero_converter.diff",
+        description="Différence bloc à bloc entre deux .dat, ou application d'un patch.")
+    parser.add_argument("files", nargs="+", metavar="FICHIER",
+                        help="ANCIEN.dat NOUVEAU.dat ; avec --apply : CIBLE.dat [SORTIE.dat]")
+    parser.add_argument("--json", action="store_true", help="rapport complet en JSON sur stdout")
+    parser.add_argument("--patch", metavar="FICHIER", help="écrit un patch applicable (JSON)")
+    parser.add_argument("--apply", metavar="PATCH", help="applique un patch produit par --patch")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="changements listés dans le rapport texte (défaut : 20)")
+    args = parser.parse_args(argv)
+
+    if len(args.files) != 2 and not (args.apply and len(args.files) == 1):
+        parser.error("deux fichiers attendus (un seul, ou deux, avec --apply)")
+
+    try:
+        if args.apply:
+            with open(args.apply, encoding="utf-8") as f_patch:
+                patch = json.load(f_patch)
+            output = args.files[1] if len(args.files) == 2 else None
+            rewritten = apply_patch(args.files[0], patch, output)
+            print(f"SUCCÈS : {rewritten:,} bloc(s) réécrit(s) → {output or args.files[0]}")
+            return 0
+
+        report = diff_dat(args.files[0], args.files[1])
+
+        if args.patch:
+            with open(args.patch, "w", encoding="utf-8") as f_patch:
+                json.dump(make_patch(args.files[0], args.files[1]), f_patch)
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"ERREUR : {exc}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report, args.limit))
+
+    # Comme diff(1) : 0 si identiques, 1 si différents.
+    return 0 if report["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
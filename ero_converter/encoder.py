@@ -0,0 +1,233 @@
+# ---------------------------------------------------------------------------
+# ero_converter/encoder.py
+# Génération : lignes CSV → enregistrements binaires ERO.
+# ---------------------------------------------------------------------------
+
+import csv
+import io
+import os
+from contextlib import nullcontext
+from itertools import islice
+
+from .compress import open_input
+from .datfile import ENCODING
+from .layout import DEFAULT_LAYOUT, get_layout
+from .sniff import sniff_encoding, sniff_head
+from .stdio import is_seekable, prepend
+from .transcode import Transcoder
+
+try:
+    import numpy as np          # Optionnel : chemin d'encodage vectorisé.
+except ImportError:
+    np = None
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+CHUNK_ROWS  = 65536             # Enregistrements encodés par écriture.
+USE_NUMPY   = np is not None    # Chemin NumPy (S31) si disponible.
+
+# Encodages
+CSV_ENCODING = "utf-8-sig"      # Consomme silencieusement le BOM (EF BB BF) s'il est présent.
+DAT_ENCODING = ENCODING         # Format cible du fichier binaire (legacy ERO).
+CSV_DELIMITER = ";"
+
+
+# ===========================================================================
+# LECTURE DU CSV
+# ===========================================================================
+
+def iter_csv_rows(source, encoding=None):
+    """Produit les lignes (listes de champs) d'un CSV source.
+
+    `source` est un chemin, un objet fichier (texte ou binaire) ou un
+    tampon d'octets.  Les sources binaires sont décodées en `encoding` ;
+    par défaut, l'encodage est détecté par sniff_encoding() (UTF-8 avec ou
+    sans BOM, sinon latin-1) lorsque la source peut être relue, et vaut
+    CSV_ENCODING pour un flux non positionnable.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", newline="", encoding=encoding or sniff_encoding(source)) as f_in:
+            yield from csv.reader(f_in, delimiter=CSV_DELIMITER)
+        return
+
+    if isinstance(source, io.TextIOBase):
+        yield from csv.reader(source, delimiter=CSV_DELIMITER)
+        return
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    if encoding is None:
+        encoding = sniff_encoding(source) if source.seekable() else CSV_ENCODING
+
+    # Le wrapper est détaché en sortie : le fichier de l'appelant reste ouvert.
+    f_in = io.TextIOWrapper(source, encoding=encoding, newline="")
+    try:
+        yield from csv.reader(f_in, delimiter=CSV_DELIMITER)
+    finally:
+        f_in.detach()
+
+
+def open_csv(source):
+    """Ouvre un CSV en texte, décompressé à la volée et dans l'encodage détecté.
+
+    `source` est un chemin, « - » (stdin) ou un couple (archive zip,
+    membre) ; gzip et xz sont reconnus à leur signature.  Un fichier est
+    validé en entier, en flux ; un tube ou un flux décompressé ne se
+    rembobine pas : seul son premier Mio est examiné, puis rejoué.
+    L'encodage retenu est exposé par l'attribut `encoding`.
+    """
+    f_raw, _ = open_input(source)
+
+    if is_seekable(f_raw):
+        encoding = sniff_encoding(f_raw)
+    else:
+        encoding, head = sniff_head(f_raw)
+        f_raw = prepend(head, f_raw)
+
+    return io.TextIOWrapper(f_raw, encoding=encoding, newline="")
+
+
+# ===========================================================================
+# MOTEUR D'ENCODAGE PAR LOTS
+# ===========================================================================
+#
+#   Les lignes sont encodées par lots de CHUNK_ROWS enregistrements dans un
+#   seul tampon pré-rempli de 0xCD : chaque payload et son \x00 sont posés
+#   à l'offset du bloc i, puis le lot entier part en une seule écriture.
+#   Le résultat est identique octet par octet à la construction historique
+#   payload + b"\x00" + padding.  Une autre disposition (`layout`) change
+#   la largeur, le terminateur, le padding et l'encodage des payloads.
+#
+# ===========================================================================
+
+def iter_payloads(rows, transcoder=None, layout=DEFAULT_LAYOUT):
+    """Produit le payload latin-1 (max 30 octets) de chaque ligne valide.
+
+    Les translittérations, remplacements et troncatures sont comptés par
+    le Transcoder fourni (un transcodeur sans détail sinon).
+    """
+    encode = (transcoder or Transcoder(keep_details=False)).encode
+    max_len, encoding = layout.max_payload, layout.encoding
+
+    for row in rows:
+        if not row or len(row) < 2:
+            continue
+
+        # Nettoyage des champs bruts (espaces parasites) puis
+        # concaténation : "code texte"
+        code = row[0].strip()
+        yield encode(code, f"{code} {row[1].strip()}", max_len, encoding)
+
+
+def encode_chunk(payloads, layout=DEFAULT_LAYOUT):
+    """Encode une liste de payloads en un bloc contigu de 31 × n octets."""
+    block_size = layout.record_size
+    terminator = layout.terminator[0]
+    buf = bytearray(layout.pad_record * len(payloads))
+
+    offset = 0
+    for payload in payloads:
+        end = offset + len(payload)
+        buf[offset:end] = payload
+        buf[end] = terminator
+        offset += block_size
+
+    return buf
+
+
+def encode_chunk_numpy(payloads, layout=DEFAULT_LAYOUT):
+    """Variante NumPy : matrice à largeur fixe S31, padding appliqué en masse."""
+    lengths = np.fromiter(map(len, payloads), dtype=np.intp, count=len(payloads))
+
+    # S31 complète chaque payload par des \x00 : l'octet lengths[i] est donc
+    # déjà le terminateur, tout ce qui suit devient du padding 0xCD.
+    records = np.array(payloads, dtype=layout.dtype)
+    matrix  = records.view(np.uint8).reshape(len(payloads), layout.record_size)
+    matrix[layout.columns > lengths[:, None]] = layout.pad_byte
+
+    if layout.terminator[0]:
+        matrix[np.arange(len(payloads)), lengths] = layout.terminator[0]
+
+    return matrix
+
+
+def encode_records(rows, chunk_rows=CHUNK_ROWS, use_numpy=USE_NUMPY, transcoder=None, stats=None,
+                   layout=None):
+    """Produit les lots encodés (31 × n octets) des lignes du CSV.
+
+    Avec `stats` (RunStats), la lecture des lignes (« parse ») et leur
+    encodage (« encode ») sont chronométrés par lot, et les lignes de
+    moins de deux champs comptées (« skipped_rows »).
+    """
+    layout = get_layout(layout)
+    encode = encode_chunk_numpy if use_numpy and np is not None else encode_chunk
+
+    if stats is not None:
+        yield from _encode_records_timed(rows, chunk_rows, encode, transcoder, stats, layout)
+        return
+
+    payloads = iter_payloads(rows, transcoder, layout)
+
+    while True:
+        chunk = list(islice(payloads, chunk_rows))
+        if not chunk:
+            break
+
+        yield encode(chunk, layout)
+
+
+def _encode_records_timed(rows, chunk_rows, encode, transcoder, stats, layout):
+    # Les lignes du lot sont d'abord matérialisées pour séparer lecture et
+    # encodage ; le chemin non instrumenté reste un flux unique, plus rapide.
+    transcoder = transcoder or Transcoder(keep_details=False)
+    rows = iter(rows)
+
+    while True:
+        with stats.phase("parse"):
+            batch = list(islice(rows, chunk_rows))
+        if not batch:
+            break
+
+        with stats.phase("encode"):
+            payloads = list(iter_payloads(batch, transcoder, layout))
+            block = encode(payloads, layout) if payloads else None
+
+        stats.count("skipped_rows", len(batch) - len(payloads))
+        if block is not None:
+            yield block
+
+
+def write_records(rows, f_out, chunk_rows=CHUNK_ROWS, use_numpy=USE_NUMPY, transcoder=None,
+                  stats=None, layout=None):
+    """Écrit tous les enregistrements par lots ; retourne leur nombre."""
+    layout = get_layout(layout)
+    phase  = stats.phase if stats is not None else nullcontext
+    count  = 0
+
+    for block in encode_records(rows, chunk_rows, use_numpy, transcoder, stats, layout):
+        with phase("write"):
+            f_out.write(block)
+        count += memoryview(block).nbytes // layout.record_size
+
+    return count
+
+
+def write_dat(rows, f_out, transcoder=None, stats=None, layout=None):
+    """Écrit un .dat complet (en-tête + enregistrements) ; retourne le nombre d'enregistrements."""
+    layout = get_layout(layout)
+
+    # Injection de la structure en-tête (offsets 0–52 en ERO V7).
+    f_out.write(layout.header)
+
+    return write_records(rows, f_out, transcoder=transcoder, stats=stats, layout=layout)
+
+
+def csv_to_dat(source, transcoder=None, layout=None):
+    """Convertit un CSV (chemin, fichier ou octets) en contenu .dat (bytes)."""
+    f_out = io.BytesIO()
+    write_dat(iter_csv_rows(source), f_out, transcoder, layout=layout)
+    return f_out.getvalue()
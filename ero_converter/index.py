@@ -0,0 +1,310 @@
+# ---------------------------------------------------------------------------
+# ero_converter/index.py
+# Index persistant code → enregistrement (fichier annexe .dat.idx).
+# ---------------------------------------------------------------------------
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .datfile import BLOCK_SIZE, CHUNK_ROWS, ENCODING, START_OFFSET, EroDatFile
+
+try:
+    import numpy as np          # Optionnel : tri vectorisé à la reconstruction.
+except ImportError:
+    np = None
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+INDEX_SUFFIX = ".idx"           # categori_corrected.dat → categori_corrected.dat.idx
+INDEX_MAGIC  = b"EROIDX1\x00"
+
+
+# ===========================================================================
+# STRUCTURE DU FICHIER .IDX
+# ===========================================================================
+#
+#   Zone      Taille           Contenu
+#   --------  ---------------  --------------------------------------------
+#   En-tête   32 o             magic, taille et mtime (ns) du .dat, nombre
+#                              d'entrées, largeur des codes
+#   Codes     n × largeur      codes latin-1 triés, complétés par des \x00
+#   Records   n × 4 o          index (base 0) des enregistrements, uint32 LE
+#
+#   Les entrées sont triées par (code, index) : pour un code en doublon,
+#   la première entrée trouvée est le premier enregistrement du fichier.
+#   Les blocs vides ne sont pas indexés.
+#
+# ===========================================================================
+
+_HEADER = struct.Struct("<8sQqII")
+
+# Octets que str.strip() retire d'un texte latin-1 (\t, \x1c-\x1f, \x85, \xa0…).
+_SPACES = np.array([chr(i).isspace() for i in range(256)]) if np is not None else None
+
+
+def index_path(dat_path):
+    """Chemin du fichier index associé à un .dat."""
+    return os.fspath(dat_path) + INDEX_SUFFIX
+
+
+class _FixedWidthCodes:
+    """Vue séquence sur le blob de codes à largeur fixe (support de bisect)."""
+
+    def __init__(self, blob, width):
+        self.blob  = blob
+        self.width = width
+
+    def __len__(self):
+        return len(self.blob) // self.width if self.width else 0
+
+    def __getitem__(self, i):
+        start = i * self.width
+        return self.blob[start:start + self.width]
+
+
+# ===========================================================================
+# EXTRACTION VECTORISÉE DES CODES
+# ===========================================================================
+#
+#   Les blocs sont lus comme une matrice d'octets (vue S31 sur le fichier
+#   mappé, comme le mode numpy du décodeur).  Par lot : tout ce qui suit
+#   le premier \x00 est masqué, puis le code est l'intervalle qui va du
+#   premier caractère non blanc jusqu'au premier espace ou à la fin du
+#   texte sans ses blancs finaux, exactement decode_text().  Les codes
+#   sont ramenés en tête de ligne et lus comme des chaînes S31.
+#
+# ===========================================================================
+
+def _chunk_codes(matrix):
+    """Codes (S31, complétés par des \x00) des lignes d'une matrice n × 31."""
+    n = len(matrix)
+    columns = np.arange(BLOCK_SIZE)
+    rows    = np.arange(n)[:, None]
+
+    is_null = matrix == 0
+    lengths = np.where(is_null.any(axis=1), is_null.argmax(axis=1), BLOCK_SIZE)
+    valid   = columns < lengths[:, None]
+
+    filled = valid & ~_SPACES[matrix]
+    start  = filled.argmax(axis=1)
+    end    = BLOCK_SIZE - filled[:, ::-1].argmax(axis=1)
+
+    spaces = (matrix == 0x20) & valid & (columns > start[:, None])
+    cut    = np.where(spaces.any(axis=1), spaces.argmax(axis=1), BLOCK_SIZE)
+    size   = np.where(filled.any(axis=1), np.minimum(cut, end) - start, 0)
+
+    shifted = matrix[rows, np.minimum(start[:, None] + columns, BLOCK_SIZE - 1)]
+    shifted[columns >= size[:, None]] = 0
+    return shifted.view(f"S{BLOCK_SIZE}").ravel(), size
+
+
+def _scan_codes(dat_path, count):
+    """(codes non vides, index de leurs blocs) d'un .dat, en tableaux NumPy."""
+    keys, numbers = [], []
+
+    with open(dat_path, "rb") as f_dat:
+        if count <= 0:
+            return np.array([], dtype="S1"), np.array([], dtype=np.intp)
+
+        with mmap.mmap(f_dat.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for first in range(0, count, CHUNK_ROWS):
+                n = min(CHUNK_ROWS, count - first)
+                matrix = np.frombuffer(mm, dtype=f"S{BLOCK_SIZE}", count=n,
+                                       offset=START_OFFSET + first * BLOCK_SIZE)
+                codes, size = _chunk_codes(matrix.view(np.uint8).reshape(n, BLOCK_SIZE))
+                present = np.flatnonzero(size)
+                keys.append(codes[present])
+                numbers.append(present + first)
+                del matrix
+
+    keys = np.concatenate(keys)
+    width = max(int(np.char.str_len(keys).max()), 1) if len(keys) else 1
+    return keys.astype(f"S{width}"), np.concatenate(numbers)
+
+
+# ===========================================================================
+# INDEX DES CODES
+# ===========================================================================
+
+class CodeIndex:
+    """Index trié des codes d'un .dat, interrogé par dichotomie."""
+
+    def __init__(self, codes, width, records, dat_size=0, dat_mtime_ns=0):
+        self.codes        = _FixedWidthCodes(codes, width)
+        self.width        = width
+        self.records      = records
+        self.dat_size     = dat_size
+        self.dat_mtime_ns = dat_mtime_ns
+
+    def __len__(self):
+        return len(self.records)
+
+    # ------------------------------------------------------------------
+    # Construction, lecture, écriture.
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, dat_path):
+        """Reconstruit l'index depuis un .dat existant, en une passe."""
+        stat = os.stat(dat_path)
+
+        if np is not None:
+            keys, numbers = _scan_codes(dat_path, (stat.st_size - START_OFFSET) // BLOCK_SIZE)
+            order = np.argsort(keys, kind="stable")
+            records = array("I", numbers[order].astype("<u4").tobytes())
+            return cls(keys[order].tobytes(), keys.itemsize if len(keys) else 0, records,
+                       stat.st_size, stat.st_mtime_ns)
+
+        with EroDatFile(dat_path) as dat:
+            codes = [code.encode(ENCODING) for code, _ in dat]
+
+        numbers = [i for i, code in enumerate(codes) if code]
+        codes   = [codes[i] for i in numbers]
+        width   = max(map(len, codes), default=0)
+        order   = sorted(range(len(codes)), key=codes.__getitem__)
+        blob    = b"".join(codes[i].ljust(width, b"\x00") for i in order)
+        records = array("I", (numbers[i] for i in order))
+
+        return cls(blob, width, records, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, dat_path):
+        """Charge l'index annexe ; None s'il est absent ou périmé."""
+        try:
+            with open(index_path(dat_path), "rb") as f_idx:
+                data = f_idx.read()
+            stat = os.stat(dat_path)
+        except FileNotFoundError:
+            return None
+
+        if len(data) < _HEADER.size:
+            return None
+
+        magic, dat_size, dat_mtime_ns, count, width = _HEADER.unpack_from(data)
+
+        if magic != INDEX_MAGIC or len(data) != _HEADER.size + count * (width + 4):
+            return None
+
+        # L'index ne vaut que pour le .dat exact à partir duquel il a été bâti.
+        if dat_size != stat.st_size or dat_mtime_ns != stat.st_mtime_ns:
+            return None
+
+        codes_end = _HEADER.size + count * width
+        records = array("I", data[codes_end:])
+        if sys.byteorder == "big":
+            records.byteswap()
+
+        return cls(data[_HEADER.size:codes_end], width, records, dat_size, dat_mtime_ns)
+
+    def save(self, dat_path):
+        """Écrit l'index à côté du .dat."""
+        records = array("I", self.records)
+        if sys.byteorder == "big":
+            records.byteswap()
+
+        with open(index_path(dat_path), "wb") as f_idx:
+            f_idx.write(_HEADER.pack(INDEX_MAGIC, self.dat_size, self.dat_mtime_ns,
+                                     len(self.records), self.width))
+            f_idx.write(self.codes.blob)
+            f_idx.write(records.tobytes())
+
+    # ------------------------------------------------------------------
+    # Recherche.
+    # ------------------------------------------------------------------
+    def _key(self, code):
+        key = code.encode(ENCODING, errors="replace")
+        return key.ljust(self.width, b"\x00") if len(key) <= self.width else None
+
+    def find(self, code):
+        """Index (base 0) de tous les enregistrements portant ce code."""
+        key = self._key(code)
+        if key is None:
+            return []
+
+        lo = bisect_left(self.codes, key)
+        hi = bisect_right(self.codes, key, lo)
+        return list(self.records[lo:hi])
+
+    def first(self, code):
+        """Index du premier enregistrement portant ce code, ou None."""
+        key = self._key(code)
+        if key is None:
+            return None
+
+        pos = bisect_left(self.codes, key)
+        if pos < len(self.records) and self.codes[pos] == key:
+            return self.records[pos]
+        return None
+
+
+# ===========================================================================
+# POINTS D'ENTRÉE
+# ===========================================================================
+
+def build_index(dat_path):
+    """(Re)construit et écrit l'index annexe d'un .dat ; le retourne."""
+    index = CodeIndex.build(dat_path)
+    index.save(dat_path)
+    return index
+
+
+def open_index(dat_path):
+    """Index à jour du .dat : celui sur disque, ou reconstruit s'il est périmé."""
+    index = CodeIndex.load(dat_path)
+    return index if index is not None else build_index(dat_path)
+
+
+def lookup(dat_path, code, index=None):
+    """Enregistrement (code, texte) portant ce code, ou None.
+
+    Seul le bloc trouvé est lu dans le .dat.
+    """
+    if index is None:
+        index = open_index(dat_path)
+
+    number = index.first(code)
+    if number is None:
+        return None
+
+    with EroDatFile(dat_path) as dat:
+        return dat[number]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    if len(argv) < 2:
+        print("Usage : python -m ero_converter.index fichier.dat CODE [CODE ...]")
+        return 2
+
+    dat_path, codes = argv[0], argv[1:]
+
+    if not os.path.exists(dat_path):
+        print(f"Erreur : Fichier '{dat_path}' introuvable.")
+        return 1
+
+    index = open_index(dat_path)
+    missing = 0
+
+    with EroDatFile(dat_path) as dat:
+        for code in codes:
+            number = index.first(code)
+
+            if number is None:
+                print(f"{code} : introuvable")
+                missing += 1
+            else:
+                code_lu, texte = dat[number]
+                print(f"{code_lu};{texte}  (enregistrement {number + 1}, offset {dat.offset(number)})")
+
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
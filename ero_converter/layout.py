@@ -0,0 +1,196 @@
+# ---------------------------------------------------------------------------
+# ero_converter/layout.py
+# Registre des dispositions de .dat (en-tête, largeur, terminateur,
+# padding, encodage) et détection de la disposition d'un fichier.
+# ---------------------------------------------------------------------------
+
+import json
+
+from .datfile import BLOCK_SIZE, BUFFER_BYTES, ENCODING, HEADER_BYTES, PAD_BYTE
+
+try:
+    import numpy as np          # Optionnel : dtype compilé pour les chemins vectorisés.
+except ImportError:
+    np = None
+
+
+# ===========================================================================
+# DISPOSITION D'UN .DAT
+# ===========================================================================
+#
+#   Une disposition décrit une variante du format :
+#
+#       header        octets d'en-tête écrits en tête de fichier (leur
+#                     longueur est l'offset du premier enregistrement)
+#       record_size   largeur fixe d'un enregistrement
+#       terminator    octet qui clôt le payload
+#       pad_byte      octet de remplissage après le terminateur
+#       encoding      encodage mono-octet du payload
+#       signature     préfixe reconnu à la détection (défaut : l'en-tête)
+#
+#   Les codecs (dtype NumPy, bloc de padding) sont compilés une fois, à
+#   la création : les lecteurs et l'encodeur les réutilisent à chaque lot.
+#
+# ===========================================================================
+
+class Layout:
+    """Variante du format .dat, avec ses codecs précompilés."""
+
+    def __init__(self, name, header, record_size, terminator=b"\x00", pad_byte=PAD_BYTE,
+                 encoding=ENCODING, signature=None):
+        if len(terminator) != 1:
+            raise ValueError(f"disposition '{name}' : le terminateur fait un octet")
+        if record_size < 2:
+            raise ValueError(f"disposition '{name}' : largeur d'enregistrement trop petite")
+        if not _single_byte(encoding):
+            raise ValueError(f"disposition '{name}' : encodage '{encoding}' non mono-octet")
+
+        self.name        = name
+        self.header      = bytes(header)
+        self.record_size = record_size
+        self.terminator  = bytes(terminator)
+        self.pad_byte    = pad_byte
+        self.encoding    = encoding
+        self.signature   = bytes(header if signature is None else signature)
+
+        # Codecs compilés une fois pour toutes.
+        self.start_offset = len(self.header)
+        self.max_payload  = record_size - 1
+        self.null_char    = self.terminator.decode(encoding)
+        self.pad_record   = bytes([pad_byte]) * record_size
+        self.dtype        = np.dtype(f"S{record_size}") if np is not None else None
+        self.columns      = np.arange(record_size) if np is not None else None
+
+    def __repr__(self):
+        return (f"Layout({self.name!r}, header={self.start_offset} o, "
+                f"record_size={self.record_size}, encoding={self.encoding!r})")
+
+    def __reduce__(self):
+        # Les processus de décodage reconstruisent les codecs de leur côté.
+        return (Layout, (self.name, self.header, self.record_size, self.terminator,
+                         self.pad_byte, self.encoding, self.signature))
+
+    # ------------------------------------------------------------------
+    # Géométrie.
+    # ------------------------------------------------------------------
+    def dat_size(self, count):
+        """Taille exacte d'un fichier de `count` enregistrements."""
+        return self.start_offset + self.record_size * count
+
+    def count(self, size):
+        """Enregistrements complets d'un fichier de `size` octets."""
+        return max(0, size - self.start_offset) // self.record_size
+
+    def fits(self, size):
+        """Vrai si `size` vaut exactement en-tête + n enregistrements."""
+        return size >= self.start_offset and (size - self.start_offset) % self.record_size == 0
+
+    def offset(self, index):
+        return self.start_offset + index * self.record_size
+
+
+def _single_byte(encoding):
+    """Vrai si `encoding` code chaque caractère sur exactement un octet."""
+    try:
+        return (len(bytes(range(256)).decode(encoding, errors="replace")) == 256
+                and len(b"\xc3\xa9\x82\xa0\xe3\x81\x82".decode(encoding, errors="replace")) == 7)
+    except LookupError:
+        return False
+
+
+# ===========================================================================
+# REGISTRE
+# ===========================================================================
+
+LAYOUTS     = {}
+LAYOUTS_ENV = "ERO_LAYOUTS"     # Fichier JSON de dispositions chargé par les scripts.
+
+
+def register_layout(layout):
+    """Ajoute (ou remplace) une disposition au registre ; la retourne."""
+    LAYOUTS[layout.name] = layout
+    return layout
+
+
+# Format ERO V7 validé : en-tête 16 o + buffer 36 o, blocs de 31 octets.
+ERO_V7 = register_layout(Layout("ero-v7", HEADER_BYTES + BUFFER_BYTES, BLOCK_SIZE,
+                                signature=HEADER_BYTES))
+DEFAULT_LAYOUT = ERO_V7
+
+
+def get_layout(name=None):
+    """Disposition `name` (ou la disposition par défaut) ; ValueError si inconnue."""
+    if name is None:
+        return DEFAULT_LAYOUT
+    if isinstance(name, Layout):
+        return name
+    try:
+        return LAYOUTS[name]
+    except KeyError:
+        raise ValueError(f"disposition inconnue : '{name}' (connues : {', '.join(LAYOUTS)})") from None
+
+
+def load_layouts(path):
+    """Enregistre les dispositions décrites dans un fichier JSON ; retourne leurs noms.
+
+    Le fichier contient une liste d'objets :
+
+        {"name": "ero-v5", "header": "45524f00…", "record_size": 41,
+         "terminator": "00", "pad_byte": 205, "encoding": "latin-1",
+         "signature": "45524f00"}
+
+    Les octets sont en hexadécimal ; seuls name, header et record_size
+    sont obligatoires.
+    """
+    with open(path, encoding="utf-8") as f_in:
+        entries = json.load(f_in)
+
+    names = []
+    for entry in entries:
+        try:
+            layout = Layout(
+                entry["name"], bytes.fromhex(entry["header"]), int(entry["record_size"]),
+                bytes.fromhex(entry.get("terminator", "00")), int(entry.get("pad_byte", PAD_BYTE)),
+                entry.get("encoding", ENCODING),
+                bytes.fromhex(entry["signature"]) if "signature" in entry else None)
+        except (KeyError, TypeError) as exc:
+            raise ValueError(f"{path} : description de disposition invalide ({exc!r})") from None
+
+        register_layout(layout)
+        names.append(layout.name)
+
+    return names
+
+
+# ===========================================================================
+# DÉTECTION
+# ===========================================================================
+#
+#   Candidates : les dispositions dont la signature ouvre le fichier.  Parmi
+#   elles, celles dont la taille vaut exactement en-tête + n blocs passent
+#   devant ; à égalité, la signature la plus longue l'emporte, puis l'ordre
+#   d'enregistrement.  Sans taille connue (tube), la signature seule décide.
+#
+#   Un fichier dont aucune signature ne correspond (en-tête abîmé, BOM
+#   résiduel) est lu avec la disposition par défaut, comme l'a toujours
+#   fait le script d'audit : c'est à lui de signaler l'anomalie.
+#
+# ===========================================================================
+
+def signature_bytes():
+    """Octets de tête à lire pour pouvoir détecter toute disposition connue."""
+    return max(len(layout.signature) for layout in LAYOUTS.values())
+
+
+def detect_layout(head, size=None):
+    """Disposition d'un .dat d'après ses premiers octets et sa taille totale."""
+    candidates = [layout for layout in LAYOUTS.values() if head.startswith(layout.signature)]
+
+    if not candidates:
+        return DEFAULT_LAYOUT
+
+    def rank(layout):
+        fits = size is not None and layout.fits(size)
+        return (not fits, -len(layout.signature))
+
+    return min(candidates, key=rank)
@@ -0,0 +1,205 @@
+# ---------------------------------------------------------------------------
+# ero_converter/mapped.py
+# Écriture d'un .dat préalloué et mappé en mémoire, dans un fichier
+# temporaire substitué atomiquement à la cible.
+# ---------------------------------------------------------------------------
+
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+from .compress import compression_of, is_compressed_name, open_output
+from .datfile import CHUNK_ROWS
+from .layout import get_layout
+from .stdio import is_stdio
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+COUNT_CHUNK = 1 << 22           # Octets lus par appel lors du pré-comptage (4 Mio).
+MIN_ROWS    = CHUNK_ROWS        # Capacité initiale minimale, en enregistrements.
+FSYNC       = True              # Données sur disque avant la substitution.
+
+
+# ===========================================================================
+# PRÉ-COMPTAGE
+# ===========================================================================
+#
+#   Chaque enregistrement occupe au moins une ligne du CSV : le nombre de
+#   lignes majore le nombre d'enregistrements.  Le fichier est préalloué
+#   à cette taille, puis tronqué à la taille exacte 52 + 31 × n en fin de
+#   génération (lignes vides ou incomplètes, champs sur plusieurs lignes).
+#
+# ===========================================================================
+
+def count_lines(source):
+    """Majorant du nombre d'enregistrements d'un CSV sur disque, ou 0.
+
+    0 pour stdin et les sources compressées : le fichier est alors
+    agrandi au fil de l'écriture.
+    """
+    if not isinstance(source, str) or is_stdio(source) or compression_of(source):
+        return 0
+
+    lines = 0
+    last = b"\n"
+
+    with open(source, "rb", buffering=0) as f_in:
+        for chunk in iter(lambda: f_in.read(COUNT_CHUNK), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+
+    return lines + (last != b"\n")
+
+
+# ===========================================================================
+# SUBSTITUTION ATOMIQUE
+# ===========================================================================
+
+def _target_mode(path):
+    """Droits du fichier final : ceux de la cible existante, sinon 0666 - umask."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def replacing(path):
+    """Chemin temporaire voisin de `path`, substitué à `path` si le bloc réussit.
+
+    La cible n'existe jamais à moitié écrite : elle garde son ancien
+    contenu jusqu'au os.replace() final.  Un lien symbolique est suivi ;
+    un lien dur (entrée du cache) est remplacé sans toucher à l'inode
+    partagé.
+    """
+    path = os.path.realpath(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.",
+                               dir=os.path.dirname(path))
+    os.close(fd)
+
+    try:
+        yield tmp
+        os.chmod(tmp, _target_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# ===========================================================================
+# ÉCRITURE MAPPÉE
+# ===========================================================================
+#
+#   Le fichier est réservé d'un bloc sur le disque (posix_fallocate, sinon
+#   ftruncate), puis mappé : chaque lot encodé est copié dans les pages par
+#   un seul memcpy, sans appel système.  S'il manque de la place, le
+#   fichier double de taille et il est remappé.  À la fermeture, il est
+#   tronqué à la taille exacte des données écrites.
+#
+# ===========================================================================
+
+def _reserve(fd, start, size):
+    """Réserve les octets [start, size) : extents contigus si le système le permet."""
+    os.ftruncate(fd, size)
+
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, start, size - start)
+        except OSError:         # Non supporté (NFS, tmpfs ancien…) : ftruncate suffit.
+            pass
+
+
+class MappedWriter:
+    """Fichier binaire préalloué et mappé, à l'interface write() d'un fichier."""
+
+    def __init__(self, path, records=0, layout=None):
+        self._file = open(path, "w+b", buffering=0)
+        self._pos  = 0
+
+        try:
+            self._size = get_layout(layout).dat_size(max(records, MIN_ROWS))
+            _reserve(self._file.fileno(), 0, self._size)
+            self._mm = mmap.mmap(self._file.fileno(), self._size)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _grow(self, needed):
+        size = max(needed, 2 * self._size)
+
+        self._mm.close()
+        _reserve(self._file.fileno(), self._size, size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._size = size
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        end = self._pos + data.nbytes
+
+        if end > self._size:
+            self._grow(end)
+
+        self._mm[self._pos:end] = data
+        self._pos = end
+        return data.nbytes
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def close(self):
+        """Démappe, tronque à la taille écrite et synchronise le fichier."""
+        if self._file.closed:
+            return
+
+        try:
+            self._mm.close()
+            os.ftruncate(self._file.fileno(), self._pos)
+
+            if FSYNC:
+                os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def mapped_dat(path, records=0, layout=None):
+    """Écrit `path` via un MappedWriter temporaire, substitué à la fin du bloc `with`."""
+    with replacing(path) as tmp, MappedWriter(tmp, records, layout) as f_out:
+        yield f_out
+
+
+def is_mapped(path):
+    """Vrai si un .dat écrit vers `path` est mappé et substitué atomiquement (tout sauf « - »)."""
+    return not is_stdio(path)
+
+
+def open_dat_output(path, records=0, layout=None):
+    """Sortie d'un .dat : mappée et atomique sur disque, flux vers stdout.
+
+    Le .dat n'est jamais compressé : le logiciel ERO, le cache, l'index et
+    --verify lisent ses blocs en place.  ValueError pour une cible .gz/.xz.
+    `layout` ne sert qu'à dimensionner la préallocation.
+    """
+    if is_compressed_name(path):
+        raise ValueError(f"un .dat ne s'écrit pas compressé : '{path}'")
+    return mapped_dat(path, records, layout) if is_mapped(path) else open_output(path)
@@ -0,0 +1,257 @@
+# ---------------------------------------------------------------------------
+# ero_converter/merge.py
+# Fusion de plusieurs CSV en un seul .dat trié par code et dédoublonné,
+# en mémoire bornée (tri par runs déversés sur disque, fusion k-voies).
+# ---------------------------------------------------------------------------
+
+import argparse
+import heapq
+import os
+import pickle
+import sys
+import tempfile
+from itertools import islice
+
+from .batch import CONVERSION_ERRORS
+from .compress import is_compressed_name
+from .datfile import dat_size
+from .encoder import iter_csv_rows, open_csv, write_dat
+from .mapped import count_lines, open_dat_output
+from .transcode import LATIN1_TABLE, Transcoder
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+RUN_ROWS    = 1 << 18           # Lignes triées en mémoire avant déversement sur disque.
+SPILL_CHUNK = 4096              # Lignes par bloc pickle d'un run déversé (et relu).
+MAX_FANIN   = 64                # Runs fusionnés à la fois (fichiers ouverts, tampons).
+POLICIES    = ("first", "last", "error")
+
+
+# ===========================================================================
+# TRI PAR RUNS
+# ===========================================================================
+#
+#   Chaque ligne devient un quadruplet (code, source, rang, texte) : l'ordre
+#   naturel des tuples trie par code, puis par source, puis dans l'ordre du
+#   fichier.  Les sources sont lues par runs de `run_rows` lignes, triés en
+#   mémoire.  Tant que le total des runs gardés en mémoire reste sous
+#   `run_rows`, ils y restent (petites fusions : aucun accès disque) ; au
+#   delà, chaque run est déversé dans un fichier temporaire, par blocs
+#   pickle de SPILL_CHUNK lignes.
+#
+#   heapq.merge fusionne ensuite tous les runs en flux : la mémoire occupée
+#   reste de l'ordre de run_rows lignes plus un bloc par run déversé, quelle
+#   que soit la taille des sources.  Au-delà de MAX_FANIN runs, ils sont
+#   d'abord fusionnés par groupes en runs plus longs (fichiers ouverts et
+#   tampons de relecture restent bornés).
+#
+# ===========================================================================
+
+class MergeResult:
+    """Bilan d'une fusion : lignes lues par source, doublons, runs déversés."""
+
+    def __init__(self, sources):
+        self.sources    = list(sources)
+        self.rows       = [0] * len(self.sources)
+        self.records    = 0
+        self.duplicates = 0
+        self.spilled    = 0         # Runs déversés sur disque.
+
+    def __repr__(self):
+        return (f"MergeResult(sources={len(self.sources)}, rows={sum(self.rows)}, "
+                f"records={self.records}, duplicates={self.duplicates}, spilled={self.spilled})")
+
+
+def _source_rows(source, number):
+    """Quadruplets (code, source, rang, texte) des lignes valides d'un CSV."""
+    with open_csv(source) as f_in:
+        rows = (row for row in iter_csv_rows(f_in) if len(row) >= 2)
+        for rank, row in enumerate(rows):
+            yield row[0].strip(), number, rank, row[1].strip()
+
+
+def _spill(rows, directory):
+    """Écrit un run trié (liste ou flux) sur disque ; retourne son chemin."""
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    rows = iter(rows)
+
+    with os.fdopen(fd, "wb") as f_run:
+        while True:
+            chunk = list(islice(rows, SPILL_CHUNK))
+            if not chunk:
+                break
+            pickle.dump(chunk, f_run, pickle.HIGHEST_PROTOCOL)
+
+    return path
+
+
+def _read_run(path):
+    """Relit un run déversé, bloc par bloc, puis le supprime."""
+    with open(path, "rb") as f_run:
+        while True:
+            try:
+                chunk = pickle.load(f_run)
+            except EOFError:
+                break
+            yield from chunk
+
+    os.remove(path)
+
+
+def sorted_runs(sources, directory, result, run_rows=RUN_ROWS):
+    """Runs triés de toutes les sources : listes en mémoire ou lecteurs de fichiers."""
+    runs = []
+    in_memory = 0
+
+    for number, source in enumerate(sources):
+        rows = _source_rows(source, number)
+
+        while True:
+            run = list(islice(rows, run_rows))
+            if not run:
+                break
+
+            result.rows[number] += len(run)
+            run.sort()
+
+            if in_memory + len(run) <= run_rows:
+                runs.append(run)
+                in_memory += len(run)
+            else:
+                runs.append(_read_run(_spill(run, directory)))
+                result.spilled += 1
+
+    return runs
+
+
+def reduce_runs(runs, directory, result):
+    """Fusionne les runs par groupes de MAX_FANIN jusqu'à pouvoir tout fusionner d'un coup."""
+    while len(runs) > MAX_FANIN:
+        runs = [_read_run(_spill(heapq.merge(*runs[start:start + MAX_FANIN]), directory))
+                for start in range(0, len(runs), MAX_FANIN)]
+        result.spilled += len(runs)
+
+    return runs
+
+
+# ===========================================================================
+# FUSION ET DÉDOUBLONNAGE
+# ===========================================================================
+#
+#   Politiques pour un code présent plusieurs fois (dans une même source
+#   ou dans plusieurs) :
+#
+#       first   la première occurrence gagne (première source, puis
+#               première ligne) ;
+#       last    la dernière occurrence gagne ;
+#       error   la fusion s'arrête sur ValueError : aucun .dat n'est écrit.
+#
+# ===========================================================================
+
+def deduplicate(merged, policy, result):
+    """Lignes (code, texte) fusionnées, une par code selon `policy`."""
+    kept = None
+
+    for item in merged:
+        if kept is not None and item[0] == kept[0]:
+            result.duplicates += 1
+
+            if policy == "error":
+                raise ValueError(
+                    f"code '{item[0]}' en double : {result.sources[kept[1]]} (ligne valide "
+                    f"{kept[2] + 1}) et {result.sources[item[1]]} (ligne valide {item[2] + 1})")
+            if policy == "last":
+                kept = item
+            continue
+
+        if kept is not None:
+            yield kept[0], kept[3]
+        kept = item
+
+    if kept is not None:
+        yield kept[0], kept[3]
+
+
+def merge_csvs(sources, target, policy="first", transcoder=None, run_rows=RUN_ROWS,
+               tmp_dir=None):
+    """Fusionne les CSV `sources` en un .dat `target` trié par code ; retourne un MergeResult.
+
+    Les sources acceptent les mêmes formes que le générateur (chemin,
+    gzip/xz, « - »).  Le .dat est écrit par le moteur d'encodage par lots,
+    préalloué et substitué atomiquement : une fusion en échec laisse la
+    cible intacte.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"politique de doublons inconnue : {policy!r}")
+
+    result = MergeResult(sources)
+    capacity = sum(count_lines(source) for source in sources)
+
+    with tempfile.TemporaryDirectory(prefix="ero-merge-", dir=tmp_dir) as directory:
+        runs = reduce_runs(sorted_runs(sources, directory, result, run_rows), directory, result)
+        rows = deduplicate(heapq.merge(*runs), policy, result)
+
+        with open_dat_output(target, capacity) as f_out:
+            result.records = write_dat(rows, f_out, transcoder)
+
+    return result
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ero_converter.merge",
+        description="Fusion de plusieurs CSV en un .dat trié par code, sans doublon.")
+    parser.add_argument("sources", nargs="+", metavar="CSV",
+                        help="CSV sources, par ordre de priorité (gzip, xz, « - » acceptés)")
+    parser.add_argument("-o", "--output", default="categori_corrected.dat",
+                        help=".dat produit (défaut : %(default)s)")
+    parser.add_argument("--on-duplicate", choices=POLICIES, default="first",
+                        help="code en double : la première occurrence gagne, la dernière, "
+                             "ou erreur (défaut : %(default)s)")
+    parser.add_argument("--run-rows", type=int, default=RUN_ROWS, metavar="N",
+                        help="lignes triées en mémoire avant déversement sur disque "
+                             "(défaut : %(default)s)")
+    parser.add_argument("--tmp-dir", metavar="DIR",
+                        help="répertoire des runs déversés (défaut : répertoire temporaire)")
+    parser.add_argument("--no-translit", action="store_true",
+                        help="n'applique pas la table de translittération (’ → ', œ → oe, € → EUR…)")
+    args = parser.parse_args(argv)
+
+    if args.run_rows < 1:
+        parser.error("--run-rows doit être positif")
+    if args.sources.count("-") > 1:
+        parser.error("stdin (« - ») ne peut être lu qu'une fois")
+    if is_compressed_name(args.output):
+        parser.error(f"le .dat ne se compresse pas : '{args.output}'")
+
+    print("--- FUSION ERO ---")
+    transcoder = Transcoder(None if args.no_translit else LATIN1_TABLE, keep_details=False)
+
+    try:
+        result = merge_csvs(args.sources, args.output, args.on_duplicate, transcoder,
+                            args.run_rows, args.tmp_dir)
+    except CONVERSION_ERRORS as exc:
+        print(f"ERREUR : {exc}")
+        return 1
+
+    for source, rows in zip(result.sources, result.rows):
+        print(f"Source : {source} ({rows} lignes)")
+    print(f"Doublons : {result.duplicates} écartés (politique '{args.on_duplicate}')")
+    if result.spilled:
+        print(f"Tri    : {result.spilled} runs déversés sur disque")
+    print(f"Latin-1 : {transcoder.summary()}")
+    print("--- SUCCÈS ---")
+    print(f"{result.records} enregistrements écrits, triés par code.")
+    print(f"Taille : {dat_size(result.records)} octets (52 + 31 × {result.records})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# ---------------------------------------------------------------------------
+# ero_converter/patch.py
+# Mise à jour en place d'un .dat : seuls les blocs modifiés sont réécrits.
+# ---------------------------------------------------------------------------
+
+import os
+
+from .cache import detach_hardlink
+from .datfile import BLOCK_SIZE, START_OFFSET
+
+
+# ===========================================================================
+# PATCH PAR BLOCS
+# ===========================================================================
+#
+#   La largeur fixe des enregistrements fait correspondre chaque ligne du
+#   CSV à exactement un bloc de 31 octets.  Le contenu attendu est comparé
+#   lot par lot au fichier existant ; seules les suites de blocs différents
+#   sont réécrites (écritures positionnées), les nouveaux enregistrements
+#   sont ajoutés en fin de fichier et les blocs en trop sont tronqués.
+#   Le fichier obtenu est identique à une régénération complète.
+#
+# ===========================================================================
+
+class PatchResult:
+    """Bilan d'un patch : nombre d'enregistrements et de blocs touchés."""
+
+    def __init__(self):
+        self.records  = 0       # Enregistrements du fichier final.
+        self.modified = 0       # Blocs existants réécrits.
+        self.appended = 0       # Blocs ajoutés en fin de fichier.
+        self.removed  = 0       # Blocs supprimés par troncature.
+        self.header   = False   # En-tête (52 octets) réécrit.
+
+    @property
+    def touched(self):
+        return self.modified + self.appended + self.removed
+
+    def __repr__(self):
+        return (f"PatchResult(records={self.records}, modified={self.modified}, "
+                f"appended={self.appended}, removed={self.removed}, header={self.header})")
+
+
+def _changed_runs(old, new):
+    """Suites contiguës de blocs différents : [(premier, dernier + 1), ...]."""
+    runs = []
+    start = None
+
+    for i, offset in enumerate(range(0, len(new), BLOCK_SIZE)):
+        if old[offset:offset + BLOCK_SIZE] != new[offset:offset + BLOCK_SIZE]:
+            if start is None:
+                start = i
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+
+    if start is not None:
+        runs.append((start, len(new) // BLOCK_SIZE))
+
+    return runs
+
+
+def patch_dat(path, header, chunks):
+    """Met à jour `path` pour qu'il contienne `header` suivi des blocs `chunks`.
+
+    `chunks` est un itérable de tampons de 31 × n octets (tels que produits
+    par le moteur d'encodage par lots).  Retourne un PatchResult.
+    """
+    result = PatchResult()
+
+    # Un .dat issu du cache partage son inode avec l'entrée du cache.
+    detach_hardlink(path)
+
+    with open(path, "r+b", buffering=0) as f_dat:
+        size = os.fstat(f_dat.fileno()).st_size
+        existing = max(0, size - START_OFFSET) // BLOCK_SIZE
+
+        # --------------------------------------------------------------
+        # En-tête (offsets 0–52).
+        # --------------------------------------------------------------
+        if f_dat.read(START_OFFSET) != header:
+            f_dat.seek(0)
+            f_dat.write(header)
+            result.header = True
+
+        # --------------------------------------------------------------
+        # Comparaison lot par lot avec les blocs existants.
+        # --------------------------------------------------------------
+        index = 0
+
+        for chunk in chunks:
+            chunk = memoryview(chunk).cast("B")
+            n = len(chunk) // BLOCK_SIZE
+            overlap = max(0, min(n, existing - index))
+            base = START_OFFSET + index * BLOCK_SIZE
+
+            if overlap:
+                f_dat.seek(base)
+                old = f_dat.read(overlap * BLOCK_SIZE)
+                new = chunk[:overlap * BLOCK_SIZE]
+
+                if old != new:
+                    for first, last in _changed_runs(old, new):
+                        f_dat.seek(base + first * BLOCK_SIZE)
+                        f_dat.write(new[first * BLOCK_SIZE:last * BLOCK_SIZE])
+                        result.modified += last - first
+
+            if overlap < n:
+                f_dat.seek(base + overlap * BLOCK_SIZE)
+                f_dat.write(chunk[overlap * BLOCK_SIZE:])
+                result.appended += n - overlap
+
+            index += n
+
+        # --------------------------------------------------------------
+        # Troncature des enregistrements supprimés (et d'un éventuel
+        # bloc incomplet en fin de fichier).
+        # --------------------------------------------------------------
+        final_size = START_OFFSET + index * BLOCK_SIZE
+
+        if size != final_size:
+            f_dat.truncate(final_size)
+            result.removed = max(0, existing - index)
+
+        result.records = index
+
+    return result
@@ -0,0 +1,183 @@
+# ---------------------------------------------------------------------------
+# ero_converter/pipeline.py
+# Génération en pipeline : lecture, encodage et écriture se recouvrent.
+# ---------------------------------------------------------------------------
+
+import csv
+import io
+import os
+import queue
+import threading
+from contextlib import nullcontext
+
+from .encoder import CSV_DELIMITER, CSV_ENCODING, encode_records
+from .layout import get_layout
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+READ_SIZE   = 1 << 22           # Octets bruts lus par appel (4 Mio).
+QUEUE_DEPTH = 4                 # Morceaux en attente entre deux étages.
+
+_DONE = object()                # Fin de flux entre deux étages.
+
+
+# ===========================================================================
+# ÉTAGES
+# ===========================================================================
+#
+#   lecteur  ──(octets bruts)──▶  encodeur  ──(lots de 31 × n)──▶  écrivain
+#   (thread)                      (appelant)                       (thread)
+#
+#   Les files sont bornées à `queue_depth` morceaux : la mémoire occupée
+#   reste plafonnée à environ queue_depth × (READ_SIZE + un lot encodé)
+#   par file.  L'encodeur reçoit exactement les mêmes lignes qu'en lecture
+#   séquentielle : le .dat produit est identique octet par octet.
+#
+# ===========================================================================
+
+class _Stage(threading.Thread):
+    """Thread d'étage : en cas d'erreur, arrête tout le pipeline et conserve
+    l'exception pour l'appelant."""
+
+    def __init__(self, stop, target, *args):
+        super().__init__(daemon=True)
+        self._stop_event = stop
+        self._work  = target
+        self._args  = args
+        self.error  = None
+
+    def run(self):
+        try:
+            self._work(*self._args)
+        except BaseException as exc:
+            self.error = exc
+            self._stop_event.set()
+
+
+def _put(q, item, stop):
+    """put() bloquant, interrompu si le pipeline s'arrête."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    """get() bloquant, interrompu si le pipeline s'arrête."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _read_stage(f_raw, raw_q, stop, read_size, phase):
+    try:
+        while True:
+            with phase("read"):
+                data = f_raw.read(read_size)
+            if not data or not _put(raw_q, data, stop):
+                break
+    finally:
+        _put(raw_q, _DONE, stop)
+
+
+def _write_stage(f_out, out_q, stop, phase):
+    while True:
+        block = _get(out_q, stop)
+        if block is _DONE:
+            break
+        with phase("write"):
+            f_out.write(block)
+
+
+class _QueueReader(io.RawIOBase):
+    """Flux binaire alimenté par la file du lecteur (pour TextIOWrapper)."""
+
+    def __init__(self, raw_q, stop):
+        self._q    = raw_q
+        self._stop = stop
+        self._buf  = memoryview(b"")
+        self._pos  = 0
+        self._eof  = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._pos == len(self._buf) and not self._eof:
+            data = _get(self._q, self._stop)
+            if data is _DONE:
+                self._eof = True
+            else:
+                self._buf, self._pos = memoryview(data), 0
+
+        # Pas de découpe du morceau courant : seule la position avance.
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def write_dat_pipelined(source, f_out, queue_depth=QUEUE_DEPTH, read_size=READ_SIZE,
+                        encoding=CSV_ENCODING, transcoder=None, stats=None, layout=None):
+    """Équivalent de write_dat(iter_csv_rows(source), f_out), en pipeline.
+
+    `source` est un chemin ou un fichier binaire (stdin…).  Retourne le
+    nombre d'enregistrements écrits.  Avec `stats`, chaque étage est
+    chronométré dans son thread (« read », « parse », « encode », « write »).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb", buffering=0) as f_raw:
+            return write_dat_pipelined(f_raw, f_out, queue_depth, read_size, encoding, transcoder,
+                                       stats, layout)
+
+    layout = get_layout(layout)
+
+    raw_q = queue.Queue(maxsize=queue_depth)
+    out_q = queue.Queue(maxsize=queue_depth)
+    stop  = threading.Event()
+    count = 0
+    phase = stats.phase if stats is not None else nullcontext
+
+    reader = _Stage(stop, _read_stage, source, raw_q, stop, read_size, phase)
+    writer = _Stage(stop, _write_stage, f_out, out_q, stop, phase)
+    reader.start()
+    writer.start()
+
+    try:
+        # Injection de la structure en-tête (offsets 0–52 en ERO V7).
+        _put(out_q, layout.header, stop)
+
+        f_text = io.TextIOWrapper(io.BufferedReader(_QueueReader(raw_q, stop), read_size),
+                                  encoding=encoding, newline="")
+        rows = csv.reader(f_text, delimiter=CSV_DELIMITER)
+
+        for block in encode_records(rows, transcoder=transcoder, stats=stats, layout=layout):
+            if not _put(out_q, block, stop):
+                break
+            count += memoryview(block).nbytes // layout.record_size
+
+        _put(out_q, _DONE, stop)
+        writer.join()
+    finally:
+        stop.set()
+        writer.join()
+        reader.join()
+
+    for stage in (reader, writer):
+        if stage.error is not None:
+            raise stage.error
+
+    return count
@@ -0,0 +1,107 @@
+# ---------------------------------------------------------------------------
+# ero_converter/sniff.py
+# Détection de l'encodage du CSV source, avant toute écriture.
+# ---------------------------------------------------------------------------
+
+import codecs
+import os
+
+from .datfile import BOM_UTF8
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+SNIFF_CHUNK = 1 << 20           # Octets validés par appel au décodeur.
+
+# Résultats possibles, du plus au moins probable pour un export Excel :
+#   utf-8-sig  BOM présent — le BOM est absorbé à la lecture
+#   utf-8      UTF-8 valide sans BOM
+#   latin-1    export ANSI : tout octet est accepté, aucun crash possible
+FALLBACK_ENCODING = "latin-1"
+
+
+# ===========================================================================
+# DÉTECTION
+# ===========================================================================
+#
+#   La validation UTF-8 se fait en flux, par morceaux de SNIFF_CHUNK, avec
+#   un décodeur incrémental : une séquence multi-octets coupée entre deux
+#   morceaux reste valide, et le fichier n'est jamais chargé en entier.
+#   Le premier octet invalide arrête la lecture.
+#
+# ===========================================================================
+
+def _sniff_stream(f_in, chunk_size):
+    head = f_in.read(len(BOM_UTF8))
+    encoding = "utf-8-sig" if head == BOM_UTF8 else "utf-8"
+
+    decoder = codecs.getincrementaldecoder("utf-8")("strict")
+
+    try:
+        if encoding == "utf-8":
+            decoder.decode(head)
+
+        for chunk in iter(lambda: f_in.read(chunk_size), b""):
+            decoder.decode(chunk)
+
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+    return encoding
+
+
+def sniff_encoding(source, chunk_size=SNIFF_CHUNK):
+    """Encodage à utiliser pour lire un CSV : 'utf-8-sig', 'utf-8' ou 'latin-1'.
+
+    `source` est un chemin, un tampon d'octets ou un fichier binaire
+    positionnable (sa position est restaurée).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f_in:
+            return _sniff_stream(f_in, chunk_size)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = memoryview(source)
+
+        if data[:len(BOM_UTF8)] == BOM_UTF8:
+            data, encoding = data[len(BOM_UTF8):], "utf-8-sig"
+        else:
+            encoding = "utf-8"
+
+        try:
+            codecs.decode(data, "utf-8")
+        except UnicodeDecodeError:
+            return FALLBACK_ENCODING
+        return encoding
+
+    position = source.tell()
+    try:
+        return _sniff_stream(source, chunk_size)
+    finally:
+        source.seek(position)
+
+
+def sniff_head(f_in, size=SNIFF_CHUNK):
+    """Détection sur le début d'un flux non positionnable (tube, stdin).
+
+    Retourne (encodage, octets lus) : les octets consommés doivent être
+    rejoués devant la suite du flux.  Seuls les `size` premiers octets
+    sont validés ; un octet invalide au-delà fera échouer le décodage.
+    """
+    head = f_in.read(size)
+    final = len(head) < size
+
+    if head[:len(BOM_UTF8)] == BOM_UTF8:
+        data, encoding = head[len(BOM_UTF8):], "utf-8-sig"
+    else:
+        data, encoding = head, "utf-8"
+
+    try:
+        codecs.getincrementaldecoder("utf-8")("strict").decode(data, final=final)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING, head
+
+    return encoding, head
@@ -0,0 +1,153 @@
+# ---------------------------------------------------------------------------
+# ero_converter/stats.py
+# Instrumentation d'une conversion : temps par phase, volumes, compteurs.
+# ---------------------------------------------------------------------------
+
+import importlib
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource             # Absent sous Windows : pic mémoire non mesuré.
+except ImportError:
+    resource = None
+
+
+# ===========================================================================
+# MÉMOIRE
+# ===========================================================================
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus, en Mo (None si non mesurable)."""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Kio sous Linux, en octets sous macOS.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+# ===========================================================================
+# MESURES D'UNE CONVERSION
+# ===========================================================================
+#
+#   Les phases sont chronométrées par lot (CHUNK_ROWS enregistrements), pas
+#   par ligne : le coût de la mesure reste négligeable.  Le temps CPU d'une
+#   phase est celui du thread qui l'exécute (time.thread_time), ce qui reste
+#   juste quand le pipeline fait tourner lecture et écriture en parallèle.
+#
+#   Un crochet est un appelable hook(événement, phase, stats), appelé avec
+#   "start" et "stop" autour de chaque mesure, puis ("done", None, stats)
+#   en fin de conversion : profileur maison, export vers la supervision…
+#
+# ===========================================================================
+
+class RunStats:
+    """Temps par phase, volumes et compteurs d'une conversion."""
+
+    def __init__(self, hooks=()):
+        self.phases    = {}     # nom → [secondes, secondes CPU, appels]
+        self.counters  = {}
+        self.records   = 0
+        self.bytes_in  = None
+        self.bytes_out = None
+        self.hooks     = list(hooks)
+        self._wall     = time.perf_counter()
+        self._cpu      = time.process_time()
+        self.elapsed   = None
+        self.cpu       = None
+
+    def _emit(self, event, name):
+        for hook in self.hooks:
+            hook(event, name, self)
+
+    @contextmanager
+    def phase(self, name):
+        """Chronomètre le bloc `with` et l'ajoute à la phase `name`."""
+        self._emit("start", name)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, [0.0, 0.0, 0])
+            entry[0] += time.perf_counter() - wall
+            entry[1] += time.thread_time() - cpu
+            entry[2] += 1
+            self._emit("stop", name)
+
+    def timed(self, name, iterable):
+        """Itère sur `iterable` en comptant chaque next() dans la phase `name`."""
+        iterator = iter(iterable)
+
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        """Fige les totaux et prévient les crochets."""
+        self.elapsed = time.perf_counter() - self._wall
+        self.cpu     = time.process_time() - self._cpu
+        self._emit("done", None)
+
+    # ------------------------------------------------------------------
+    # Rapport.
+    # ------------------------------------------------------------------
+    def as_dict(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._wall
+        cpu     = self.cpu if self.cpu is not None else time.process_time() - self._cpu
+
+        return {
+            "wall_s": round(elapsed, 6),
+            "cpu_s": round(cpu, 6),
+            "records": self.records,
+            "records_per_s": round(self.records / elapsed, 1) if elapsed else None,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_rss_mb": peak_rss_mb(),
+            "phases": {
+                name: {"wall_s": round(wall, 6), "cpu_s": round(cpu, 6), "calls": calls}
+                for name, (wall, cpu, calls) in self.phases.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self):
+        """Une ligne JSON, pour la supervision."""
+        return json.dumps(self.as_dict(), ensure_ascii=False, sort_keys=True)
+
+    def summary(self):
+        """Bilan lisible, une ligne par phase."""
+        data = self.as_dict()
+        lines = [f"Durée  : {data['wall_s']:.3f} s (CPU {data['cpu_s']:.3f} s), "
+                 f"{data['records_per_s'] or 0:,.0f} enr./s"]
+
+        for name, phase in data["phases"].items():
+            lines.append(f"  {name:<8} {phase['wall_s']:8.3f} s  (CPU {phase['cpu_s']:.3f} s)")
+
+        volumes = [f"{label} {value:,} o" for label, value in
+                   (("entrée", data["bytes_in"]), ("sortie", data["bytes_out"])) if value is not None]
+        if volumes:
+            lines.append(f"Volume : {', '.join(volumes)}")
+        if data["peak_rss_mb"] is not None:
+            lines.append(f"Mémoire : pic {data['peak_rss_mb']:.1f} Mo")
+        if data["counters"]:
+            lines.append("Compteurs : " + ", ".join(f"{k}={v}" for k, v in sorted(data["counters"].items())))
+
+        return "\n".join(lines)
+
+
+def load_hook(spec):
+    """Charge un crochet désigné par 'module:fonction'."""
+    module, _, name = spec.partition(":")
+    if not module or not name:
+        raise ValueError(f"crochet '{spec}' : forme attendue module:fonction")
+    return getattr(importlib.import_module(module), name)
@@ -0,0 +1,94 @@
+# ---------------------------------------------------------------------------
+# ero_converter/stdio.py
+# Entrées/sorties binaires : chemin ou « - » pour stdin/stdout.
+# ---------------------------------------------------------------------------
+
+import io
+import sys
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+STDIO       = "-"               # Nom réservé : stdin en lecture, stdout en écriture.
+BUFFER_SIZE = 4 << 20           # Tampon des flux standard (4 Mio, contre 8 Kio par défaut).
+
+
+# ===========================================================================
+# OUVERTURE
+# ===========================================================================
+
+def is_stdio(path):
+    """Vrai si `path` désigne l'entrée ou la sortie standard."""
+    return path == STDIO
+
+
+def open_binary(path, mode="rb", buffer_size=BUFFER_SIZE):
+    """Ouvre `path` en binaire, ou stdin/stdout si `path` vaut « - ».
+
+    Les flux standard du processus sont rouverts sur leur descripteur
+    avec un gros tampon (même si sys.stdout est redirigé) ; leur
+    fermeture ne ferme pas le descripteur.
+    """
+    if not is_stdio(path):
+        return open(path, mode, buffering=buffer_size)
+
+    if "r" in mode:
+        stream = sys.__stdin__
+    else:
+        stream = sys.__stdout__
+        stream.flush()
+
+    return open(stream.fileno(), mode, buffering=buffer_size, closefd=False)
+
+
+def is_seekable(f):
+    """Vrai si le fichier accepte seek() (fichier régulier, pas un tube)."""
+    try:
+        return f.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+# ===========================================================================
+# RELECTURE D'UN PRÉFIXE
+# ===========================================================================
+#
+#   Un tube ne se rembobine pas : les octets déjà lus pour inspecter le
+#   flux (en-tête, détection d'encodage) sont rejoués devant la suite.
+#
+# ===========================================================================
+
+class _Prefixed(io.RawIOBase):
+    """Flux binaire : `head`, puis le reste de `f_in` (fermé avec lui)."""
+
+    def __init__(self, head, f_in):
+        self._head = memoryview(head)
+        self._pos  = 0
+        self._f_in = f_in
+
+    def readable(self):
+        return True
+
+    def close(self):
+        if not self.closed:
+            self._f_in.close()
+        super().close()
+
+    def readinto(self, b):
+        if self._pos < len(self._head):
+            n = min(len(b), len(self._head) - self._pos)
+            b[:n] = self._head[self._pos:self._pos + n]
+            self._pos += n
+            return n
+        return self._f_in.readinto(b)
+
+
+def prepend(head, f_in, buffer_size=BUFFER_SIZE):
+    """Rejoue `head` devant la suite de `f_in` (fichier binaire non positionnable).
+
+    Le flux obtenu n'expose ni seek() ni fileno() : avec `head` vide, il
+    masque ceux d'un fichier décompressé à la volée.
+    """
+    return io.BufferedReader(_Prefixed(head, f_in), buffer_size)
@@ -0,0 +1,115 @@
+# ---------------------------------------------------------------------------
+# ero_converter/transcode.py
+# Transcodage vers latin-1 : translittération, remplacements et troncatures.
+# ---------------------------------------------------------------------------
+
+import csv
+
+from .datfile import BLOCK_SIZE, ENCODING
+
+
+# ===========================================================================
+# TABLE DE TRANSLITTÉRATION
+# ===========================================================================
+#
+#   Caractères typographiques fréquents dans les exports Excel, sans
+#   équivalent latin-1, et leur remplacement le plus proche.  Un caractère
+#   absent de la table et hors latin-1 devient « ? » comme auparavant.
+#
+# ===========================================================================
+
+LATIN1_TABLE = str.maketrans({
+    # Apostrophes et guillemets
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+    "‹": "<", "›": ">",
+    # Tirets et signes
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-",
+    "―": "-", "−": "-",
+    "…": "...", "•": "\xb7", "‰": "%", "†": "+", "‡": "+",
+    "™": "TM", "€": "EUR", "ˆ": "^", "˜": "~", "ƒ": "f",
+    # Ligatures et lettres de cp1252 absentes de latin-1
+    "Œ": "OE", "œ": "oe", "Š": "S", "š": "s",
+    "Ž": "Z", "ž": "z", "Ÿ": "Y",
+    # Espaces insécables et fines : NBSP latin-1
+    "\u2002": "\xa0", "\u2003": "\xa0", "\u2004": "\xa0", "\u2005": "\xa0",
+    "\u2006": "\xa0", "\u2007": "\xa0", "\u2008": "\xa0", "\u2009": "\xa0",
+    "\u200a": "\xa0", "\u202f": "\xa0", "\u205f": "\xa0",
+    # Caractères invisibles : supprimés
+    "\u200b": None, "\u200c": None, "\u200d": None, "\u2060": None, "\ufeff": None,
+})
+
+
+# ===========================================================================
+# TRANSCODEUR
+# ===========================================================================
+
+class Transcoder:
+    """Encode les textes en latin-1 et comptabilise les pertes.
+
+    Chemin rapide : encodage strict, sans gestionnaire d'erreur.  Seuls les
+    textes qui échouent passent par la table de translittération, puis par
+    le remplacement « ? » en dernier recours.  Chaque anomalie est notée
+    avec le code de la ligne :
+
+        transliterated  caractère remplacé via la table
+        replaced        caractère sans équivalent, devenu « ? »
+        truncated       payload de plus de 30 octets, tronqué
+    """
+
+    KINDS = ("transliterated", "replaced", "truncated")
+
+    def __init__(self, table=LATIN1_TABLE, keep_details=True):
+        self.table  = table
+        self.counts = dict.fromkeys(self.KINDS, 0)
+        self.keep_details = keep_details
+        self.details = []       # (code, anomalie, texte source)
+
+    def _note(self, code, kind, text):
+        self.counts[kind] += 1
+        if self.keep_details:
+            self.details.append((code, kind, text))
+
+    def encode(self, code, text, max_len=BLOCK_SIZE - 1, encoding=ENCODING):
+        """Payload latin-1 de `text` (ligne de code `code`), au plus `max_len` octets."""
+        try:
+            payload = text.encode(encoding)
+        except UnicodeEncodeError:
+            payload = self._encode_slow(code, text, encoding)
+
+        if len(payload) > max_len:
+            self._note(code, "truncated", text)
+            payload = payload[:max_len]
+
+        return payload
+
+    def _encode_slow(self, code, text, encoding):
+        if self.table is not None:
+            translated = text.translate(self.table)
+            try:
+                payload = translated.encode(encoding)
+            except UnicodeEncodeError:
+                pass
+            else:
+                self._note(code, "transliterated", text)
+                return payload
+        else:
+            translated = text
+
+        self._note(code, "replaced", text)
+        return translated.encode(encoding, errors="replace")
+
+    # ------------------------------------------------------------------
+    # Rapport.
+    # ------------------------------------------------------------------
+    def summary(self):
+        return (f"{self.counts['transliterated']} translittérés, "
+                f"{self.counts['replaced']} avec remplacement '?', "
+                f"{self.counts['truncated']} tronqués")
+
+    def write_report(self, path):
+        """Écrit le détail des anomalies en CSV : code;anomalie;texte source."""
+        with open(path, "w", newline="", encoding="utf-8-sig") as f_out:
+            writer = csv.writer(f_out, delimiter=";")
+            writer.writerow(["code", "anomalie", "texte"])
+            writer.writerows(self.details)
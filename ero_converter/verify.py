@@ -0,0 +1,178 @@
+# ---------------------------------------------------------------------------
+# ero_converter/verify.py
+# Vérification structurelle d'un .dat, bloc par bloc, sans export CSV.
+# ---------------------------------------------------------------------------
+
+import mmap
+import os
+import re
+
+from .datfile import BLOCK_SIZE, BOM_UTF8, BUFFER_BYTES, HEADER_BYTES, PAD_BYTE, START_OFFSET
+from .decoder import CHUNK_ROWS, np, record_view
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+MAX_REPORTED = 1000             # Enregistrements fautifs détaillés dans le rapport.
+
+# Anomalies détectées par bloc :
+#   no_terminator  aucun \x00 dans les 31 octets
+#   bad_padding    un octet différent de 0xCD après le terminateur
+#   bom            séquence EF BB BF dans le payload
+#   utf8           séquence UTF-8 stricte qu'aucun texte latin-1 ne
+#                  contient : caractère U+0080–U+00FF (C2 ou C3 suivi de
+#                  80–BF, « Ã© » pour « é »), ou séquence de 3 octets dont
+#                  un octet de continuation est un contrôle C1 (80–9F,
+#                  « â€™ » pour « ’ »), ou séquence de 4 octets F0–F4
+#                  suivi de trois octets 80–BF (emoji).  « à » suivi
+#                  d'une espace insécable (E0 A0) ou « é» » restent du
+#                  latin-1 valide.
+PROBLEMS = ("no_terminator", "bad_padding", "bom", "utf8")
+
+_UTF8_SEQUENCE = re.compile(rb"[\xc2\xc3][\x80-\xbf]"
+                            rb"|\xe0[\xa0-\xbf][\x80-\x9f]"
+                            rb"|\xed[\x80-\x9f][\x80-\xbf]"
+                            rb"|[\xe1-\xec\xee\xef](?:[\x80-\x9f][\x80-\xbf]|[\xa0-\xbf][\x80-\x9f])"
+                            rb"|[\xf0-\xf4][\x80-\xbf]{3}")
+
+
+# ===========================================================================
+# CONTRÔLE DES BLOCS
+# ===========================================================================
+
+def _check_chunk_python(mm, first, count):
+    """Anomalies de `count` blocs à partir de `first` : {index: [problèmes]}."""
+    found = {}
+    pad = bytes([PAD_BYTE]) * BLOCK_SIZE
+
+    for index in range(first, first + count):
+        offset = START_OFFSET + index * BLOCK_SIZE
+        block = mm[offset:offset + BLOCK_SIZE]
+        problems = []
+
+        null_idx = block.find(b"\x00")
+        if null_idx == -1:
+            problems.append("no_terminator")
+            payload = block
+        else:
+            if block[null_idx + 1:] != pad[null_idx + 1:]:
+                problems.append("bad_padding")
+            payload = block[:null_idx]
+
+        if BOM_UTF8 in payload:
+            problems.append("bom")
+        if _UTF8_SEQUENCE.search(payload):
+            problems.append("utf8")
+
+        if problems:
+            found[index] = problems
+
+    return found
+
+
+def _utf8_sequences(matrix, payload):
+    """Lignes contenant une séquence reconnue par _UTF8_SEQUENCE, en masse."""
+    lead, b1, b2 = matrix[:, :-2], matrix[:, 1:-1], matrix[:, 2:]
+    c1_b1, c1_b2 = (b1 >= 0x80) & (b1 <= 0x9F), (b2 >= 0x80) & (b2 <= 0x9F)
+    hi_b1, hi_b2 = (b1 >= 0xA0) & (b1 <= 0xBF), (b2 >= 0xA0) & (b2 <= 0xBF)
+
+    latin = ((matrix[:, :-1] == 0xC2) | (matrix[:, :-1] == 0xC3)) \
+        & (matrix[:, 1:] >= 0x80) & (matrix[:, 1:] <= 0xBF) & payload[:, 1:]
+    three = (((lead == 0xE0) & hi_b1 & c1_b2)
+             | ((lead == 0xED) & c1_b1 & (c1_b2 | hi_b2))
+             | ((lead >= 0xE1) & (lead <= 0xEF) & (lead != 0xED)
+                & ((c1_b1 & (c1_b2 | hi_b2)) | (hi_b1 & c1_b2)))) & payload[:, 2:]
+
+    tail = (matrix[:, 1:] >= 0x80) & (matrix[:, 1:] <= 0xBF)
+    four = ((matrix[:, :-3] >= 0xF0) & (matrix[:, :-3] <= 0xF4)
+            & tail[:, :-2] & tail[:, 1:-1] & tail[:, 2:] & payload[:, 3:])
+
+    return latin.any(axis=1) | three.any(axis=1) | four.any(axis=1)
+
+
+def _check_chunk_numpy(mm, first, count):
+    """Variante vectorisée de _check_chunk_python."""
+    matrix = record_view(mm, count, first).view(np.uint8).reshape(count, BLOCK_SIZE)
+    columns = np.arange(BLOCK_SIZE)
+
+    is_null  = matrix == 0
+    has_null = is_null.any(axis=1)
+    length   = np.where(has_null, is_null.argmax(axis=1), BLOCK_SIZE)
+    payload  = columns < length[:, None]
+
+    flags = {
+        "no_terminator": ~has_null,
+        "bad_padding": ((columns > length[:, None]) & (matrix != PAD_BYTE)).any(axis=1),
+        "bom": ((matrix[:, :-2] == 0xEF) & (matrix[:, 1:-1] == 0xBB) & (matrix[:, 2:] == 0xBF)
+                & payload[:, 2:]).any(axis=1),
+        "utf8": _utf8_sequences(matrix, payload),
+    }
+
+    found = {}
+    for problem in PROBLEMS:
+        for index in np.flatnonzero(flags[problem]).tolist():
+            found.setdefault(first + index, []).append(problem)
+
+    return found
+
+
+# ===========================================================================
+# RAPPORT
+# ===========================================================================
+
+def verify_dat(path, use_numpy=True):
+    """Vérifie la structure complète d'un .dat ; retourne un rapport (dict).
+
+    Le rapport est valide (`report["ok"]`) si l'en-tête est exactement
+    HEADER_BYTES + BUFFER_BYTES, si la taille vaut 52 + 31 × n et si aucun
+    bloc ne présente d'anomalie.
+    """
+    size = os.path.getsize(path)
+    records = max(0, size - START_OFFSET) // BLOCK_SIZE
+
+    report = {
+        "file": os.fspath(path),
+        "size": size,
+        "records": records,
+        "expected_size": START_OFFSET + records * BLOCK_SIZE,
+        "trailing_bytes": max(0, size - START_OFFSET) % BLOCK_SIZE,
+        "header_ok": False,
+        "bom_in_header": False,
+        "errors": dict.fromkeys(PROBLEMS, 0),
+        "bad_record_count": 0,
+        "bad_records": [],
+    }
+
+    if size < START_OFFSET:
+        report["error"] = "fichier trop court ou sans en-tête valide."
+        report["ok"] = False
+        return report
+
+    check_chunk = _check_chunk_numpy if use_numpy and np is not None else _check_chunk_python
+
+    with open(path, "rb") as f_in, mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = mm[:START_OFFSET]
+        report["header_ok"] = header == HEADER_BYTES + BUFFER_BYTES
+        report["bom_in_header"] = BOM_UTF8 in header
+
+        for first in range(0, records, CHUNK_ROWS):
+            found = check_chunk(mm, first, min(CHUNK_ROWS, records - first))
+
+            report["bad_record_count"] += len(found)
+
+            for index in sorted(found):
+                for problem in found[index]:
+                    report["errors"][problem] += 1
+
+                if len(report["bad_records"]) < MAX_REPORTED:
+                    report["bad_records"].append({
+                        "index": index,
+                        "offset": START_OFFSET + index * BLOCK_SIZE,
+                        "problems": found[index],
+                    })
+
+    report["ok"] = (report["header_ok"] and not report["bom_in_header"]
+                    and not report["trailing_bytes"] and not report["bad_record_count"])
+    return report
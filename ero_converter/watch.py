@@ -0,0 +1,191 @@
+# ---------------------------------------------------------------------------
+# ero_converter/watch.py
+# Surveillance d'un CSV : le .dat est régénéré et substitué atomiquement
+# à chaque enregistrement du fichier.
+# ---------------------------------------------------------------------------
+
+import csv
+import math
+import os
+import time
+
+from .encoder import CSV_DELIMITER, encode_records, open_csv
+from .layout import get_layout
+from .mapped import FSYNC, replacing
+from .transcode import LATIN1_TABLE, Transcoder
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+POLL_INTERVAL = 1.0             # Secondes entre deux stat() du CSV.
+DEBOUNCE      = 2.0             # Secondes de stabilité exigées avant régénération.
+
+
+# ===========================================================================
+# DÉTECTION DES CHANGEMENTS
+# ===========================================================================
+#
+#   Le CSV n'est jamais relu pour savoir s'il a changé : seul son stat()
+#   est interrogé (taille, date de modification, inode, qui change quand
+#   Excel enregistre par renommage).  Une signature nouvelle doit rester
+#   identique pendant DEBOUNCE secondes avant la régénération : un fichier
+#   en cours d'écriture (taille ou date qui bougent encore) est ignoré.
+#   Si le CSV change pendant sa lecture, le résultat est jeté.
+#
+# ===========================================================================
+
+def file_signature(path):
+    """(taille, mtime_ns, inode) de `path`, ou None s'il n'existe pas (remplacement en cours)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def encode_table(source, transcoder=None, layout=None):
+    """Contenu complet du .dat (en-tête + blocs) d'un CSV sur disque, en mémoire."""
+    layout = get_layout(layout)
+
+    with open_csv(source) as f_in:
+        rows = csv.reader(f_in, delimiter=CSV_DELIMITER)
+        return b"".join([layout.header, *encode_records(rows, transcoder=transcoder, layout=layout)])
+
+
+# ===========================================================================
+# ÉCRITURE
+# ===========================================================================
+
+def write_file(path, data):
+    """Écrit `data` dans `path` (réécriture complète) et le synchronise."""
+    with open(path, "wb", buffering=0) as f_dat:
+        f_dat.write(data)
+        if FSYNC:
+            os.fsync(f_dat.fileno())
+
+
+# ===========================================================================
+# SURVEILLANCE
+# ===========================================================================
+#
+#   Un inode publié n'est jamais réécrit : un lecteur ERO qui garde une
+#   génération ouverte ou mappée la voit inchangée.  Chaque génération,
+#   déjà entière en mémoire, est écrite d'un bloc dans un fichier
+#   temporaire voisin (replacing()) puis substituée d'un os.replace().
+#
+#   Copier la cible puis n'y réécrire que les blocs modifiés coûte plus
+#   cher : la copie relit et réécrit tout le fichier (3 à 4 fois la durée
+#   d'une écriture complète sur ext4, 2 millions d'enregistrements).  Le
+#   contenu de la cible est gardé en mémoire pour ne rien écrire quand le
+#   CSV est réenregistré sans changement.
+#
+# ===========================================================================
+
+class Watcher:
+    """Régénère `target` chaque fois que le CSV `source` change.
+
+        watcher = Watcher("categories.csv", "categori_corrected.dat")
+        while True:
+            records = watcher.poll()    # Enregistrements, ou None sans changement
+            time.sleep(POLL_INTERVAL)
+
+    Le contenu du .dat courant (31 octets par enregistrement) est gardé en
+    mémoire.  Après chaque update(), `swapped` indique si la cible a été
+    remplacée.
+    """
+
+    def __init__(self, source, target, table=LATIN1_TABLE, layout=None, debounce=DEBOUNCE):
+        self.source     = source
+        self.target     = os.path.realpath(target)
+        self.table      = table
+        self.layout     = get_layout(layout)
+        self.debounce   = debounce
+        self.transcoder = None  # Transcodeur de la dernière génération (bilan, rapport).
+        self.builds     = 0
+        self.swapped    = False # Dernière génération substituée à la cible.
+
+        self.current = self._read_target()      # Contenu de la cible.
+        self._mark   = file_signature(self.target)
+
+        # Le CSV présent au démarrage est réputé stable : première
+        # génération immédiate.
+        self._seen  = file_signature(source)
+        self._since = -math.inf
+        self._built = None
+
+    def _read_target(self):
+        try:
+            with open(self.target, "rb") as f_dat:
+                data = f_dat.read()
+        except FileNotFoundError:
+            return None
+        return data if self.layout.fits(len(data)) else None
+
+    # ------------------------------------------------------------------
+    # Boucle.
+    # ------------------------------------------------------------------
+    def poll(self, now=None):
+        """Un tour de surveillance ; retourne les enregistrements d'une régénération, ou None.
+
+        Une erreur de lecture du CSV (fichier tronqué, encodage) est
+        levée une fois ; le même état du fichier n'est pas réessayé.
+        """
+        now = time.monotonic() if now is None else now
+        signature = file_signature(self.source)
+
+        if signature != self._seen:
+            self._seen, self._since = signature, now
+            return None
+        if signature is None or signature == self._built or now - self._since < self.debounce:
+            return None
+
+        self._built = signature
+        transcoder = Transcoder(self.table, keep_details=False)
+        data = encode_table(self.source, transcoder, self.layout)
+
+        # Modifié pendant la lecture : on attend qu'il se stabilise.
+        if file_signature(self.source) != signature:
+            self._built = None
+            return None
+
+        self.transcoder = transcoder
+        return self.update(data)
+
+    def update(self, data):
+        """Substitue à la cible le contenu `data` (en-tête + blocs) ; retourne ses enregistrements.
+
+        Rien n'est écrit si la cible a déjà ce contenu.
+        """
+        # Cible modifiée par un autre programme : son contenu n'est plus connu.
+        if file_signature(self.target) != self._mark:
+            self.current = None
+
+        self.swapped = data != self.current
+        if self.swapped:
+            with replacing(self.target) as tmp:
+                write_file(tmp, data)
+
+            self.current = data
+            self._mark = file_signature(self.target)
+            self.builds += 1
+
+        return self.layout.count(len(data))
+
+    def run(self, interval=POLL_INTERVAL, on_result=None, on_error=None):
+        """Surveille indéfiniment ; `on_result(records)` après chaque régénération.
+
+        Sans `on_error`, une erreur de lecture du CSV interrompt la boucle.
+        """
+        while True:
+            try:
+                records = self.poll()
+            except (OSError, UnicodeError, csv.Error) as exc:
+                if on_error is None:
+                    raise
+                on_error(exc)
+            else:
+                if records is not None and on_result is not None:
+                    on_result(records)
+            time.sleep(interval)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_batch.py
+# Conversion par lots : correspondance source → cible (répertoire, motif,
+# archive zip, compression), noms de sortie en collision refusés,
+# résultats dans l'ordre des jobs avec un ou plusieurs processus.
+#
+#   python -m pytest -q test_batch.py
+# ---------------------------------------------------------------------------
+
+import gzip
+import lzma
+import os
+import tempfile
+import zipfile
+
+from ero_converter.batch import plan_batch, run_batch
+from ero_converter.decoder import dat_to_csv
+from ero_converter.encoder import csv_to_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+def _csv(count, label):
+    return "".join(f"{i:05d};{label} n°{i} Été\r\n" for i in range(count)).encode("utf-8")
+
+
+def _write(path, data):
+    with open(path, "wb") as f_out:
+        f_out.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+def _refused(direction, source, output_dir):
+    try:
+        plan_batch(direction, source, output_dir)
+    except ValueError as exc:
+        return str(exc)
+    raise AssertionError(f"collision acceptée dans '{source}'")
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_plan_maps_sources_to_targets():
+    """Extensions de compression retirées, membres d'archive à plat, autres fichiers ignorés."""
+    with tempfile.TemporaryDirectory() as directory:
+        src = os.path.join(directory, "src")
+        os.mkdir(src)
+        _write(os.path.join(src, "a.csv"), _csv(10, "A"))
+        _write(os.path.join(src, "b.csv.gz"), gzip.compress(_csv(10, "B")))
+        _write(os.path.join(src, "c.CSV.xz"), lzma.compress(_csv(10, "C")))
+        _write(os.path.join(src, "notes.txt"), b"ignore")
+        with zipfile.ZipFile(os.path.join(src, "lot.zip"), "w") as archive:
+            archive.writestr("sites/d.csv", _csv(10, "D"))
+            archive.writestr("e.dat", b"ignore")
+
+        out = os.path.join(directory, "out")
+        jobs = plan_batch("csv2dat", src, out)
+        assert jobs == [(os.path.join(src, "a.csv"), os.path.join(out, "a.dat")),
+                        (os.path.join(src, "b.csv.gz"), os.path.join(out, "b.dat")),
+                        (os.path.join(src, "c.CSV.xz"), os.path.join(out, "c.dat")),
+                        ((os.path.join(src, "lot.zip"), "sites/d.csv"), os.path.join(out, "d.dat"))]
+
+        # Un motif glob retient ce qu'il désigne, à la casse près.
+        assert [target for _, target in plan_batch("csv2dat", os.path.join(src, "*.csv*"), out)] \
+            == [os.path.join(out, name) for name in ("a.dat", "b.dat")]
+        assert [target for _, target in plan_batch("dat2csv", src, out, ".gz")] \
+            == [os.path.join(out, "e.csv.gz")]
+
+
+def test_plan_refuses_colliding_targets():
+    """Deux sources qui produiraient le même fichier : le lot est refusé avant toute écriture."""
+    with tempfile.TemporaryDirectory() as directory:
+        for case, names in (("gz", ["a.csv", "a.csv.gz"]), ("zip", ["a.csv", "lot.zip"]),
+                            ("xz", ["b.csv.gz", "b.csv.xz"])):
+            src = os.path.join(directory, case)
+            os.mkdir(src)
+            for name in names:
+                if name.endswith(".zip"):
+                    with zipfile.ZipFile(os.path.join(src, name), "w") as archive:
+                        archive.writestr("sous/a.csv", _csv(3, "Z"))
+                else:
+                    _write(os.path.join(src, name), _csv(3, "X"))
+
+            message = _refused("csv2dat", src, os.path.join(directory, "out"))
+            assert os.path.join(directory, "out") in message, case
+
+        assert not os.path.exists(os.path.join(directory, "out"))
+
+
+def test_run_batch_in_job_order():
+    """Un ou plusieurs processus : résultats dans l'ordre, sorties identiques, échec isolé."""
+    tables = {f"t{n}.csv": _csv(200 + 50 * n, f"Table {n}") for n in range(5)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        src = os.path.join(directory, "src")
+        os.mkdir(src)
+        for name, data in tables.items():
+            _write(os.path.join(src, name), data)
+        _write(os.path.join(src, "t9.csv.gz"), b"\x1f\x8b\x08 tronque")
+
+        for workers in (1, 3):
+            out = os.path.join(directory, f"dat{workers}")
+            os.mkdir(out)
+            jobs = plan_batch("csv2dat", src, out)
+            results = list(run_batch("csv2dat", jobs, workers))
+
+            assert [result.target for result in results] == [target for _, target in jobs]
+            assert [result.ok for result in results] == [True] * 5 + [False]
+            assert sorted(os.listdir(out)) == [name[:-4] + ".dat" for name in sorted(tables)]
+
+            for name, data in tables.items():
+                target = os.path.join(out, name[:-4] + ".dat")
+                assert _read(target) == csv_to_dat(data)
+                result = results[sorted(tables).index(name)]
+                assert result.records == data.count(b"\n")
+                assert result.bytes_out == len(csv_to_dat(data))
+
+        audit = os.path.join(directory, "audit")
+        os.mkdir(audit)
+        jobs = plan_batch("dat2csv", os.path.join(directory, "dat3"), audit, ".xz")
+        assert all(result.ok for result in run_batch("dat2csv", jobs, 2))
+        for name, data in tables.items():
+            packed = _read(os.path.join(audit, name[:-4] + ".csv.xz"))
+            assert lzma.decompress(packed) == dat_to_csv(csv_to_dat(data))
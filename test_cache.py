@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_cache.py
+# Cache de génération (--cache) : seul un .dat V7 en clair y entre, et la
+# tenue du cache ne modifie jamais un .dat livré.
+#
+#   python -m pytest -q test_cache.py
+# ---------------------------------------------------------------------------
+
+import gzip
+import os
+import tempfile
+
+from ero_converter.cache import BuildCache
+from ero_converter.encoder import csv_to_dat
+from ero_converter.index import CodeIndex, build_index
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+def _write(path, data):
+    with open(path, "wb") as f_out:
+        f_out.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+def _generated(directory, name, csv_text):
+    """(CSV source, .dat généré) pour un CSV (texte UTF-8)."""
+    source = _write(os.path.join(directory, name + ".csv"), csv_text.encode("utf-8"))
+    return source, _write(os.path.join(directory, name + ".dat"), csv_to_dat(source))
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_cache_keeps_only_plain_dat():
+    """Une sortie compressée n'entre pas dans le cache ; un .dat V7 en clair, si."""
+    with tempfile.TemporaryDirectory() as directory:
+        source, plain = _generated(directory, "in", "0001;Un\r\n0002;Deux\r\n")
+        packed = _write(os.path.join(directory, "out.dat.gz"), gzip.compress(_read(plain)))
+        target = os.path.join(directory, "copy.dat")
+
+        cache = BuildCache(os.path.join(directory, "cache"))
+        key = cache.key_for(source)
+
+        assert not cache.put(key, packed)
+        assert cache.materialize(key, target) is None
+
+        assert cache.put(key, plain)
+        assert cache.materialize(key, target) == 2
+        assert _read(target) == _read(plain)
+
+
+def test_cache_hit_keeps_published_dat_untouched():
+    """Un accès au cache ne change pas le mtime d'un .dat livré : son index reste valide."""
+    with tempfile.TemporaryDirectory() as directory:
+        source, plain = _generated(directory, "in", "0001;Un\r\n0002;Deux\r\n")
+        published = os.path.join(directory, "published.dat")
+        other = os.path.join(directory, "other.dat")
+
+        cache = BuildCache(os.path.join(directory, "cache"))
+        key = cache.key_for(source)
+        cache.put(key, plain)
+
+        cache.materialize(key, published)
+        build_index(published)
+        mtime = os.stat(published).st_mtime_ns
+
+        os.utime(os.path.join(cache.entries, key + ".used"), ns=(0, 0))
+        cache.materialize(key, other)
+
+        assert os.stat(published).st_mtime_ns == mtime
+        assert CodeIndex.load(published) is not None
+        assert os.stat(os.path.join(cache.entries, key + ".used")).st_mtime_ns > 0
+
+
+def test_cache_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = BuildCache(os.path.join(directory, "cache"))
+        keys = []
+
+        for n, name in enumerate(("a", "b")):
+            source, dat = _generated(directory, name, f"000{n};Table {name}\r\n")
+            keys.append(cache.key_for(source))
+            cache.put(keys[-1], dat)
+            os.utime(os.path.join(cache.entries, keys[-1] + ".used"), ns=(n, n))
+
+        # « a », plus ancien, vient d'être relu : « b » part en premier.
+        cache.materialize(keys[0], os.path.join(directory, "target.dat"))
+        cache.max_bytes = os.path.getsize(cache.entry_path(keys[0]))
+        cache.evict()
+
+        assert os.path.exists(cache.entry_path(keys[0]))
+        assert not os.path.exists(cache.entry_path(keys[1]))
+        assert sorted(os.listdir(cache.entries)) == [keys[0] + ".dat", keys[0] + ".used"]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_columnar.py
+# Export colonnaire (--columns) : les .npy écrits à la main se relisent
+# par np.load et donnent les colonnes du .dat décodé ; meta.json et
+# chargement paresseux de ColumnTable.
+#
+#   python -m pytest -q test_columnar.py
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from ero_converter.columnar import export_columns, open_columns
+from ero_converter.datfile import EroDatFile
+from ero_converter.encoder import csv_to_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+def _dat(directory, rows):
+    """.dat produit par le convertisseur pour des lignes (code, texte)."""
+    path = os.path.join(directory, "table.dat")
+    with open(path, "wb") as f_out:
+        f_out.write(csv_to_dat("".join(f"{code};{text}\r\n" for code, text in rows).encode("utf-8")))
+    return path
+
+
+def _decoded(path):
+    """(index de bloc, code, texte) des blocs non vides, par lecture du .dat."""
+    with EroDatFile(path) as dat:
+        return [(number, code, text) for number, (code, text) in enumerate(dat) if code]
+
+
+def _check_export(directory, rows, kind):
+    """Exporte le .dat de `rows` et compare chaque .npy, lu par np.load, au .dat décodé."""
+    path = _dat(directory, rows)
+    target = os.path.join(directory, f"table_{kind}.cols")
+    expected = _decoded(path)
+
+    assert export_columns(path, target) == len(expected)
+
+    with open(os.path.join(target, "meta.json"), encoding="utf-8") as f_meta:
+        assert json.load(f_meta) == {"format": "ero-columns", "version": 1, "layout": "ero-v7",
+                                     "encoding": "latin-1", "records": len(expected),
+                                     "codes": kind}
+
+    codes = np.load(os.path.join(target, "codes.npy"))
+    texts = np.load(os.path.join(target, "texts.npy"))
+    records = np.load(os.path.join(target, "records.npy"))
+
+    assert codes.dtype == (np.dtype("<i8") if kind == "int" else np.dtype("S4"))
+    assert texts.dtype == np.dtype("S30") and records.dtype == np.dtype("<u4")
+    assert [int(n) for n in records] == [number for number, _, _ in expected]
+    assert [t.decode("latin-1") for t in texts] == [text for _, _, text in expected]
+    if kind == "int":
+        assert [str(c) for c in codes] == [code for _, code, _ in expected]
+    else:
+        assert [c.decode("latin-1") for c in codes] == [code for _, code, _ in expected]
+
+    return target, expected
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_columns_int_codes():
+    """Codes numériques sans zéro de tête : colonne int64 ; blocs vides non exportés."""
+    rows = [(str(1000 + i), f"Catégorie {i} Été") for i in range(700)]
+    rows[10:13] = [("", ""), ("", ""), ("", "")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        target, expected = _check_export(directory, rows, "int")
+        assert len(expected) == 697
+
+        table = open_columns(target)
+        assert table._columns == {}                 # Rien n'est lu à l'ouverture.
+        assert len(table) == 697
+        assert table[0] == ("1000", "Catégorie 0 Été")
+        assert set(table._columns) == {"codes", "texts"}
+        assert isinstance(table.records, np.memmap)
+        assert table[10] == (expected[10][1], expected[10][2])
+
+
+def test_columns_bytes_codes():
+    """Un code à zéro de tête (« 0042 ») garde toute la colonne en octets S<w>."""
+    rows = [(str(i), f"Prêt n°{i}") for i in range(1, 500)] + [("0042", "Zéro de tête"),
+                                                              ("A12B", "Lettres")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        target, expected = _check_export(directory, rows, "bytes")
+
+        table = open_columns(target)
+        assert table[len(table) - 2] == ("0042", "Zéro de tête")
+        assert table[0] == ("1", "Prêt n°1")
+
+        try:
+            export_columns(os.path.join(directory, "table.dat"), os.path.join(directory, "int.cols"),
+                           codes="int")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("codes non numériques exportés en int64")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_compress.py
+# Entrées compressées : CSV ou .dat en gzip / xz (reconnus à leur
+# signature, même par stdin) et archives zip, converties sans extraction
+# sur disque ; CSV d'audit compressé à la demande.
+#
+#   python -m pytest -q test_compress.py
+# ---------------------------------------------------------------------------
+
+import gzip
+import lzma
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+from ero_converter.decoder import dat_to_csv
+from ero_converter.encoder import csv_to_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _csv(count, label):
+    return "".join(f"{i:05d};{label} n°{i} – l’été\r\n" for i in range(count)).encode("utf-8")
+
+
+def _run(script, args, cwd, data=b""):
+    """Lance un script du dépôt ; retourne sa sortie standard."""
+    result = subprocess.run([sys.executable, os.path.join(ROOT, script), *args], input=data,
+                            capture_output=True, cwd=cwd)
+    assert result.returncode == 0, result.stdout.decode("utf-8", "replace") + \
+        result.stderr.decode("utf-8", "replace")
+    return result.stdout
+
+
+def _write(path, data):
+    with open(path, "wb") as f_out:
+        f_out.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_compressed_csv_inputs():
+    """.csv.gz, .csv.xz, xz mal nommé, gzip sur stdin : le .dat du CSV en clair."""
+    data = _csv(3000, "Catégorie")
+    expected = csv_to_dat(data)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sources = {
+            "table.csv.gz": gzip.compress(data),
+            "table.csv.xz": lzma.compress(data),
+            "mal_nomme.csv": lzma.compress(data),
+        }
+        for name, packed in sources.items():
+            _write(os.path.join(directory, name), packed)
+            _run("csv_to_dat.py", [name, "out.dat"], directory)
+            assert _read(os.path.join(directory, "out.dat")) == expected, name
+
+        assert _run("csv_to_dat.py", ["-", "-"], directory, gzip.compress(data)) == expected
+
+
+def test_compressed_dat_and_audit():
+    """.dat.gz / .dat.xz en entrée ; CSV d'audit .gz par extension ou --compress xz."""
+    dat = csv_to_dat(_csv(3000, "Matériel"))
+    expected = dat_to_csv(dat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        _write(os.path.join(directory, "table.dat.gz"), gzip.compress(dat))
+        _write(os.path.join(directory, "table.dat.xz"), lzma.compress(dat))
+
+        _run("dat_to_csv.py", ["table.dat.gz", "audit.csv.gz"], directory)
+        assert gzip.decompress(_read(os.path.join(directory, "audit.csv.gz"))) == expected
+
+        _run("dat_to_csv.py", ["table.dat.xz", "audit.csv.xz"], directory)
+        assert lzma.decompress(_read(os.path.join(directory, "audit.csv.xz"))) == expected
+
+        out = _run("dat_to_csv.py", ["-", "-", "--compress", "xz"], directory, gzip.compress(dat))
+        assert lzma.decompress(out) == expected
+
+
+def test_zip_archives():
+    """Chaque membre .csv (ou .dat) d'une archive donne un fichier dans le répertoire cible."""
+    tables = {"nord.csv": _csv(500, "Nord"), "sites/sud.csv": _csv(800, "Sud")}
+
+    with tempfile.TemporaryDirectory() as directory:
+        with zipfile.ZipFile(os.path.join(directory, "tables.zip"), "w",
+                             zipfile.ZIP_DEFLATED) as archive:
+            for name, data in tables.items():
+                archive.writestr(name, data)
+            archive.writestr("LISEZMOI.txt", b"ignore")
+
+        _run("csv_to_dat.py", ["tables.zip", "dat"], directory)
+        assert sorted(os.listdir(os.path.join(directory, "dat"))) == ["nord.dat", "sud.dat"]
+        for name, data in tables.items():
+            stem = os.path.splitext(os.path.basename(name))[0]
+            assert _read(os.path.join(directory, "dat", stem + ".dat")) == csv_to_dat(data)
+
+        with zipfile.ZipFile(os.path.join(directory, "dats.zip"), "w") as archive:
+            for name in ("nord.dat", "sud.dat"):
+                archive.write(os.path.join(directory, "dat", name), name)
+
+        _run("dat_to_csv.py", ["dats.zip", "csv", "--compress", "gz"], directory)
+        assert sorted(os.listdir(os.path.join(directory, "csv"))) == ["nord.csv.gz", "sud.csv.gz"]
+        for name, data in tables.items():
+            stem = os.path.splitext(os.path.basename(name))[0]
+            assert gzip.decompress(_read(os.path.join(directory, "csv", stem + ".csv.gz"))) \
+                == dat_to_csv(csv_to_dat(data))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_daemon.py
+# Démon de conversion : une requête servie sur le socket Unix produit ce
+# que produit la conversion dans le processus ; en TCP, aucun fichier
+# n'est accepté ; sans démon, le client convertit lui-même.
+#
+#   python -m pytest -q test_daemon.py
+# ---------------------------------------------------------------------------
+
+import os
+import tempfile
+import threading
+
+import ero_client
+from ero_converter.daemon import close_server, make_server
+from ero_converter.decoder import dat_to_csv
+from ero_converter.encoder import csv_to_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+CSV = "".join(f"{i:04d};Catégorie n°{i} – l’été\r\n" for i in range(300)).encode("utf-8")
+
+
+def _write(path, data):
+    with open(path, "wb") as f_out:
+        f_out.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+def _serving(server):
+    """Démarre `server` dans un thread ; retourne la fonction qui l'arrête."""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        thread.join()
+        close_server(server)
+
+    return stop
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_unix_socket_matches_in_process():
+    """csv2dat et dat2csv, en charge utile et par fichiers : même sortie qu'en local."""
+    expected_dat = csv_to_dat(CSV)
+    expected_csv = dat_to_csv(expected_dat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "ero.sock")
+        stop = _serving(make_server(socket_path, workers=0))
+        try:
+            response, data, via = ero_client.convert("csv2dat", payload=CSV, socket_path=socket_path)
+            assert via == "démon" and response["ok"] and response["records"] == 300
+            assert data == expected_dat
+
+            response, data, _ = ero_client.convert("dat2csv", payload=data, socket_path=socket_path)
+            assert response["ok"] and data == expected_csv
+
+            source = _write(os.path.join(directory, "table.csv"), CSV)
+            target = os.path.join(directory, "table.dat")
+            response, data, _ = ero_client.convert("csv2dat", source, target, socket_path=socket_path)
+            assert response["ok"] and data == b"" and _read(target) == expected_dat
+
+            audit = os.path.join(directory, "audit.csv")
+            response, _, _ = ero_client.convert("dat2csv", target, audit, socket_path=socket_path)
+            assert response["ok"] and _read(audit) == expected_csv
+        finally:
+            stop()
+
+        assert not os.path.exists(socket_path)
+
+
+def test_tcp_refuses_files():
+    """En TCP, une requête qui nomme une source ou une cible est refusée par le démon."""
+    with tempfile.TemporaryDirectory() as directory:
+        source = _write(os.path.join(directory, "table.csv"), CSV)
+        target = os.path.join(directory, "table.dat")
+
+        server = make_server(port=0, workers=0)
+        port = server.server_address[1]
+        stop = _serving(server)
+        try:
+            for header in ({"op": "csv2dat", "source": source},
+                           {"op": "csv2dat", "target": target},
+                           {"op": "dat2csv", "source": source, "target": target}):
+                with ero_client.connect(port=port) as sock:
+                    response, data = ero_client.request(sock, header, CSV)
+                assert not response["ok"] and data == b"", header
+                assert "ni source ni target" in response["error"]
+
+            assert not os.path.exists(target)
+
+            # Le client lit et écrit les fichiers lui-même : la conversion passe.
+            response, _, via = ero_client.convert("csv2dat", source, target, port=port)
+            assert via == "démon" and response["ok"]
+            assert _read(target) == csv_to_dat(CSV)
+        finally:
+            stop()
+
+
+def test_client_falls_back_without_daemon():
+    """Socket absent : conversion dans le client, ou erreur avec --no-fallback."""
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "absent.sock")
+
+        response, data, via = ero_client.convert("csv2dat", payload=CSV, socket_path=socket_path)
+        assert via == "local" and response["ok"]
+        assert data == csv_to_dat(CSV)
+
+        try:
+            ero_client.convert("csv2dat", payload=CSV, socket_path=socket_path, fallback=False)
+        except FileNotFoundError:
+            pass
+        else:
+            raise AssertionError("démon absent sans erreur")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_diff.py
+# Différence bloc à bloc (ero_converter.diff) : un patch produit puis
+# appliqué, en place ou vers un autre fichier, reconstruit le nouveau .dat.
+#
+#   python -m pytest -q test_diff.py
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import random
+import tempfile
+
+from ero_converter import diff
+from ero_converter.diff import apply_patch, diff_dat, make_patch
+from ero_converter.encoder import csv_to_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+WORDS = ["Prêt", "à porter", "Cité", "«x»", "œuvre", "Zone", "A B", "Ferme", "Été"]
+
+
+def _table(seed, count):
+    rnd = random.Random(seed)
+    return [(f"{i:05d}", " ".join(rnd.choices(WORDS, k=rnd.randint(1, 6)))) for i in range(count)]
+
+
+def _edited(rows, seed, edits=20):
+    """Copie de `rows` avec des lignes modifiées, insérées et supprimées."""
+    rnd = random.Random(seed)
+    rows = list(rows)
+
+    for n in range(edits):
+        k = rnd.randrange(len(rows))
+        if n % 3 == 0:
+            rows[k] = (rows[k][0], rows[k][1] + " bis")
+        elif n % 3 == 1:
+            rows.insert(k, (f"N{n:04d}", "Nouvelle ligne"))
+        else:
+            del rows[k]
+    return rows
+
+
+def _write(path, data):
+    with open(path, "wb") as f_out:
+        f_out.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+def _dat(directory, rows, name):
+    csv_text = "".join(f"{code};{text}\r\n" for code, text in rows)
+    return _write(os.path.join(directory, name), csv_to_dat(csv_text.encode("utf-8")))
+
+
+def _round_trip(directory, old_path, new_path):
+    """Patch (repassé par JSON) appliqué vers un autre fichier, puis en place."""
+    patch = json.loads(json.dumps(make_patch(old_path, new_path)))
+
+    output = os.path.join(directory, "applied.dat")
+    apply_patch(old_path, patch, output)
+    assert _read(output) == _read(new_path)
+
+    in_place = _write(os.path.join(directory, "in_place.dat"), _read(old_path))
+    apply_patch(in_place, patch)
+    assert _read(in_place) == _read(new_path)
+    return patch
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_diff_then_apply_reproduces_new_file():
+    old = _table(6, 3000)
+
+    with tempfile.TemporaryDirectory() as directory:
+        old_path = _dat(directory, old, "old.dat")
+
+        for n, rows in enumerate([old, _edited(old, 7), _edited(old, 8, 200), _table(9, 2500),
+                                  old[::-1], old[:10]]):
+            _round_trip(directory, old_path, _dat(directory, rows, f"new{n}.dat"))
+
+
+def test_diff_report_counts_changes():
+    """Une insertion et une modification : le reste du fichier n'est pas décalé."""
+    old = _table(16, 1000)
+    new = old[:100] + [("N0001", "Nouvelle ligne")] + old[100:500] + [(old[500][0], "Modifié")] + old[501:]
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = diff_dat(_dat(directory, old, "old.dat"), _dat(directory, new, "new.dat"))
+
+    assert report["summary"] == {"added": 1, "removed": 0, "modified": 1}
+    assert [record["change"] for record in report["records"]] == ["added", "modified"]
+    assert not report["identical"]
+
+
+def test_diff_resync_window_is_capped():
+    """Au-delà de MAX_RESYNC blocs sans ancre, le reste forme une seule édition."""
+    old = _table(10, 2000)
+    new = _table(11, 2000) + old[:100]
+
+    with tempfile.TemporaryDirectory() as directory:
+        old_path = _dat(directory, old, "old.dat")
+        new_path = _dat(directory, new, "new.dat")
+
+        limit = diff.MAX_RESYNC
+        try:
+            diff.MAX_RESYNC = diff.RESYNC_ROWS
+            assert len(_round_trip(directory, old_path, new_path)["edits"]) == 1
+        finally:
+            diff.MAX_RESYNC = limit
+
+
+def test_apply_in_place_checks_new_digest():
+    """En place, un résultat sans l'empreinte attendue est refusé et l'original restauré."""
+    old = _table(12, 500)
+    new = [(code, text + " bis") if n % 50 == 0 else (code, text) for n, (code, text) in enumerate(old)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        old_path = _dat(directory, old, "old.dat")
+        patch = make_patch(old_path, _dat(directory, new, "new.dat"))
+        patch["new"]["sha256"] = "0" * 64
+        before = _read(old_path)
+
+        try:
+            apply_patch(old_path, patch)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("patch appliqué malgré une empreinte fausse")
+
+        assert _read(old_path) == before
+        assert sorted(os.listdir(directory)) == ["new.dat", "old.dat"]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_index.py
+# Index trié des codes (--index) : ses réponses sont comparées à un
+# parcours séquentiel du .dat, avec et sans NumPy.
+#
+#   python -m pytest -q test_index.py
+# ---------------------------------------------------------------------------
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from ero_converter import index
+from ero_converter.datfile import EroDatFile
+from ero_converter.encoder import csv_to_dat
+from ero_converter.index import CodeIndex, lookup
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+CODES = ["0001", "0002", "010", "A12", "A12B", "Z", "  7", "3 4"]
+WORDS = ["Prêt", "à\u202fporter", "Cité", "«x»", "œuvre", "Zone", "A B", "Ferme", "Été"]
+
+
+def _dat(directory, rows):
+    """.dat produit par le convertisseur pour des lignes (code, texte)."""
+    path = os.path.join(directory, "table.dat")
+    with open(path, "wb") as f_out:
+        f_out.write(csv_to_dat("".join(f"{code};{text}\r\n" for code, text in rows).encode()))
+    return path
+
+
+def _linear_scan(path):
+    """{code: [enregistrements]} par lecture séquentielle du .dat."""
+    found = {}
+    with EroDatFile(path) as dat:
+        for number, (code, _) in enumerate(dat):
+            if code:
+                found.setdefault(code, []).append(number)
+    return found
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_index_matches_linear_scan():
+    """Index vectorisé et repli sans NumPy : mêmes réponses qu'un parcours du .dat."""
+    rnd = random.Random(2)
+    rows = [(rnd.choice(CODES), " ".join(rnd.choices(WORDS, k=rnd.randint(1, 6))))
+            for _ in range(3000)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = _dat(directory, rows + [("", "sans code"), ("0001", "")])
+        expected = _linear_scan(path)
+
+        numpy = index.np
+        try:
+            for module_np in (numpy, None):
+                index.np = module_np
+                built = CodeIndex.build(path)
+
+                for code in [*expected, "0003", "A1", "A12BC", "x" * 40]:
+                    assert built.find(code) == expected.get(code, []), code
+                    assert built.first(code) == (expected[code][0] if code in expected else None)
+        finally:
+            index.np = numpy
+
+        with EroDatFile(path) as dat:
+            for code, numbers in expected.items():
+                assert lookup(path, code) == dat[numbers[0]]
+        assert lookup(path, "absent") is None
+
+
+def test_index_command_line():
+    """python -m ero_converter.index : sans avertissement runpy (module hors de l'__init__)."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _dat(directory, [("0001", "Un"), ("0002", "Deux")])
+        result = subprocess.run([sys.executable, "-W", "error", "-m", "ero_converter.index",
+                                 path, "0002"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ""
+    assert result.stdout.startswith("0002;Deux")
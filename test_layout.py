@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_layout.py
+# Dispositions de .dat : aller-retour dans une variante autre que ERO V7,
+# détection entre candidates ambiguës, encodages multi-octets refusés.
+#
+#   python -m pytest -q test_layout.py
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+
+from ero_converter import layout as layouts
+from ero_converter.decoder import dat_to_csv
+from ero_converter.encoder import csv_to_dat
+from ero_converter.layout import DEFAULT_LAYOUT, Layout, detect_layout, load_layouts, register_layout
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+ROWS = [(f"{i:05d}", f"Catégorie n°{i} Été{'x' * (i % 9)}") for i in range(500)]
+
+
+def _registered(test):
+    """Exécute `test` puis rend au registre son contenu d'origine."""
+    saved = dict(layouts.LAYOUTS)
+    try:
+        test()
+    finally:
+        layouts.LAYOUTS.clear()
+        layouts.LAYOUTS.update(saved)
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_round_trip_other_layout():
+    """Variante déclarée en JSON : blocs de 41 o, padding 0x20, cp1252, détectée à la relecture."""
+    csv_text = "".join(f"{code};{text}\r\n" for code, text in ROWS)
+
+    def test():
+        with tempfile.TemporaryDirectory() as directory:
+            description = os.path.join(directory, "layouts.json")
+            with open(description, "w", encoding="utf-8") as f_out:
+                json.dump([{"name": "test-v5", "header": (b"ERO5" + bytes(20)).hex(),
+                            "record_size": 41, "pad_byte": 0x20, "encoding": "cp1252",
+                            "signature": b"ERO5".hex()}], f_out)
+            assert load_layouts(description) == ["test-v5"]
+            v5 = layouts.LAYOUTS["test-v5"]
+
+            dat = csv_to_dat(csv_text.encode("utf-8"), layout=v5)
+            assert len(dat) == v5.dat_size(len(ROWS)) and dat.startswith(b"ERO5")
+            first = dat[v5.offset(0):v5.offset(1)]
+            payload = f"{ROWS[0][0]} {ROWS[0][1]}".encode("cp1252")
+            assert first == payload + b"\x00" + b" " * (41 - len(payload) - 1)
+
+            path = os.path.join(directory, "table.dat")
+            with open(path, "wb") as f_out:
+                f_out.write(dat)
+
+            expected = csv_text.encode("cp1252")
+            for mode in ("numpy", "mmap", "stream"):
+                assert dat_to_csv(dat, mode) == expected, mode
+                assert dat_to_csv(path, mode) == expected, mode
+            assert dat_to_csv(path, layout="ero-v7") != expected
+
+    _registered(test)
+
+
+def test_detection_between_ambiguous_candidates():
+    """Taille exacte d'abord, puis signature la plus longue, puis ordre d'enregistrement."""
+    def test():
+        short = register_layout(Layout("short", b"EROX" + bytes(12), 20, signature=b"EROX"))
+        long_ = register_layout(Layout("long", b"EROXB" + bytes(11), 30, signature=b"EROXB"))
+        later = register_layout(Layout("later", b"EROX" + bytes(12), 40, signature=b"EROX"))
+        head = b"EROXB" + bytes(11)
+
+        assert detect_layout(head, 16 + 60) is long_        # Les deux tailles conviennent.
+        assert detect_layout(head, 16 + 40) is short        # short et later : le premier inscrit.
+        assert detect_layout(head, 16 + 90) is long_
+        assert detect_layout(head, 16 + 7) is long_         # Aucune taille : signature.
+        assert detect_layout(head) is long_                 # Tube : taille inconnue.
+        assert detect_layout(b"EROXA" + bytes(11), 16 + 90) is short
+        assert detect_layout(b"EROXA" + bytes(11), 16 + 120) is short
+        assert detect_layout(b"\xef\xbb\xbf" + head) is DEFAULT_LAYOUT
+        assert later.fits(16 + 120)
+
+    _registered(test)
+
+
+def test_layout_rejects_multibyte_encodings():
+    for encoding in ("utf-8", "utf-16", "shift_jis", "gb18030", "big5", "encodage-inconnu"):
+        try:
+            Layout("test", b"ERO", 31, encoding=encoding)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{encoding} accepté")
+
+    for encoding in ("latin-1", "cp1252", "cp850", "iso8859-15"):
+        assert Layout("test", b"ERO", 31, encoding=encoding).encoding == encoding
+
+    for options in ({"terminator": b"\x00\x00"}, {"record_size": 1}):
+        try:
+            Layout("test", b"ERO", **{"record_size": 31, **options})
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{options} accepté")
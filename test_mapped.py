@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_mapped.py
+# Écriture du .dat préallouée, mappée et substituée atomiquement : même
+# contenu qu'une écriture en flux, cible intacte après un échec, jamais
+# de .dat compressé.
+#
+#   python -m pytest -q test_mapped.py
+# ---------------------------------------------------------------------------
+
+import io
+import os
+import tempfile
+
+from ero_converter.encoder import iter_csv_rows, write_dat
+from ero_converter.mapped import MIN_ROWS, count_lines, open_dat_output
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+def _csv(count):
+    return "".join(f"{i:06d};Catégorie {i}\r\n" for i in range(count)).encode("utf-8")
+
+
+def _streamed(data):
+    """Référence : le même CSV écrit en flux, en mémoire."""
+    f_out = io.BytesIO()
+    write_dat(iter_csv_rows(data), f_out)
+    return f_out.getvalue()
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_mapped_output_matches_stream():
+    """Capacité exacte, sous-estimée (agrandissement) ou surestimée (troncature)."""
+    data = _csv(3 * MIN_ROWS + 17)
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "table.csv")
+        with open(source, "wb") as f_out:
+            f_out.write(data)
+        assert count_lines(source) == 3 * MIN_ROWS + 17
+
+        for capacity in (count_lines(source), 0, 10 * MIN_ROWS):
+            target = os.path.join(directory, f"table{capacity}.dat")
+            with open_dat_output(target, capacity) as f_out:
+                write_dat(iter_csv_rows(data), f_out)
+            assert _read(target) == _streamed(data), capacity
+
+        assert sorted(os.listdir(directory)) == sorted(
+            ["table.csv"] + [f"table{capacity}.dat" for capacity in (count_lines(source), 0,
+                                                                     10 * MIN_ROWS)])
+
+
+def test_failed_generation_keeps_target():
+    """Une génération interrompue ne remplace pas la cible et ne laisse aucun temporaire."""
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, "table.dat")
+        with open_dat_output(target) as f_out:
+            write_dat(iter_csv_rows(_csv(10)), f_out)
+        before = _read(target)
+
+        try:
+            with open_dat_output(target) as f_out:
+                f_out.write(b"partiel")
+                raise ValueError("CSV illisible")
+        except ValueError:
+            pass
+
+        assert _read(target) == before
+        assert os.listdir(directory) == ["table.dat"]
+
+
+def test_dat_output_refuses_compression():
+    """Un .dat se lit en place : une cible .gz/.xz est refusée, sans fichier créé."""
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("table.dat.gz", "table.dat.xz"):
+            target = os.path.join(directory, name)
+            try:
+                open_dat_output(target)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"{name} accepté")
+            assert not os.path.exists(target)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_merge.py
+# Fusion de CSV en un .dat trié et dédoublonné (ero_converter.merge) :
+# politiques de doublons, runs déversés sur disque.
+#
+#   python -m pytest -q test_merge.py
+# ---------------------------------------------------------------------------
+
+import os
+import random
+import tempfile
+
+from ero_converter.datfile import EroDatFile
+from ero_converter.merge import merge_csvs
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+def _csv(directory, name, rows):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f_out:
+        f_out.write("".join(f"{code};{text}\r\n" for code, text in rows).encode("utf-8"))
+    return path
+
+
+def _records(path):
+    with EroDatFile(path) as dat:
+        return list(dat)
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_merge_policies():
+    """Code en double : première occurrence, dernière, ou erreur sans .dat écrit."""
+    with tempfile.TemporaryDirectory() as directory:
+        nord = _csv(directory, "nord.csv", [("0003", "Nord 3"), ("0001", "Nord 1"),
+                                            ("0001", "Nord 1 bis")])
+        sud  = _csv(directory, "sud.csv", [("0002", "Sud 2"), ("0001", "Sud 1")])
+        target = os.path.join(directory, "fusion.dat")
+
+        for policy, text in (("first", "Nord 1"), ("last", "Sud 1")):
+            result = merge_csvs([nord, sud], target, policy, run_rows=2)
+            assert (result.records, result.duplicates) == (3, 2)
+            assert _records(target) == [("0001", text), ("0002", "Sud 2"), ("0003", "Nord 3")]
+
+        os.remove(target)
+        try:
+            merge_csvs([nord, sud], target, "error")
+        except ValueError as exc:
+            assert "0001" in str(exc)
+        else:
+            raise AssertionError("doublon accepté")
+        assert not os.path.exists(target)
+
+
+def test_merge_spilled_runs_match_sorted_input():
+    """Runs déversés sur disque : même .dat qu'un tri en mémoire de toutes les lignes."""
+    rnd = random.Random(3)
+    sources = [[(f"{rnd.randrange(5000):05d}", f"Ligne {s}-{i}") for i in range(2000)]
+               for s in range(3)]
+
+    expected = {}
+    for rows in sources:
+        for code, text in rows:
+            expected.setdefault(code, text)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [_csv(directory, f"source{n}.csv", rows) for n, rows in enumerate(sources)]
+        target = os.path.join(directory, "fusion.dat")
+
+        result = merge_csvs(paths, target, "first", run_rows=500)
+
+        assert result.spilled > 1
+        assert result.duplicates == 6000 - len(expected)
+        assert _records(target) == sorted(expected.items())
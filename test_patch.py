@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_patch.py
+# Patch en place (--patch) : le .dat patché doit être identique à une
+# génération complète, quelles que soient les modifications du CSV.
+#
+#   python -m pytest -q test_patch.py
+# ---------------------------------------------------------------------------
+
+import os
+import random
+import tempfile
+
+from ero_converter.datfile import BUFFER_BYTES, HEADER_BYTES
+from ero_converter.encoder import csv_to_dat, encode_records, iter_csv_rows
+from ero_converter.patch import patch_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+WORDS = ["Prêt", "à porter", "Cité", "«x»", "œuvre", "Zone", "A B", "Ferme", "Été"]
+
+
+def _table(seed, count, first=0):
+    rnd = random.Random(seed)
+    return [(f"{first + i:05d}", " ".join(rnd.choices(WORDS, k=rnd.randint(1, 6))))
+            for i in range(count)]
+
+
+def _edited(rows, seed, edits=20):
+    """Copie de `rows` avec des lignes modifiées, insérées et supprimées."""
+    rnd = random.Random(seed)
+    rows = list(rows)
+
+    for n in range(edits):
+        k = rnd.randrange(len(rows))
+        if n % 3 == 0:
+            rows[k] = (rows[k][0], rows[k][1] + " bis")
+        elif n % 3 == 1:
+            rows.insert(k, (f"N{n:04d}", "Nouvelle ligne"))
+        else:
+            del rows[k]
+    return rows
+
+
+def _csv(rows):
+    return "".join(f"{code};{text}\r\n" for code, text in rows).encode("utf-8")
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_patch_matches_full_generation():
+    """Modifications, ajouts, suppressions : le .dat patché égale une génération complète."""
+    old = _table(3, 2000)
+    variants = [old, _edited(old, 4), old + _table(5, 300, 2000), old[:1500], old[:1]]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for n, rows in enumerate(variants):
+            path = os.path.join(directory, f"patched{n}.dat")
+            with open(path, "wb") as f_out:
+                f_out.write(csv_to_dat(_csv(old)))
+
+            result = patch_dat(path, HEADER_BYTES + BUFFER_BYTES,
+                               encode_records(iter_csv_rows(_csv(rows))))
+
+            with open(path, "rb") as f_in:
+                assert f_in.read() == csv_to_dat(_csv(rows)), n
+            assert result.records == len(rows)
+            assert (result.touched == 0) == (rows == old)
@@ -1,147 +1,465 @@
 #!/usr/bin/env python3
-"""
-Script de test automatique pour vérifier la réversibilité à 100%
-des convertisseurs dat_to_csv.py et csv_to_dat.py
-"""
+# ---------------------------------------------------------------------------
+# test_reversibility.py
+# Aller-retour CSV → .dat → CSV → .dat sur des tables aléatoires, dans le
+# processus, comparé octet par octet par empreintes calculées en flux.
+#
+#   python -m pytest -q test_reversibility.py          # quelques secondes
+#   python test_reversibility.py --rows 2000000        # échelle production
+# ---------------------------------------------------------------------------
 
-import subprocess
-import sys
+import argparse
+import csv
+import hashlib
+import io
 import os
-import filecmp
-
-def run_command(cmd, description):
-    """Exécute une commande et affiche le résultat."""
-    print(f"\n{'='*60}")
-    print(f"🔧 {description}")
-    print(f"{'='*60}")
-    print(f"$ {' '.join(cmd)}")
-    
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print("⚠️  Erreurs:", result.stderr)
-    
-    if result.returncode != 0:
-        print(f"❌ Échec (code: {result.returncode})")
-        return False
-    
-    print("✅ Succès")
-    return True
-
-def compare_files(file1, file2, description):
-    """Compare deux fichiers."""
-    print(f"\n{'='*60}")
-    print(f"🔍 {description}")
-    print(f"{'='*60}")
-    
-    # Comparer le contenu
-    with open(file1, 'r', encoding='utf-8-sig') as f1:
-        content1 = f1.read()
-    with open(file2, 'r', encoding='utf-8-sig') as f2:
-        content2 = f2.read()
-    
-    if content1 == content2:
-        print(f"✅ Les fichiers {file1} et {file2} sont identiques !")
-        print(f"   Taille: {len(content1)} caractères")
-        print(f"   Lignes: {len(content1.splitlines())}")
+import random
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+from ero_converter.datfile import BLOCK_SIZE, BUFFER_BYTES, ENCODING, HEADER_BYTES, PAD_BYTE
+from ero_converter.decoder import RANGE_ROWS, np, write_csv, write_csv_parallel
+from ero_converter.encoder import CSV_DELIMITER, iter_csv_rows, open_csv, write_records
+from ero_converter.pipeline import write_dat_pipelined
+from ero_converter.sniff import sniff_encoding
+from ero_converter.transcode import LATIN1_TABLE, Transcoder
+
+
+# ===========================================================================
+# CONFIGURATION
+# ===========================================================================
+
+ROWS        = int(os.environ.get("ERO_TEST_ROWS", 50000))  # Lignes par aller-retour (pytest).
+SEED        = int(os.environ.get("ERO_TEST_SEED", 7))
+POOL_ROWS   = 1 << 16           # Lignes distinctes générées par table.
+BATCH_ROWS  = 1 << 14           # Lignes écrites (source et référence) par lot.
+SINK_BUFFER = 1 << 20           # Tampon devant les empreintes des CSV.
+
+# Variante d'un aller-retour : forme du CSV source et moteur d'encodage.
+DEFAULT_VARIANT = {
+    "encoding": "utf-8",        # utf-8 ou latin-1 (export ANSI)
+    "bom": False,               # BOM UTF-8 en tête du CSV
+    "newline": "\r\n",          # fin de ligne du CSV source
+    "translit": True,           # table de translittération Latin-1
+    "encoder": "numpy",         # numpy, python ou pipeline
+}
+READ_MODES = ("numpy", "mmap", "stream", "parallel")
+
+
+# ===========================================================================
+# GÉNÉRATION DES TABLES
+# ===========================================================================
+#
+#   Les lignes mêlent codes numériques (zéros de tête) ou alphanumériques,
+#   texte accentué, typographie Excel à translittérer, caractères hors
+#   Latin-1, « ; », guillemets et sauts de ligne dans des champs entre
+#   guillemets, espaces parasites, payloads de part et d'autre de la
+#   limite de 30 octets, et lignes à ignorer (vides, un seul champ).
+#
+#   Un export ANSI (latin-1) ne contient que des lettres ≥ 0xE0 ou
+#   majuscules accentuées isolées : jamais une séquence UTF-8 valide, la
+#   détection d'encodage ne peut pas s'y tromper.
+#
+# ===========================================================================
+
+SYLLABLES = ("ca", "te", "go", "rie", "pro", "duit", "mai", "son", "jar", "din",
+             "é", "è", "à", "ç", "ô", "î", "ù", "ê", "ï", "û", "ÿ", "É", "À", "Ç")
+TYPOGRAPHY = ("’", "“", "”", "–", "—", "…", "œ", "Œ", "€", "™", "\u202f", "\u200b")
+FOREIGN    = ("★", "中", "ł", "Ω")   # Sans équivalent : « ? ».
+SPECIALS   = (";", '"', "; ", ' "cité" ', "\n", "  ", "\t")
+
+
+def _word_pool(rng, size=512):
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(size)]
+
+
+def random_row(rng, words, latin1_only=False):
+    """Une ligne CSV brute (liste de champs), parfois à ignorer."""
+    choice, random_ = rng.choice, rng.random
+    draw = random_()
+
+    if draw < 0.005:
+        return []                                           # ligne vide
+    if draw < 0.01:
+        return [str(rng.randint(0, 9999))]                  # un seul champ
+
+    # Code : numérique à zéros de tête, parfois alphanumérique ou piégé.
+    code = str(rng.randint(0, 10 ** rng.randint(1, 8))).zfill(rng.randint(1, 6))
+    if draw < 0.05:
+        code = f"{choice(words)}{code}"
+    elif draw < 0.06:
+        code = f" {code} "
+    elif draw < 0.065:
+        code = f"{code} {code}"
+
+    text = " ".join(choice(words) for _ in range(rng.randint(0, 6)))
+
+    if random_() < 0.2:
+        position = rng.randint(0, len(text))
+        text = text[:position] + choice(SPECIALS) + text[position:]
+    if not latin1_only and random_() < 0.1:
+        text += choice(TYPOGRAPHY)
+    if not latin1_only and random_() < 0.02:
+        text += choice(FOREIGN)
+    if random_() < 0.05:
+        text = f"  {text} "
+
+    # Limite de 30 octets : payload « code texte » de 28 à 33 octets.
+    if random_() < 0.15:
+        size = max(rng.randint(28, 33) - len(code.strip()) - 1, 0)
+        text = text.strip()[:size].ljust(size, "x")
+
+    row = [code, text]
+    if random_() < 0.01:
+        row.append("colonne en trop")
+    return row
+
+
+def random_batches(rng, count, variant):
+    """Produit `count` lignes aléatoires, par lots de BATCH_ROWS.
+
+    Les lignes sont tirées dans un réservoir de POOL_ROWS lignes
+    distinctes : générer chaque ligne coûterait plus que l'aller-retour
+    mesuré.  L'ordre et les répétitions restent aléatoires.
+    """
+    words = _word_pool(rng)
+    latin1_only = variant["encoding"] == "latin-1"
+    pool = [random_row(rng, words, latin1_only) for _ in range(min(count, POOL_ROWS))]
+
+    for first in range(0, count, BATCH_ROWS):
+        yield rng.choices(pool, k=min(BATCH_ROWS, count - first))
+
+
+# ===========================================================================
+# EMPREINTES EN FLUX
+# ===========================================================================
+
+class HashSink(io.RawIOBase):
+    """Sortie binaire réduite à une empreinte SHA-256 et une taille.
+
+    Avec `f_out`, les octets sont aussi recopiés dans ce fichier.
+    """
+
+    def __init__(self, f_out=None):
+        super().__init__()
+        self._hash = hashlib.sha256()
+        self._f_out = f_out
+        self.size = 0
+
+    def writable(self):
         return True
-    else:
-        print(f"❌ Les fichiers {file1} et {file2} diffèrent")
-        print(f"   {file1}: {len(content1)} caractères, {len(content1.splitlines())} lignes")
-        print(f"   {file2}: {len(content2)} caractères, {len(content2.splitlines())} lignes")
-        
-        # Montrer les premières différences
-        lines1 = content1.splitlines()
-        lines2 = content2.splitlines()
-        for i, (l1, l2) in enumerate(zip(lines1, lines2)):
-            if l1 != l2:
-                print(f"\n   Première différence à la ligne {i+1}:")
-                print(f"   Fichier 1: {l1}")
-                print(f"   Fichier 2: {l2}")
-                break
-        return False
-
-def main():
-    """Test principal de réversibilité."""
-    print("""
-╔══════════════════════════════════════════════════════════════╗
-║     TEST DE RÉVERSIBILITÉ BIDIRECTIONNELLE                   ║
-║     categori_hd.dat ⟷ categories_hd.csv                     ║
-╚══════════════════════════════════════════════════════════════╝
-""")
-    
-    # Fichiers de test
-    original_dat = "/mnt/user-data/uploads/categori_hd.dat"
-    
-    if not os.path.exists(original_dat):
-        print(f"❌ Fichier original introuvable: {original_dat}")
-        sys.exit(1)
-    
-    # Étape 1: DAT → CSV
-    if not run_command(
-        ["python3", "dat_to_csv.py", original_dat, "test1.csv"],
-        "Étape 1: Conversion DAT → CSV"
-    ):
-        sys.exit(1)
-    
-    # Étape 2: CSV → DAT
-    if not run_command(
-        ["python3", "csv_to_dat.py", "test1.csv", "test_recreated.dat", original_dat],
-        "Étape 2: Conversion CSV → DAT (avec en-tête original)"
-    ):
-        sys.exit(1)
-    
-    # Étape 3: DAT → CSV (de nouveau)
-    if not run_command(
-        ["python3", "dat_to_csv.py", "test_recreated.dat", "test2.csv"],
-        "Étape 3: Reconversion DAT → CSV"
-    ):
-        sys.exit(1)
-    
-    # Étape 4: Comparaison des CSV
-    if not compare_files("test1.csv", "test2.csv", "Comparaison CSV final vs initial"):
-        sys.exit(1)
-    
-    # Étape 5: Test sans en-tête original
-    print(f"\n{'='*60}")
-    print("🔧 Test bonus: Conversion sans en-tête original")
-    print(f"{'='*60}")
-    
-    if not run_command(
-        ["python3", "csv_to_dat.py", "test1.csv", "test_noheader.dat"],
-        "Conversion CSV → DAT (sans en-tête original)"
-    ):
-        print("⚠️  Note: En-tête par défaut utilisé")
-    
-    if not run_command(
-        ["python3", "dat_to_csv.py", "test_noheader.dat", "test3.csv"],
-        "Reconversion DAT → CSV"
-    ):
-        sys.exit(1)
-    
-    if not compare_files("test1.csv", "test3.csv", "Comparaison CSV (avec en-tête par défaut)"):
-        sys.exit(1)
-    
-    # Résumé
-    print(f"\n{'='*60}")
-    print("📊 RÉSUMÉ DES TESTS")
-    print(f"{'='*60}")
-    print("✅ Test 1: DAT → CSV → DAT → CSV : RÉUSSI")
-    print("✅ Test 2: CSV identique après round-trip : RÉUSSI")
-    print("✅ Test 3: Conversion sans en-tête original : RÉUSSI")
-    print("\n🎉 RÉVERSIBILITÉ À 100% CONFIRMÉE !")
-    print("\nLes programmes sont prêts à être utilisés en production.")
-    
-    # Nettoyage
-    print(f"\n{'='*60}")
-    print("🧹 Nettoyage des fichiers de test")
-    print(f"{'='*60}")
-    for f in ["test1.csv", "test2.csv", "test3.csv", "test_recreated.dat", "test_noheader.dat"]:
-        if os.path.exists(f):
-            os.remove(f)
-            print(f"  Supprimé: {f}")
-
-if __name__ == '__main__':
-    main()
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        self._hash.update(data)
+        if self._f_out is not None:
+            self._f_out.write(data)
+        self.size += data.nbytes
+        return data.nbytes
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def _csv_writer(sink):
+    """Writer CSV de l'export (latin-1, « ; », CRLF) au-dessus d'une sortie binaire."""
+    f_text = io.TextIOWrapper(io.BufferedWriter(sink, SINK_BUFFER), encoding=ENCODING, newline="")
+    return f_text, csv.writer(f_text, delimiter=CSV_DELIMITER)
+
+
+# ===========================================================================
+# RÉFÉRENCE
+# ===========================================================================
+#
+#   Construction historique, un enregistrement à la fois : payload +
+#   b"\x00" + padding 0xCD jusqu'à 31 octets, puis, à la relecture, tout
+#   ce qui précède le \x00, découpé sur le premier espace.  Le moteur par
+#   lots (NumPy, memoryview, pipeline, plages parallèles) doit produire
+#   exactement les mêmes octets.
+#
+# ===========================================================================
+
+class Reference:
+    """Empreintes attendues du .dat, du CSV exporté et de son réencodage.
+
+    Chaque ligne distincte n'est construite qu'une fois ; les lots ne font
+    ensuite que recoller les blocs attendus.
+    """
+
+    def __init__(self, transcoder):
+        self.transcoder = transcoder
+        self.records = 0
+        self.dat = HashSink()
+        self.again = HashSink()
+        for sink in (self.dat, self.again):
+            sink.write(HEADER_BYTES + BUFFER_BYTES)
+        self.csv = HashSink()
+        self._f_text, self._writer = _csv_writer(self.csv)
+        self._expected = {}     # ligne brute → (bloc, ligne exportée, bloc réencodé)
+
+    def _block(self, code, text):
+        payload = self.transcoder.encode(code, f"{code} {text.strip()}")
+        return payload, payload + b"\x00" + bytes([PAD_BYTE]) * (BLOCK_SIZE - 1 - len(payload))
+
+    def _expect(self, row):
+        if len(row) < 2:
+            return None
+
+        payload, block = self._block(row[0].strip(), row[1])
+
+        # Relecture, puis réencodage du CSV exporté : seule une troncature
+        # qui laisse un espace final (retiré à la relecture) change le bloc.
+        code, _, texte = payload.decode(ENCODING).strip().partition(" ")
+        if not code:
+            return block, None, b""
+        return block, (code, texte), self._block(code, texte)[1]
+
+    def add(self, rows):
+        """Ajoute un lot de lignes brutes du CSV source."""
+        expected = self._expected
+        blocks, exported, again = [], [], []
+
+        for row in rows:
+            key = tuple(row)
+            if key not in expected:
+                expected[key] = self._expect(row)
+            if expected[key] is None:
+                continue
+
+            block, csv_row, again_block = expected[key]
+            blocks.append(block)
+            again.append(again_block)
+            if csv_row is not None:
+                exported.append(csv_row)
+
+        self.records += len(blocks)
+        self.dat.write(b"".join(blocks))
+        self.again.write(b"".join(again))
+        self._writer.writerows(exported)
+
+    def digests(self):
+        self._f_text.flush()
+        return {"records": self.records, "dat": self.dat.hexdigest(),
+                "csv": self.csv.hexdigest(), "again": self.again.hexdigest()}
+
+
+# ===========================================================================
+# ALLER-RETOUR
+# ===========================================================================
+
+class RoundTrip:
+    """Empreintes d'un aller-retour : attendues, produites, relues, réencodées."""
+
+    def __init__(self, variant, rows):
+        self.variant   = variant
+        self.rows      = rows
+        self.records   = 0
+        self.expected  = {}
+        self.dat       = None
+        self.csv       = {}             # mode de lecture → empreinte du CSV
+        self.reencoded = None
+        self.seconds   = 0.0
+
+    def mismatches(self):
+        """Liste lisible des écarts ; vide si l'aller-retour est exact."""
+        errors = []
+        if self.records != self.expected["records"]:
+            errors.append(f"enregistrements : {self.records} au lieu de {self.expected['records']}")
+        if self.dat != self.expected["dat"]:
+            errors.append("le .dat diffère de la construction de référence")
+        for mode, digest in self.csv.items():
+            if digest != self.expected["csv"]:
+                errors.append(f"le CSV relu en mode {mode} diffère de la référence")
+        if self.reencoded is not None and self.reencoded != self.expected["again"]:
+            errors.append("le CSV exporté, réencodé, diffère de la référence")
+        return errors
+
+
+def write_source(path, batches, variant, reference):
+    """Écrit le CSV source de la variante et alimente la référence, en un passage."""
+    encoding = "utf-8-sig" if variant["bom"] else variant["encoding"]
+
+    with open(path, "w", encoding=encoding, newline="") as f_out:
+        writer = csv.writer(f_out, delimiter=CSV_DELIMITER, lineterminator=variant["newline"])
+        for batch in batches:
+            writer.writerows(batch)
+            reference.add(batch)
+
+
+def encode(csv_path, dat_path, variant, transcoder):
+    """CSV → .dat par le moteur de la variante ; retourne (enregistrements, empreinte)."""
+    with open(dat_path, "wb") as f_dat:
+        sink = HashSink(f_dat)
+
+        if variant["encoder"] == "pipeline":
+            count = write_dat_pipelined(csv_path, sink, encoding=sniff_encoding(csv_path),
+                                        transcoder=transcoder)
+        else:
+            sink.write(HEADER_BYTES + BUFFER_BYTES)
+            with open_csv(csv_path) as f_in:
+                count = write_records(iter_csv_rows(f_in), sink, transcoder=transcoder,
+                                      use_numpy=variant["encoder"] == "numpy")
+
+    return count, sink.hexdigest()
+
+
+def decode(dat_path, mode, csv_path=None, range_rows=RANGE_ROWS):
+    """.dat → CSV dans le mode de lecture donné ; retourne l'empreinte du CSV."""
+    with open(csv_path, "wb") if csv_path else nullcontext() as f_csv:
+        sink = HashSink(f_csv)
+
+        if mode == "parallel":
+            write_csv_parallel(dat_path, sink, workers=2, range_rows=range_rows)
+        else:
+            f_text, _ = _csv_writer(sink)
+            write_csv(dat_path, f_text, mode)
+            f_text.flush()
+            f_text.detach()
+
+    return sink.hexdigest()
+
+
+def round_trip(directory, rows=ROWS, seed=SEED, modes=READ_MODES, reencode=True, **variant):
+    """Aller-retour complet d'une table aléatoire ; retourne un RoundTrip.
+
+    Le CSV source est généré sur disque en même temps que les empreintes
+    de référence, puis encodé, relu dans chaque mode de `modes`, et le
+    CSV exporté est réencodé : rien n'est jamais chargé en entier.
+    """
+    variant = dict(DEFAULT_VARIANT, **variant)
+    if variant["encoder"] == "numpy" and np is None:
+        variant["encoder"] = "python"
+
+    transcoder = Transcoder(LATIN1_TABLE if variant["translit"] else None, keep_details=False)
+    result = RoundTrip(variant, rows)
+    start = time.perf_counter()
+
+    source, dat, export, again = (os.path.join(directory, name)
+                                  for name in ("source.csv", "table.dat", "export.csv", "again.dat"))
+
+    reference = Reference(Transcoder(transcoder.table, keep_details=False))
+    write_source(source, random_batches(random.Random(seed), rows, variant), variant, reference)
+    result.expected = reference.digests()
+
+    result.records, result.dat = encode(source, dat, variant, transcoder)
+
+    for number, mode in enumerate(modes):
+        if mode == "numpy" and np is None:
+            continue
+        # Plusieurs plages, pour que le recollement soit réellement éprouvé.
+        result.csv[mode] = decode(dat, mode, export if number == 0 and reencode else None,
+                                  range_rows=rows // 3 + 1)
+
+    if reencode:
+        result.reencoded = encode(export, again, variant, transcoder)[1]
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _check(result):
+    errors = result.mismatches()
+    assert not errors, f"{result.variant} : " + " ; ".join(errors)
+
+
+# ===========================================================================
+# TESTS (pytest)
+# ===========================================================================
+
+def test_round_trip_csv_forms():
+    """BOM ou non, CRLF ou LF, UTF-8 ou export ANSI : même .dat que la référence."""
+    with tempfile.TemporaryDirectory() as directory:
+        for encoding in ("utf-8", "latin-1"):
+            for bom in (False, True):
+                for newline in ("\r\n", "\n"):
+                    if bom and encoding == "latin-1":
+                        continue
+                    _check(round_trip(directory, ROWS // 4, SEED, modes=("numpy",),
+                                      encoding=encoding, bom=bom, newline=newline))
+
+
+def test_encoders_agree():
+    """Encodeurs NumPy, Python et pipeline : octets identiques."""
+    with tempfile.TemporaryDirectory() as directory:
+        for encoder in ("numpy", "python", "pipeline"):
+            _check(round_trip(directory, ROWS, SEED + 1, modes=("mmap",), reencode=False,
+                              encoder=encoder))
+
+
+def test_read_modes_agree():
+    """Lectures NumPy, memoryview, séquentielle et par plages parallèles : même CSV."""
+    with tempfile.TemporaryDirectory() as directory:
+        _check(round_trip(directory, ROWS, SEED + 2, modes=READ_MODES))
+
+
+def test_without_transliteration():
+    """Sans table : caractères hors Latin-1 remplacés par « ? », toujours réversible."""
+    with tempfile.TemporaryDirectory() as directory:
+        _check(round_trip(directory, ROWS // 2, SEED + 3, translit=False))
+
+
+def test_fuzz():
+    """Variantes tirées au hasard, graines successives."""
+    rng = random.Random(SEED)
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in range(SEED + 10, SEED + 15):
+            _check(round_trip(directory, ROWS // 5, seed, modes=(rng.choice(READ_MODES),),
+                              **random_variant(rng)))
+
+
+def random_variant(rng):
+    encoding = rng.choice(("utf-8", "latin-1"))
+    return {
+        "encoding": encoding,
+        "bom": encoding == "utf-8" and rng.random() < 0.5,
+        "newline": rng.choice(("\r\n", "\n")),
+        "translit": rng.random() < 0.8,
+        "encoder": rng.choice(("numpy", "python", "pipeline")),
+    }
+
+
+# ===========================================================================
+# POINT D'ENTRÉE
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Aller-retour CSV ⟷ .dat sur des tables aléatoires, comparé par empreintes.")
+    parser.add_argument("--rows", type=int, default=1_000_000,
+                        help="lignes par aller-retour (défaut : %(default)s)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="allers-retours, variantes tirées au hasard (défaut : %(default)s)")
+    parser.add_argument("--seed", type=int, default=SEED, help="graine (défaut : %(default)s)")
+    parser.add_argument("--tmp-dir", metavar="DIR",
+                        help="répertoire des fichiers de travail (défaut : répertoire temporaire)")
+    args = parser.parse_args(argv)
+
+    print("--- TEST DE RÉVERSIBILITÉ ---")
+    rng = random.Random(args.seed)
+    failures = 0
+
+    with tempfile.TemporaryDirectory(prefix="ero-roundtrip-", dir=args.tmp_dir) as directory:
+        for run in range(args.runs):
+            variant = DEFAULT_VARIANT if run == 0 else random_variant(rng)
+            result = round_trip(directory, args.rows, args.seed + run, **variant)
+            errors = result.mismatches()
+            failures += bool(errors)
+
+            print(f"{'OK   ' if not errors else 'ÉCHEC'} graine {args.seed + run} : "
+                  f"{result.records:,} enregistrements en {result.seconds:.1f} s "
+                  f"({result.variant['encoding']}{', BOM' if result.variant['bom'] else ''}, "
+                  f"{'CRLF' if result.variant['newline'] == chr(13) + chr(10) else 'LF'}, "
+                  f"encodeur {result.variant['encoder']}"
+                  f"{', sans translittération' if not result.variant['translit'] else ''}) "
+                  f"— .dat {result.dat[:12]}")
+            for error in errors:
+                print(f"      {error}")
+
+    print("--- TERMINÉ ---" if not failures else f"--- {failures} ÉCHEC(S) ---")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_stats.py
+# Mesures d'une conversion (--stats) : RunStats, ligne --stats=json des
+# deux scripts, crochets --stats-hook appelés autour de chaque phase.
+#
+#   python -m pytest -q test_stats.py
+# ---------------------------------------------------------------------------
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from ero_converter.encoder import csv_to_dat
+from ero_converter.stats import RunStats, load_hook
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CSV = "".join(f"{i:05d};Catégorie n°{i} – l’été\r\n" for i in range(5000)).encode("utf-8")
+
+HOOK = '''import sys
+
+def trace(event, phase, stats):
+    print(event, phase, file=sys.stderr)
+'''
+
+
+def _run(script, args, cwd, data=b""):
+    """Lance un script du dépôt (crochets importables depuis `cwd`) ; retourne (stdout, stderr)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([cwd, ROOT]))
+    result = subprocess.run([sys.executable, os.path.join(ROOT, script), *args], input=data,
+                            capture_output=True, cwd=cwd, env=env)
+    assert result.returncode == 0, result.stderr.decode("utf-8", "replace")
+    return result.stdout.decode("utf-8"), result.stderr.decode("utf-8")
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_run_stats_phases_and_hooks():
+    events = []
+    stats = RunStats([lambda event, phase, s: events.append((event, phase, s is stats))])
+
+    with stats.phase("read"):
+        pass
+    with stats.phase("read"):
+        pass
+    assert list(stats.timed("decode", range(3))) == [0, 1, 2]
+    stats.count("truncated")
+    stats.count("truncated", 2)
+    stats.records = 3
+    stats.finish()
+
+    data = stats.as_dict()
+    assert data["phases"]["read"]["calls"] == 2
+    assert data["phases"]["decode"]["calls"] == 4         # Trois lots, puis StopIteration.
+    assert data["counters"] == {"truncated": 3}
+    assert data["records"] == 3 and data["wall_s"] >= data["phases"]["read"]["wall_s"]
+
+    assert events[:2] == [("start", "read", True), ("stop", "read", True)]
+    assert events[-1] == ("done", None, True)
+    assert len(events) == 2 * (2 + 4) + 1
+
+    assert json.loads(stats.to_json()) == json.loads(json.dumps(data))
+    assert "\n" not in stats.to_json()
+    assert "read" in stats.summary() and "truncated=3" in stats.summary()
+
+
+def test_stats_json_line():
+    """--stats=json : dernière ligne de la sortie, volumes et effectifs de la conversion."""
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "table.csv"), "wb") as f_out:
+            f_out.write(CSV)
+
+        out, _ = _run("csv_to_dat.py", ["table.csv", "table.dat", "--stats=json"], directory)
+        stats = json.loads(out.splitlines()[-1])
+        assert stats["records"] == 5000
+        assert stats["bytes_in"] == len(CSV)
+        assert stats["bytes_out"] == os.path.getsize(os.path.join(directory, "table.dat"))
+        assert stats["phases"] and sum(stats["counters"].values()) > 0
+
+        # .dat sur stdin : la taille lue se déduit des blocs décodés.
+        out, _ = _run("dat_to_csv.py", ["-", "audit.csv", "--stats=json"], directory,
+                      csv_to_dat(CSV))
+        stats = json.loads(out.splitlines()[-1])
+        assert stats["records"] == 5000
+        assert stats["bytes_in"] == len(csv_to_dat(CSV))
+        assert stats["bytes_out"] == os.path.getsize(os.path.join(directory, "audit.csv"))
+
+
+def test_stats_hook():
+    """--stats-hook module:fonction : start/stop appariés autour de chaque phase, puis done."""
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "ero_trace.py"), "w", encoding="utf-8") as f_out:
+            f_out.write(HOOK)
+        with open(os.path.join(directory, "table.csv"), "wb") as f_out:
+            f_out.write(CSV)
+
+        for script, args in (("csv_to_dat.py", ["table.csv", "table.dat"]),
+                             ("dat_to_csv.py", ["table.dat", "audit.csv"])):
+            _, err = _run(script, [*args, "--stats-hook", "ero_trace:trace"], directory)
+            events = [line.split() for line in err.splitlines()]
+
+            assert events[-1] == ["done", "None"], script
+            open_phases = []
+            for event, phase in events[:-1]:
+                if event == "start":
+                    open_phases.append(phase)
+                else:
+                    assert event == "stop" and open_phases.pop() == phase
+            assert not open_phases and len(events) > 1
+
+    try:
+        load_hook("sans_fonction")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("crochet sans fonction accepté")
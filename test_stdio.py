@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_stdio.py
+# « - » pour stdin / stdout : les deux scripts, en tube, produisent les
+# mêmes octets que la conversion sur fichiers, et n'écrivent que la
+# sortie sur stdout.
+#
+#   python -m pytest -q test_stdio.py
+# ---------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from ero_converter.decoder import dat_to_csv
+from ero_converter.encoder import csv_to_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+TEXT = "".join(f"{i:05d};Catégorie n°{i} – l’été\r\n" for i in range(2000))
+
+
+def _run(script, args, data, cwd):
+    """Lance un script du dépôt, `data` sur stdin ; retourne (stdout, stderr)."""
+    result = subprocess.run([sys.executable, os.path.join(ROOT, script), *args], input=data,
+                            capture_output=True, cwd=cwd)
+    assert result.returncode == 0, result.stderr.decode("utf-8", "replace")
+    return result.stdout, result.stderr
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_csv_to_dat_stdin_stdout():
+    """UTF-8 avec BOM ou cp1252, séquentiel ou --pipeline : le .dat du tube et rien d'autre."""
+    for data in ("\ufeff" + TEXT).encode("utf-8"), TEXT.encode("cp1252"):
+        expected = csv_to_dat(data)
+
+        for options in ([], ["--pipeline"]):
+            with tempfile.TemporaryDirectory() as directory:
+                out, err = _run("csv_to_dat.py", ["-", "-", *options], data, directory)
+                assert out == expected, options
+                assert b"2000" in err
+                assert os.listdir(directory) == []
+
+
+def test_dat_to_csv_stdin_stdout():
+    """Les trois lecteurs, sur un .dat lu dans un tube."""
+    dat = csv_to_dat(TEXT.encode("utf-8"))
+    expected = dat_to_csv(dat)
+
+    for mode in ("numpy", "mmap", "stream"):
+        with tempfile.TemporaryDirectory() as directory:
+            out, err = _run("dat_to_csv.py", ["-", "-", "--mode", mode], dat, directory)
+            assert out == expected, mode
+            assert os.listdir(directory) == []
+
+
+def test_pipe_round_trip():
+    """csv_to_dat.py - - | dat_to_csv.py - - : même CSV qu'en passant par un fichier."""
+    data = TEXT.encode("utf-8")
+
+    with tempfile.TemporaryDirectory() as directory:
+        encode = subprocess.Popen([sys.executable, os.path.join(ROOT, "csv_to_dat.py"), "-", "-"],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, cwd=directory)
+        decode = subprocess.Popen([sys.executable, os.path.join(ROOT, "dat_to_csv.py"), "-", "-"],
+                                  stdin=encode.stdout, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, cwd=directory)
+        encode.stdout.close()
+        encode.stdin.write(data)
+        encode.stdin.close()
+        out = decode.communicate()[0]
+
+        assert encode.wait() == 0 and decode.returncode == 0
+        assert out == dat_to_csv(csv_to_dat(data))
+
+        # Sur fichiers : mêmes octets.
+        source = os.path.join(directory, "table.csv")
+        with open(source, "wb") as f_out:
+            f_out.write(data)
+        _run("csv_to_dat.py", [source, "table.dat"], b"", directory)
+        _run("dat_to_csv.py", ["table.dat", "table_audit.csv"], b"", directory)
+        with open(os.path.join(directory, "table_audit.csv"), "rb") as f_in:
+            assert f_in.read() == out
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_verify.py
+# Contrôle structurel (--verify) : la sortie du convertisseur est valide,
+# le texte latin-1 n'est pas pris pour de l'UTF-8, et les anomalies sont
+# signalées par les chemins NumPy et Python.
+#
+#   python -m pytest -q test_verify.py
+# ---------------------------------------------------------------------------
+
+import os
+import random
+import tempfile
+
+from ero_converter.datfile import BLOCK_SIZE, START_OFFSET
+from ero_converter.encoder import csv_to_dat
+from ero_converter.verify import verify_dat
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+WORDS = ["Prêt", "à\u202fporter", "Cité»", "«x»", "œuvre", "Zone", "A B", "Ferme", "Été"]
+
+
+def _dat(directory, csv_text):
+    """Écrit le .dat produit par le convertisseur pour un CSV (texte UTF-8)."""
+    path = os.path.join(directory, "table.dat")
+    with open(path, "wb") as f_out:
+        f_out.write(csv_to_dat(csv_text.encode("utf-8")))
+    return path
+
+
+def _overwrite(path, index, position, data):
+    """Remplace des octets du bloc `index`, à partir de `position`."""
+    with open(path, "r+b") as f_dat:
+        f_dat.seek(START_OFFSET + index * BLOCK_SIZE + position)
+        f_dat.write(data)
+
+
+def _reports(path):
+    """Rapports des chemins NumPy et Python, qui doivent concorder."""
+    numpy, python = verify_dat(path, True), verify_dat(path, False)
+    assert numpy["bad_records"] == python["bad_records"]
+    return numpy
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_verify_accepts_converter_output():
+    rnd = random.Random(1)
+    csv_text = "".join(f"{i:05d};{' '.join(rnd.choices(WORDS, k=rnd.randint(1, 6)))}\r\n"
+                       for i in range(5000))
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = _reports(_dat(directory, csv_text))
+        assert report["ok"], report
+
+
+def test_verify_accepts_latin1_lookalikes():
+    """« à » + espace insécable (E0 A0) ou « é» » : du latin-1, pas de l'UTF-8."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _dat(directory, "0001;Prêt à\u202fporter\r\n0002;Cité»\r\n0003;à\u202f«x»\r\n")
+
+        report = _reports(path)
+        assert report["ok"], report
+        assert report["errors"]["utf8"] == 0
+
+
+def test_verify_flags_raw_utf8():
+    """Du texte UTF-8 écrit tel quel (« Ã© », « â€™ », emoji) est signalé."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _dat(directory, "0001;abcdef\r\n0002;abcdef\r\n0003;abcdef\r\n0004;abcdef\r\n")
+
+        for index, char in enumerate(("é", "’", "\U0001f600")):
+            _overwrite(path, index, 5, char.encode("utf-8"))
+
+        report = _reports(path)
+        assert not report["ok"]
+        assert [record["index"] for record in report["bad_records"]] == [0, 1, 2]
+        assert report["errors"]["utf8"] == 3
+
+
+def test_verify_flags_structural_errors():
+    with tempfile.TemporaryDirectory() as directory:
+        path = _dat(directory, "0001;Un\r\n0002;Deux\r\n0003;Trois\r\n0004;Quatre\r\n")
+
+        _overwrite(path, 0, 0, b"x" * BLOCK_SIZE)          # Pas de terminateur.
+        _overwrite(path, 1, 20, b"\x00")                   # Padding altéré.
+        _overwrite(path, 2, 0, b"\xef\xbb\xbf")            # BOM dans le payload.
+
+        report = _reports(path)
+        assert not report["ok"]
+        assert {name: report["errors"][name] for name in ("no_terminator", "bad_padding", "bom")} \
+            == {"no_terminator": 1, "bad_padding": 1, "bom": 1}
+        assert [record["index"] for record in report["bad_records"]] == [0, 1, 2]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# ---------------------------------------------------------------------------
+# test_watch.py
+# Surveillance du CSV (--watch) : anti-rebond, régénération, et
+# générations publiées jamais modifiées sous un lecteur.
+#
+#   python -m pytest -q test_watch.py
+# ---------------------------------------------------------------------------
+
+import mmap
+import os
+import random
+import tempfile
+
+from ero_converter.encoder import csv_to_dat
+from ero_converter.watch import Watcher
+
+
+# ===========================================================================
+# OUTILS
+# ===========================================================================
+
+WORDS = ["Prêt", "à porter", "Cité", "«x»", "œuvre", "Zone", "A B", "Ferme", "Été"]
+
+
+def _csv(seed, count=500):
+    rnd = random.Random(seed)
+    return "".join(f"{i:05d};{' '.join(rnd.choices(WORDS, k=rnd.randint(1, 6)))}\r\n"
+                   for i in range(count)).encode("utf-8")
+
+
+def _write(path, data):
+    with open(path, "wb") as f_out:
+        f_out.write(data)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f_in:
+        return f_in.read()
+
+
+# ===========================================================================
+# TESTS
+# ===========================================================================
+
+def test_watcher_debounce():
+    """Un CSV modifié attend `debounce` secondes ; réenregistré à l'identique, rien n'est écrit."""
+    with tempfile.TemporaryDirectory() as directory:
+        source = _write(os.path.join(directory, "table.csv"), _csv(1))
+        target = os.path.join(directory, "table.dat")
+
+        watcher = Watcher(source, target, debounce=2.0)
+        assert watcher.poll(now=0.0) == 500
+        assert _read(target) == csv_to_dat(_csv(1))
+        assert watcher.poll(now=1.0) is None
+
+        _write(source, _csv(2, 600))
+        os.utime(source, ns=(1, 1))
+        assert watcher.poll(now=10.0) is None       # Changement vu : attente.
+        assert watcher.poll(now=11.0) is None
+        assert watcher.poll(now=12.5) == 600
+        assert watcher.swapped and _read(target) == csv_to_dat(_csv(2, 600))
+
+        published = os.stat(target).st_ino
+        _write(source, _csv(2, 600))
+        os.utime(source, ns=(2, 2))
+        watcher.poll(now=20.0)
+        assert watcher.poll(now=23.0) == 600
+        assert not watcher.swapped and os.stat(target).st_ino == published
+        assert watcher.builds == 2
+
+
+def test_watcher_keeps_open_generation():
+    """Un lecteur de la génération précédente (fichier ouvert, mmap) la voit inchangée."""
+    with tempfile.TemporaryDirectory() as directory:
+        source = _write(os.path.join(directory, "table.csv"), _csv(12))
+        target = os.path.join(directory, "table.dat")
+
+        watcher = Watcher(source, target)
+        watcher.poll()
+        before = _read(target)
+
+        with open(target, "rb") as f_dat, \
+                mmap.mmap(f_dat.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for seed in (13, 14, 15):
+                watcher.update(csv_to_dat(_csv(seed)))
+                assert watcher.swapped
+                assert _read(target) == csv_to_dat(_csv(seed))
+
+            assert mm[:] == before
+            f_dat.seek(0)
+            assert f_dat.read() == before
+
+        # Retour au contenu initial : la cible est bien substituée.
+        watcher.update(before)
+        assert watcher.swapped and _read(target) == before
+        watcher.update(before)
+        assert not watcher.swapped
+        assert sorted(os.listdir(directory)) == ["table.csv", "table.dat"]
+
+
+def test_watcher_rewrites_target_modified_elsewhere():
+    """Une cible modifiée par un autre programme est remplacée, même par un contenu identique."""
+    with tempfile.TemporaryDirectory() as directory:
+        source = _write(os.path.join(directory, "table.csv"), _csv(4))
+        target = os.path.join(directory, "table.dat")
+
+        watcher = Watcher(source, target)
+        watcher.poll()
+        data = _read(target)
+
+        _write(target, b"autre contenu")
+        watcher.update(data)
+        assert watcher.swapped and _read(target) == data